@@ -0,0 +1,130 @@
+import numpy as np
+
+from board import EMPTY
+
+
+class AreaAnalyzer:
+    # flood fill engine measuring the areas available to the players
+    # instead of recursing over a deepcopy of the game matrix for every candidate move, the arena is copied once into
+    # a reused scratch buffer padded with a blocked border and its empty regions are labelled iteratively,
+    # so all candidate moves of a player are answered by a single labelling pass
+    def __init__(self, arena_size):
+        self.arena_size = arena_size
+        self.width = arena_size + 2
+        self.free = np.zeros((self.width, self.width), dtype=bool)  # True = empty tile, the border is always False
+        self.labels = [0] * (self.width * self.width)  # region id of every labelled tile
+        self.region_counter = 0
+        self.visited_cells = 0  # total number of tiles labelled by the flood fills (for instrumentation)
+
+    def flat_index(self, position):
+        # (y, x) position in the game matrix -> index in the padded scratch buffer
+        return (int(position[0]) + 1) * self.width + int(position[1]) + 1
+
+    def calculate_areas(self, game_matrix, positions):
+        # returns the size of the empty region containing each position
+        # tiles which are occupied or outside the game matrix have 0 area
+        self.free[1:-1, 1:-1] = game_matrix == EMPTY
+        free = self.free.ravel().tolist()
+        labels = self.labels
+        width = self.width
+        # region ids keep increasing between calls, so labels from previous calls never have to be cleared
+        first_region = self.region_counter + 1
+        region_sizes = dict()
+
+        areas = []
+        for position in positions:
+            start = self.flat_index(position)
+            if labels[start] >= first_region:
+                # position lies in a region which was already labelled in this pass
+                areas.append(region_sizes[labels[start]])
+                continue
+            if not free[start]:
+                areas.append(0)
+                continue
+
+            self.region_counter += 1
+            region = self.region_counter
+            free[start] = False
+            labels[start] = region
+            stack = [start]
+            size = 0
+            while stack:
+                i = stack.pop()
+                size += 1
+                # up, down, left, right
+                for j in (i - width, i + width, i - 1, i + 1):
+                    if free[j]:
+                        free[j] = False
+                        labels[j] = region
+                        stack.append(j)
+            region_sizes[region] = size
+            self.visited_cells += size
+            areas.append(size)
+        return areas
+
+
+def find_runs(tiles, line_length):
+    # start offsets and lengths of the runs of consecutive tiles in a line (row or column) of the arena
+    # tiles is a sorted array of flat indices in which a line is line_length tiles long
+    breaks = np.ones(len(tiles), dtype=bool)
+    breaks[1:] = (np.diff(tiles) != 1) | (tiles[1:] % line_length == 0)
+    starts = np.flatnonzero(breaks)
+    return starts, np.diff(np.append(starts, len(tiles)))
+
+
+def label_batch_regions(free):
+    # labels connected empty regions of a whole stack of arenas at once
+    # free is a (B, N, N) boolean array, returns the flat indices of the empty tiles in row-major order
+    # and the label of each of them (the position of the smallest tile of its region in that array)
+    # labels are propagated by taking minimums over whole runs of empty tiles in rows and columns alternately,
+    # so a region converges after about as many passes as it has turns, instead of its diameter
+    arena_size = free.shape[2]
+    row_tiles = np.flatnonzero(free)
+    row_starts, row_lengths = find_runs(row_tiles, arena_size)
+    # the same tiles in column-major order (within every arena)
+    column_tiles = np.arange(free.size).reshape(free.shape).transpose(0, 2, 1)[free.transpose(0, 2, 1)]
+    column_starts, column_lengths = find_runs(np.flatnonzero(free.transpose(0, 2, 1)), arena_size)
+    index_map = np.empty(free.size, dtype=np.int32)
+    index_map[row_tiles] = np.arange(len(row_tiles), dtype=np.int32)
+    column_order = index_map[column_tiles]
+
+    labels = np.arange(len(row_tiles), dtype=np.int32)
+    if len(labels) == 0:
+        return row_tiles, labels
+    while True:
+        new_labels = np.repeat(np.minimum.reduceat(labels, row_starts), row_lengths)
+        new_labels[column_order] = np.repeat(np.minimum.reduceat(new_labels[column_order], column_starts),
+                                             column_lengths)
+        # pointer jumping: every label is a tile of the same region, so its own label is also valid
+        new_labels = new_labels[new_labels]
+        if np.array_equal(new_labels, labels):
+            return row_tiles, labels
+        labels = new_labels
+
+
+class BatchRegions:
+    # empty regions of a stack of arenas (B, N, N), labelled lazily on the first request
+    # BatchBlockade creates one per move and shares it between both players, so the arenas are labelled only once
+    def __init__(self, game_matrices):
+        self.game_matrices = game_matrices
+        self.region_sizes = None
+        self.tile_labels = None
+
+    def label(self):
+        free = self.game_matrices == EMPTY
+        tiles, labels = label_batch_regions(free)
+        self.region_sizes = np.append(np.bincount(labels, minlength=len(labels)), 0)  # the last one is for occupied
+        self.tile_labels = np.full(free.size, len(labels), dtype=np.int32)
+        self.tile_labels[tiles] = labels
+
+    def calculate_areas(self, targets, mask):
+        # vectorized counterpart of AreaAnalyzer.calculate_areas
+        # targets is a (B, M, 2) array of (y, x) positions and mask is a (B, M) boolean array of targets that are
+        # known to lie inside the arena; returns a (B, M) array of areas (0 for masked out targets)
+        if self.tile_labels is None:
+            self.label()
+        batch_size, arena_size = self.game_matrices.shape[:2]
+        y = np.where(mask, targets[:, :, 0], 0)
+        x = np.where(mask, targets[:, :, 1], 0)
+        flat_targets = (np.arange(batch_size)[:, None] * arena_size + y) * arena_size + x
+        return np.where(mask, self.region_sizes[self.tile_labels[flat_targets]], 0)
@@ -0,0 +1,251 @@
+import argparse
+import math
+import time
+import numpy as np
+
+from board import BOARD_DTYPE, EMPTY, COLLISION
+from players.BasePlayer import derive_player_seeds
+
+# free-for-all Blockade for large arenas (hundreds of tiles) with 2-8 players
+# the arena is never stored as a dense matrix: occupancy is a bitset per row (one Python int of arena_size + 2 bits,
+# the border is blocked), the players are described by their heads and trails, so a move costs O(players) instead of
+# O(arena_size^2) and the bots (see FrontierBot) search only around the heads
+# rules follow Blockade.process_move: all players move at the same time, a player without possible moves is
+# eliminated (its trail stays), players which move to the same tile collide and are eliminated in the next move
+# and the game ends when at most one player is left (the winner, or a draw if all players are eliminated at once)
+MOVE_NAMES = ('up', 'down', 'left', 'right')  # the same order as Blockade.move_dict
+MOVE_OFFSETS = np.array([(-1, 0), (1, 0), (0, -1), (0, 1)])
+MAX_PLAYERS = 8
+
+
+def starting_positions(arena_size, num_players):
+    # players start evenly spaced on a circle around the center, player1 in the bottom-right direction
+    # (with 2 players these are the starting heads of Blockade, see board.starting_heads)
+    center = (arena_size - 1) / 2
+    radius = (center - int(arena_size / 4)) * math.sqrt(2)
+    positions = []
+    for i in range(num_players):
+        angle = math.pi / 4 + 2 * math.pi * i / num_players
+        positions.append((round(center + radius * math.sin(angle)), round(center + radius * math.cos(angle))))
+    if len(set(positions)) < num_players:
+        raise ValueError(f'arena of size {arena_size} is too small for {num_players} players')
+    return positions
+
+
+def occupancy_rows(occupied):
+    # row bitsets of a (N, N) boolean array of occupied tiles: bit x + 1 of row y + 1 is tile (y, x),
+    # the padding (first and last row, bit 0 and bit N + 1 of every row) is occupied
+    padded = np.ones((occupied.shape[0] + 2, occupied.shape[1] + 2), dtype=bool)
+    padded[1:-1, 1:-1] = occupied
+    packed = np.packbits(padded, axis=1, bitorder='little')
+    return [int.from_bytes(row.tobytes(), 'little') for row in packed]
+
+
+def expand_rows(frontier, rows, reached):
+    # one step of a bitset breadth-first search: the tiles next to the frontier which are neither occupied (rows)
+    # nor reached yet, frontier and reached are sparse {row: bits} dicts (only the rows the search got to),
+    # so a step costs O(rows of the frontier) and handles a whole row of tiles at once
+    grown = dict()
+    for y, bits in frontier.items():
+        grown[y] = grown.get(y, 0) | bits << 1 | bits >> 1
+        grown[y - 1] = grown.get(y - 1, 0) | bits
+        grown[y + 1] = grown.get(y + 1, 0) | bits
+    expanded = dict()
+    for y, bits in grown.items():
+        bits &= ~(rows[y] | reached.get(y, 0))
+        if bits:
+            expanded[y] = bits
+    return expanded
+
+
+class LargeArena:
+    def __init__(self, players, arena_size, seed=None, verbose=False, heads=None):
+        if not 2 <= len(players) <= MAX_PLAYERS:
+            raise ValueError(f'number of players should be between 2 and {MAX_PLAYERS}, got {len(players)}')
+        self.players = players
+        self.num_players = len(players)
+        self.arena_size = arena_size
+        self.verbose = verbose
+        if seed is not None:
+            # the first two players get the same seeds as player1 and player2 of Blockade
+            for player, player_seed in zip(players, derive_player_seeds(seed, self.num_players)):
+                player.seed(player_seed)
+
+        self.width = arena_size + 2  # row bitsets include the padding
+        self.rows = occupancy_rows(np.zeros((arena_size, arena_size), dtype=bool))
+        # (P, 2) array of (y, x) heads and the tiles of every player's trail (including the head)
+        self.heads = np.array(heads if heads is not None else starting_positions(arena_size, self.num_players))
+        self.trails = [[tuple(head)] for head in self.heads.tolist()]
+        for y, x in self.heads.tolist():
+            self.rows[y + 1] |= 1 << (x + 1)
+        self.collisions = []  # tiles of head collisions
+        self.collided = np.zeros(self.num_players, dtype=bool)  # heads are gone after a head collision
+        self.alive = np.ones(self.num_players, dtype=bool)
+        self.eliminated_after = [None] * self.num_players  # move number after which the player was eliminated
+        self.move_counter = 0
+        self.outcome = None
+
+    @classmethod
+    def from_game_matrix(cls, game_matrix, heads):
+        # arena view of a Blockade game matrix (e.g. for using FrontierBot in regular games), heads - [(y, x)]
+        arena = cls([None] * len(heads), game_matrix.shape[0], heads=heads)
+        arena.rows = occupancy_rows(game_matrix != EMPTY)
+        return arena
+
+    def is_empty(self, position):
+        return not self.rows[position[0] + 1] >> (position[1] + 1) & 1
+
+    def find_possible_moves(self):
+        # (P, 4) boolean mask of possible moves of every player (in MOVE_NAMES order)
+        offsets = MOVE_OFFSETS.tolist()
+        possible_moves = np.array([[not self.rows[y + 1 + dy] >> (x + 1 + dx) & 1 for dy, dx in offsets]
+                                   for y, x in self.heads.tolist()])
+        return possible_moves & (self.alive & ~self.collided)[:, None]
+
+    def bounded_area(self, position, limit):
+        # size of the empty region containing the position, the flood fill stops after reaching `limit` tiles
+        # (so the cost depends on the limit, not on the arena size)
+        y, bit = position[0] + 1, 1 << (position[1] + 1)
+        if self.rows[y] & bit:
+            return 0
+        frontier = {y: bit}
+        reached = dict(frontier)
+        size = 1
+        while frontier and size < limit:
+            frontier = expand_rows(frontier, self.rows, reached)
+            for y, bits in frontier.items():
+                reached[y] = reached.get(y, 0) | bits
+                size += bin(bits).count('1')
+        return min(size, limit)
+
+    def nearby_opponents(self, player_index, radius):
+        # indices of the opponents with a head at most `radius` tiles (Manhattan distance) from the player's head
+        distances = np.abs(self.heads - self.heads[player_index]).sum(axis=1)
+        nearby = (distances <= radius) & self.alive & ~self.collided
+        nearby[player_index] = False
+        return np.flatnonzero(nearby).tolist()
+
+    def local_territory(self, position, opponents, limit):
+        # Voronoi race between the position (the player's head after a move) and the heads of the opponents:
+        # tiles reached first by the player minus tiles reached first by any opponent (tiles reached by more players
+        # at the same time belong to nobody and stop the search), the search stops after reaching `limit` tiles
+        sources = [position] + [tuple(head) for head in self.heads[opponents].tolist()]
+        frontiers = [{y + 1: 1 << (x + 1)} for y, x in sources]  # frontiers[0] - the player
+        reached = dict()
+        for y, x in sources:
+            reached[y + 1] = reached.get(y + 1, 0) | 1 << (x + 1)
+        size = len(sources)
+        territory = 0
+        while any(frontiers) and size < limit:
+            frontiers = [expand_rows(frontier, self.rows, reached) for frontier in frontiers]
+            level = dict()
+            contested = dict()
+            for frontier in frontiers:
+                for y, bits in frontier.items():
+                    contested[y] = contested.get(y, 0) | level.get(y, 0) & bits
+                    level[y] = level.get(y, 0) | bits
+            for y, bits in level.items():
+                reached[y] = reached.get(y, 0) | bits
+                size += bin(bits).count('1')
+            frontiers = [{y: bits & ~contested[y] for y, bits in frontier.items() if bits & ~contested[y]}
+                         for frontier in frontiers]
+            territory += sum(bin(bits).count('1') for bits in frontiers[0].values())
+            territory -= sum(bin(bits).count('1') for frontier in frontiers[1:] for bits in frontier.values())
+        return territory
+
+    def process_move(self):
+        # plays one move of all players, returns the outcome when the game is finished (None otherwise)
+        possible_moves = self.find_possible_moves()
+        for i in np.flatnonzero(self.alive & ~possible_moves.any(axis=1)):
+            self.alive[i] = False
+            self.eliminated_after[i] = self.move_counter
+            if self.verbose:
+                print(f'Player{i + 1} ({self.players[i]}) is eliminated after move {self.move_counter}', flush=True)
+        if self.alive.sum() <= 1:
+            # 0 - draw, otherwise the number of the winner
+            self.outcome = int(np.flatnonzero(self.alive)[0]) + 1 if self.alive.any() else 0
+            if self.verbose:
+                print(f'Game finished after {self.move_counter} moves, outcome: {self.outcome}', flush=True)
+            return self.outcome
+
+        self.move_counter += 1
+        moving = np.flatnonzero(self.alive)
+        offsets = MOVE_OFFSETS.tolist()
+        moves = [MOVE_NAMES.index(self.players[i].get_arena_move(
+            self, i, {MOVE_NAMES[move]: tuple(offsets[move]) for move in np.flatnonzero(possible_moves[i])}))
+            for i in moving]
+        targets = self.heads[moving] + MOVE_OFFSETS[moves]
+
+        # simultaneous moves: every tile which is the target of more than one player is a head collision
+        _, inverse, counts = np.unique(targets[:, 0] * self.arena_size + targets[:, 1], return_inverse=True,
+                                       return_counts=True)
+        collided = counts[inverse] > 1
+        self.heads[moving] = targets
+        self.collided[moving[collided]] = True
+        for i, (y, x) in zip(moving.tolist(), targets.tolist()):
+            self.rows[y + 1] |= 1 << (x + 1)
+            self.trails[i].append((y, x))
+        self.collisions += {tuple(target) for target in targets[collided].tolist()}
+        return None
+
+    def run(self):
+        while self.process_move() is None:
+            pass
+        return self.outcome
+
+    def places(self):
+        # final place of every player: 1 + number of players which stayed in the game longer (ties share a place)
+        lasted = [math.inf if move is None else move for move in self.eliminated_after]
+        return [1 + sum(other > moves for other in lasted) for moves in lasted]
+
+    def game_matrix(self):
+        # dense int8 matrix in the encoding of board.py (heads: player number, tails: -player number)
+        game_matrix = np.full((self.arena_size, self.arena_size), EMPTY, dtype=BOARD_DTYPE)
+        for i, trail in enumerate(self.trails):
+            game_matrix[tuple(np.array(trail).T)] = -(i + 1)
+            game_matrix[trail[-1]] = i + 1
+        for tile in self.collisions:
+            game_matrix[tile] = COLLISION
+        return game_matrix
+
+
+def play_free_for_all(player_specs, arena_size, seeds, verbose=False):
+    # plays a game for every seed, the seats rotate between games (every spec starts from every position),
+    # returns {spec: [wins, draws, sum of places, games]} and the total number of player moves
+    from tournament import create_spec_player
+    results = {spec: [0, 0, 0, 0] for spec in player_specs}
+    player_moves = 0
+    for game_number, seed in enumerate(seeds):
+        shift = game_number % len(player_specs)
+        seat_specs = player_specs[shift:] + player_specs[:shift]
+        game = LargeArena([create_spec_player(spec) for spec in seat_specs], arena_size, seed=seed, verbose=verbose)
+        outcome = game.run()
+        for i, (spec, place) in enumerate(zip(seat_specs, game.places())):
+            results[spec][0] += outcome == i + 1
+            results[spec][1] += outcome == 0 and place == 1
+            results[spec][2] += place
+            results[spec][3] += 1
+        player_moves += sum(len(trail) - 1 for trail in game.trails)
+    return results, player_moves
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-p', '--players', nargs='+', help=f'specs of the 2-{MAX_PLAYERS} players (see tournament.py)',
+                        default=['frontier', 'frontier', 'random', 'random'])
+    parser.add_argument('-a', '--arena-size', help='size of the square game arena (in tiles)', type=int, default=200)
+    parser.add_argument('-n', '--num-games', help='number of games', type=int, default=1)
+    parser.add_argument('-r', '--starting-seed', help='seed of the first game, games use consecutive seeds',
+                        type=int, default=0)
+    parser.add_argument('-v', '--verbose', action='store_true', help='prints eliminations and outcomes')
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    spec_results, total_moves = play_free_for_all(args.players, args.arena_size,
+                                                  range(args.starting_seed, args.starting_seed + args.num_games),
+                                                  verbose=args.verbose)
+    elapsed_time = time.perf_counter() - start_time
+    print(f'{"player":<20} {"games":>6} {"wins":>6} {"draws":>6} {"mean place":>11}')
+    for spec, (wins, draws, places, games) in spec_results.items():
+        print(f'{spec:<20} {games:>6} {wins:>6} {draws:>6} {places / games:>11.2f}')
+    print(f'{args.num_games} games in {elapsed_time:.1f}s ({total_moves / elapsed_time:.0f} player moves/s)')
@@ -0,0 +1,111 @@
+import numpy as np
+import random
+
+from area import BatchRegions
+from board import BOARD_DTYPE, starting_heads, EMPTY, P1_HEAD, P1_TAIL, P2_HEAD, P2_TAIL, COLLISION
+from players.BasePlayer import derive_player_seeds
+
+
+class BatchBlockade:
+    # many windowless games of Blockade simulated in lockstep with NumPy (mainly for bot tournaments)
+    # every game follows exactly the same rules as Blockade.process_move and its players get their own RNGs seeded
+    # like in Blockade, so a game with a given seed ends the same way as Blockade(..., seed=seed) with fresh players
+    def __init__(self, player1, player2, arena_size, seeds):
+        self.player1 = player1
+        self.player2 = player2
+        self.arena_size = arena_size
+        self.batch_size = len(seeds)
+        player_seeds = [derive_player_seeds(seed) for seed in seeds]
+        self.p1_rngs = [random.Random(player1_seed) for player1_seed, _ in player_seeds]
+        self.p2_rngs = [random.Random(player2_seed) for _, player2_seed in player_seeds]
+        if player1 is player2:
+            # a player playing against itself has one RNG (seeded last as player2 in Blockade)
+            self.p1_rngs = self.p2_rngs
+
+        # stacked int8 game matrices with the same internal encoding as Blockade (see board.py)
+        self.game_matrices = np.zeros((self.batch_size, self.arena_size, self.arena_size), dtype=BOARD_DTYPE)
+        # (B, 2) arrays of (y, x) head positions
+        p1_head, p2_head = starting_heads(self.arena_size)
+        self.p1_heads = np.tile(p1_head, (self.batch_size, 1))
+        self.p2_heads = np.tile(p2_head, (self.batch_size, 1))
+        self.game_matrices[:, p1_head[0], p1_head[1]] = P1_HEAD
+        self.game_matrices[:, p2_head[0], p2_head[1]] = P2_HEAD
+        self.collided = np.zeros(self.batch_size, dtype=bool)
+
+        # (y, x) offsets in the same order as Blockade.move_dict: up, down, left, right
+        self.move_offsets = np.array([(-1, 0), (1, 0), (0, -1), (0, 1)])
+        self.move_counters = np.zeros(self.batch_size, dtype=int)
+        self.max_number_of_moves = (self.arena_size**2 - 2) // 2  # every move fills 2 tiles
+        # game outcomes like in Blockade.process_move: 0 - draw, 1 - player1 won, 2 - player2 won; -1 - unfinished
+        self.outcomes = np.full(self.batch_size, -1, dtype=np.int8)
+
+        self.player1.reset_batch(self.batch_size)
+        self.player2.reset_batch(self.batch_size)
+
+    def find_possible_moves(self, game_ids, heads):
+        # (B, 4) boolean mask of possible moves of the selected games
+        targets = heads[:, None, :] + self.move_offsets[None, :, :]
+        inside = ((targets >= 0) & (targets < self.arena_size)).all(axis=2)
+        y = np.clip(targets[:, :, 0], 0, self.arena_size - 1)
+        x = np.clip(targets[:, :, 1], 0, self.arena_size - 1)
+        free = self.game_matrices[game_ids[:, None], y, x] == EMPTY
+        # heads are gone after a head collision
+        return inside & free & ~self.collided[game_ids, None]
+
+    def process_move(self):
+        # plays one move in every unfinished game, returns the number of games which are still unfinished
+        game_ids = np.flatnonzero(self.outcomes == -1)
+
+        # gather possible moves
+        p1_possible_moves = self.find_possible_moves(game_ids, self.p1_heads[game_ids])
+        p2_possible_moves = self.find_possible_moves(game_ids, self.p2_heads[game_ids])
+
+        # if no possible moves: player loses; if both don't have possible moves: draw; else: continue game
+        p1_stuck = ~p1_possible_moves.any(axis=1)
+        p2_stuck = ~p2_possible_moves.any(axis=1)
+        self.outcomes[game_ids[p1_stuck & p2_stuck]] = 0
+        self.outcomes[game_ids[p1_stuck & ~p2_stuck]] = 2
+        self.outcomes[game_ids[~p1_stuck & p2_stuck]] = 1
+
+        # both players have possible moves - ask the players to select their moves
+        playing = ~(p1_stuck | p2_stuck)
+        game_ids = game_ids[playing]
+        if len(game_ids) == 0:
+            return 0
+        p1_possible_moves = p1_possible_moves[playing]
+        p2_possible_moves = p2_possible_moves[playing]
+        self.move_counters[game_ids] += 1
+        if self.move_counters[game_ids].max() > self.max_number_of_moves:
+            raise RuntimeError(f'counted moves than should be possible: {self.move_counters[game_ids].max()} '
+                               f'(should be less than {self.max_number_of_moves})')
+
+        game_matrices = self.game_matrices[game_ids]
+        regions = BatchRegions(game_matrices)
+        p1_heads = self.p1_heads[game_ids]
+        p2_heads = self.p2_heads[game_ids]
+        p1_moves = self.player1.get_moves(game_matrices, regions, p1_possible_moves, p1_heads, p2_heads,
+                                          self.move_offsets, [self.p1_rngs[i] for i in game_ids], game_ids)
+        p2_moves = self.player2.get_moves(game_matrices, regions, p2_possible_moves, p2_heads, p1_heads,
+                                          self.move_offsets, [self.p2_rngs[i] for i in game_ids], game_ids)
+
+        # update player1
+        self.game_matrices[game_ids, p1_heads[:, 0], p1_heads[:, 1]] = P1_TAIL
+        p1_heads = p1_heads + self.move_offsets[p1_moves]
+        self.game_matrices[game_ids, p1_heads[:, 0], p1_heads[:, 1]] = P1_HEAD
+        self.p1_heads[game_ids] = p1_heads
+        # update player2
+        self.game_matrices[game_ids, p2_heads[:, 0], p2_heads[:, 1]] = P2_TAIL
+        p2_heads = p2_heads + self.move_offsets[p2_moves]
+        self.game_matrices[game_ids, p2_heads[:, 0], p2_heads[:, 1]] = P2_HEAD
+        self.p2_heads[game_ids] = p2_heads
+        # edge case: players tried to move to the same tile (head collision)
+        collisions = (p1_heads == p2_heads).all(axis=1)
+        self.game_matrices[game_ids[collisions], p1_heads[collisions, 0], p1_heads[collisions, 1]] = COLLISION
+        self.collided[game_ids[collisions]] = True
+        return len(game_ids)
+
+    def run(self):
+        # plays all games until the end, returns the array of outcomes
+        while self.process_move() > 0:
+            pass
+        return self.outcomes
@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from blockade import Blockade
+from encoding import ObservationEncoder
+from tournament import create_spec_player
+
+# performance benchmarks of the engine, the bots and the RL environment
+# results are {benchmark name: {'value': ..., 'unit': ..., 'higher_is_better': ...}} saved as JSON, so a run can be
+# compared against a stored baseline (any earlier results file) and regressions can be flagged
+SUITES = ('games', 'moves', 'env', 'encoding')
+
+
+def result(value, unit, higher_is_better):
+    return {'value': float(value), 'unit': unit, 'higher_is_better': higher_is_better}
+
+
+def benchmark_games(player1_spec, player2_spec, arena_size, seeds):
+    # games/second and moves/second of run_windowless (fresh players for every game like in the tournament runner,
+    # creating them isn't timed)
+    elapsed_time = 0.0
+    moves = 0
+    for seed in seeds:
+        game = Blockade(create_spec_player(player1_spec), create_spec_player(player2_spec), arena_size, verbose=False,
+                        seed=seed)
+        start_time = time.perf_counter()
+        game.run_windowless()
+        elapsed_time += time.perf_counter() - start_time
+        moves += game.move_counter
+    prefix = f'games/{player1_spec}-vs-{player2_spec}/{arena_size}'
+    return {f'{prefix}/games_per_second': result(len(seeds) / elapsed_time, 'games/s', True),
+            f'{prefix}/moves_per_second': result(moves / elapsed_time, 'moves/s', True)}
+
+
+def benchmark_moves(player_spec, opponent_spec, arena_size, seeds, percentiles=(50, 90, 99)):
+    # latency percentiles of the player's get_move (in milliseconds) measured in games against the opponent
+    latencies = []
+    for seed in seeds:
+        player = create_spec_player(player_spec)
+        get_move = player.get_move
+
+        def timed_get_move(*args, **kwargs):
+            start_time = time.perf_counter()
+            move = get_move(*args, **kwargs)
+            latencies.append(time.perf_counter() - start_time)
+            return move
+
+        player.get_move = timed_get_move
+        Blockade(player, create_spec_player(opponent_spec), arena_size, verbose=False, seed=seed).run_windowless()
+    prefix = f'moves/{player_spec}/{arena_size}'
+    results = {f'{prefix}/p{percentile}_ms': result(np.percentile(latencies, percentile) * 1000, 'ms', False)
+               for percentile in percentiles}
+    results[f'{prefix}/max_ms'] = result(np.max(latencies) * 1000, 'ms', False)
+    return results
+
+
+def benchmark_env(arena_size, steps, seed=0):
+    # BlockadeEnv.step steps/second with random actions (games are reset when they end, resets are timed too)
+    from env import BlockadeEnv
+    env = BlockadeEnv(arena_size)
+    rng = random.Random(seed)
+    actions = [{agent: rng.randrange(4) for agent in env.possible_agents} for _ in range(steps)]
+    env.reset()
+    start_time = time.perf_counter()
+    for step_actions in actions:
+        _, _, terminations, truncations, _ = env.step(step_actions)
+        if any(terminations.values()) or any(truncations.values()):
+            env.reset()
+    elapsed_time = time.perf_counter() - start_time
+    return {f'env/{arena_size}/steps_per_second': result(steps / elapsed_time, 'steps/s', True)}
+
+
+def benchmark_encoding(arena_size, repetitions, model_size=None, seed=0):
+    # cost of translating a game matrix to observations (a mid-game arena of a random game)
+    game = Blockade(create_spec_player('random'), create_spec_player('random'), arena_size, verbose=False, seed=seed)
+    for _ in range(arena_size):
+        if game.process_move() is not None:
+            break
+    encoder = ObservationEncoder(model_size)
+    results = dict()
+    for name, encode in (('encode', lambda: encoder.encode(game.game_matrix, 1, game.p1_head)),
+                         ('encode_both', lambda: encoder.encode_both(game.game_matrix))):
+        encode()
+        start_time = time.perf_counter()
+        for _ in range(repetitions):
+            encode()
+        elapsed_time = time.perf_counter() - start_time
+        results[f'encoding/{arena_size}/{name}_us'] = result(elapsed_time / repetitions * 1e6, 'us', False)
+    return results
+
+
+def run_benchmarks(suites=SUITES, player_specs=('random', 'heuristic', 'optimized'), arena_sizes=(10, 15, 20),
+                   num_games=20, env_steps=20000, encoding_repetitions=10000, verbose=True):
+    results = dict()
+    seeds = range(num_games)
+    jobs = []
+    for arena_size in arena_sizes:
+        if 'games' in suites:
+            jobs += [(benchmark_games, (spec1, spec2, arena_size, seeds)) for spec1 in player_specs
+                     for spec2 in player_specs]
+        if 'moves' in suites:
+            jobs += [(benchmark_moves, (spec, spec, arena_size, seeds)) for spec in player_specs]
+        if 'env' in suites:
+            jobs.append((benchmark_env, (arena_size, env_steps)))
+        if 'encoding' in suites:
+            jobs.append((benchmark_encoding, (arena_size, encoding_repetitions)))
+    for benchmark, arguments in jobs:
+        job_results = benchmark(*arguments)
+        if verbose:
+            for name, value in job_results.items():
+                print(f'{name}: {value["value"]:.3f} {value["unit"]}', flush=True)
+        results.update(job_results)
+    return results
+
+
+def compare_results(results, baseline, tolerance=0.1):
+    # benchmarks which are worse than in the baseline by more than the tolerance (relative):
+    # {name: (baseline value, value, relative change)}
+    regressions = dict()
+    for name, current in results.items():
+        if name not in baseline or baseline[name]['value'] == 0:
+            continue
+        change = (current['value'] - baseline[name]['value']) / baseline[name]['value']
+        if (change < -tolerance) if current['higher_is_better'] else (change > tolerance):
+            regressions[name] = (baseline[name]['value'], current['value'], change)
+    return regressions
+
+
+def machine_info():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+            'processor': platform.processor(), 'time': time.strftime('%Y-%m-%d %H:%M:%S')}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-b', '--suites', nargs='+', help='benchmark suites', choices=SUITES, default=list(SUITES))
+    parser.add_argument('-p', '--players', nargs='+', help='player specs (see tournament.py)',
+                        default=['random', 'heuristic', 'optimized'])
+    parser.add_argument('-a', '--arena-sizes', nargs='+', help='sizes of the square game arena (in tiles)', type=int,
+                        default=[10, 15, 20])
+    parser.add_argument('-n', '--num-games', help='number of games per benchmark', type=int, default=20)
+    parser.add_argument('--env-steps', help='number of environment steps', type=int, default=20000)
+    parser.add_argument('--encoding-repetitions', help='number of timed encodings', type=int, default=10000)
+    parser.add_argument('-o', '--output', help='JSON file for the results', default=None)
+    parser.add_argument('-c', '--baseline', help='JSON results of an earlier run to compare with', default=None)
+    parser.add_argument('-t', '--tolerance', help='allowed relative slowdown against the baseline', type=float,
+                        default=0.1)
+    args = parser.parse_args()
+
+    benchmark_results = run_benchmarks(suites=args.suites, player_specs=args.players, arena_sizes=args.arena_sizes,
+                                       num_games=args.num_games, env_steps=args.env_steps,
+                                       encoding_repetitions=args.encoding_repetitions)
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump({'machine': machine_info(), 'results': benchmark_results}, file, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline_results = json.load(file)['results']
+        found_regressions = compare_results(benchmark_results, baseline_results, args.tolerance)
+        for regression_name, (baseline_value, value, relative_change) in found_regressions.items():
+            print(f'REGRESSION {regression_name}: {baseline_value:.3f} -> {value:.3f} ({relative_change:+.1%})')
+        if found_regressions:
+            sys.exit(1)
+        print(f'No regressions against {args.baseline} (tolerance {args.tolerance:.0%})')
@@ -1,55 +1,89 @@
 import argparse
-import arcade
+import importlib
 import numpy as np
-import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, wait
+from functools import partial
 
+from board import Board, starting_heads, EMPTY, P1_HEAD, P1_TAIL, P2_HEAD, P2_TAIL, COLLISION
+from players.BasePlayer import derive_player_seeds
 from players.HumanPlayer import HumanPlayer
-from players.RandomBot import RandomBot
-from players.HeuristicBot import HeuristicBot
-from players.OptimizedBot import OptimizedBot
-from players.ReinforcementLearningBot import ReinforcementLearningBot
+from replay import GameRecord, ReplayWriter
+from stats import GameStats
 
 
 class Blockade:
-    def __init__(self, player1, player2, arena_size, verbose):
+    def __init__(self, player1, player2, arena_size, verbose, seed=None, replay_writer=None, player_specs=None,
+                 collect_stats=False, move_time_limit=None):
         # command line arguments init
         self.player1 = player1
         self.player2 = player2
         self.arena_size = arena_size
         self.verbose = verbose
+        # finished games are appended to the replay_writer (e.g. replay.ReplayWriter or a list) as GameRecords,
+        # player_specs are the names of the players in the record (by default: names of their classes)
+        self.replay_writer = replay_writer
+        self.player_specs = player_specs if player_specs is not None else (str(player1), str(player2))
+        self.move_history = [] if replay_writer is not None else None
+        # optional instrumentation (see stats.py): time of the move phases and the players' counters
+        # the players report their counters to their own part of the game stats (player.stats)
+        self.stats = GameStats() if collect_stats else None
+        self.player1.stats = self.stats.players[0] if collect_stats else None
+        self.player2.stats = self.stats.players[1] if collect_stats else None
+        # optional limit of the time of every get_move call (in seconds): both players select their moves at the same
+        # time on their own worker threads and get the limit as their time_budget (a player playing against itself
+        # selects both moves one after another, each of them gets half of the limit), a move which isn't selected in
+        # time is cancelled (player.move_cancelled is set), replaced by the player's fallback_move and recorded in
+        # overruns as (move number, player number); the late result is discarded and the player is told which move
+        # was made instead (player.move_replaced), as soon as its late get_move returns
+        # threads can't be killed: the next move of a player which is still busy with a late move (e.g. a bot which
+        # doesn't check move_cancelled) waits for it, and a move which is cancelled before it starts is skipped
+        self.move_time_limit = move_time_limit
+        self.move_executors = None
+        self.overruns = []
+
+        # a game seed reseeds the RNGs of both players (each player gets its own seed derived from it), so the game
+        # is repeatable no matter which RNGs the players were created with
+        # without a seed the players keep their RNGs as they are (e.g. RNGs seeded by the caller and injected with
+        # BasePlayer(rng=...)), like in arena.LargeArena; such games are recorded without a seed (see replay.py)
+        self.seed = seed
+        if seed is not None:
+            player1_seed, player2_seed = derive_player_seeds(seed)
+            self.player1.seed(player1_seed)
+            self.player2.seed(player2_seed)
 
         # game init
-        self.game_matrix = np.zeros((self.arena_size, self.arena_size), dtype=int)
-        # game matrix internal encoding:
+        # int8 game matrix internal encoding (see board.py):
         #  0 - empty
         #  1 - player1 head
         # -1 - player1 tail
         #  2 - player2 head
         # -2 - player2 tail
-        # 999 - player collision
-        self.starting_position = int(self.arena_size / 4)
-        # player1 starts in the bottom-right corner
-        self.game_matrix[self.arena_size - self.starting_position - 1, self.arena_size - self.starting_position - 1] = 1
-        # player2 starts in the upper-left corner
-        self.game_matrix[self.starting_position, self.starting_position] = 2
+        # 127 - player collision
+        self.board = Board.start(self.arena_size)
+        self.game_matrix = self.board.game_matrix
+        # head positions are (y, x) tuples updated with every move, so they never have to be searched for
+        # None means that the head is gone (after a head collision)
+        # player1 starts in the bottom-right corner, player2 starts in the upper-left corner
+        self.p1_head, self.p2_head = starting_heads(self.arena_size)
 
         self.move_dict = {'up': (-1, 0), 'down': (1, 0), 'left': (0, -1), 'right': (0, 1)}  # (y, x) offset tuples
         self.move_counter = 0
-        self.max_number_of_moves = int(np.ceil(self.arena_size**2 / 2.0) - 2)
+        self.max_number_of_moves = (self.arena_size**2 - 2) // 2  # every move fills 2 tiles
 
     def find_possible_moves(self, head):
         possible_moves = dict()
-        # no head found - no possible moves
-        if len(head[0]) == 0 or len(head[1]) == 0:
+        # no head - no possible moves
+        if head is None:
             return possible_moves
 
-        for move in self.move_dict.keys():
+        for move, offset in self.move_dict.items():
+            y = head[0] + offset[0]
+            x = head[1] + offset[1]
             # check y borders and x borders and free tile
-            if self.game_matrix.shape[0]-1 >= head[0] + self.move_dict[move][0] >= 0 \
-                    and self.game_matrix.shape[1]-1 >= head[1] + self.move_dict[move][1] >= 0 \
-                    and self.game_matrix[head[0] + self.move_dict[move][0], head[1] + self.move_dict[move][1]] == 0:
-                possible_moves[move] = self.move_dict[move]
+            if self.arena_size > y >= 0 and self.arena_size > x >= 0 and self.game_matrix[y, x] == EMPTY:
+                possible_moves[move] = offset
         return possible_moves
 
     def check_human_trying_impossible_move(self, player, possible_moves):
@@ -63,55 +97,159 @@ class Blockade:
         # 0 - draw
         # 1 - player1 won
         # 2 - player2 won
+        # the move is made in phases which are timed when stats are collected
+        stats = self.stats
+        if stats is not None:
+            phase_start = time.perf_counter()
 
         # gather possible moves
-        p1_head = np.where(self.game_matrix == 1)
-        p1_possible_moves = self.find_possible_moves(p1_head)
-        p2_head = np.where(self.game_matrix == 2)
-        p2_possible_moves = self.find_possible_moves(p2_head)
-
-        # if no possible moves: player loses; if both don't have possible moves: draw; else: continue game
-        if (len(p1_possible_moves) == 0 or self.check_human_trying_impossible_move(self.player1, p1_possible_moves)) \
-                and (len(p2_possible_moves) == 0 or self.check_human_trying_impossible_move(self.player2,
-                                                                                            p2_possible_moves)):
+        p1_possible_moves = self.find_possible_moves(self.p1_head)
+        p2_possible_moves = self.find_possible_moves(self.p2_head)
+        if stats is not None:
+            phase_start = stats.add_time('possible_moves', phase_start)
+
+        outcome = self.check_outcome(p1_possible_moves, p2_possible_moves)
+        if outcome is not None:
+            return self.finish_game(outcome)
+        elif (isinstance(self.player1, HumanPlayer) and self.player1.current_direction is None) \
+                or (isinstance(self.player2, HumanPlayer) and self.player2.current_direction is None):
+            # at least one of the players is human and didn't make the first move yet
+            if self.verbose:
+                print('Waiting for human input!', flush=True)
+            return None
+
+        # both players have possible moves - ask the players to select their moves
+        self.move_counter += 1
+        if stats is not None:
+            phase_start = time.perf_counter()
+        if self.move_time_limit is None:
+            p1_move = self.player1.get_move(self.game_matrix, p1_possible_moves, self.p1_head, self.p2_head)
+            if stats is not None:
+                phase_start = stats.players[0].add_time('get_move', phase_start)
+            p2_move = self.player2.get_move(self.game_matrix, p2_possible_moves, self.p2_head, self.p1_head)
+            if stats is not None:
+                phase_start = stats.players[1].add_time('get_move', phase_start)
+        else:
+            p1_move, p2_move = self.get_limited_moves((p1_possible_moves, p2_possible_moves))
+            if stats is not None:
+                phase_start = time.perf_counter()
+        if self.move_counter > self.max_number_of_moves:
+            raise RuntimeError(f'counted moves than should be possible: {self.move_counter} '
+                               f'(should be less than {self.max_number_of_moves})')
+        if self.verbose:
+            print(f'Move {self.move_counter}: '.ljust(10) + f'Player1 goes {p1_move}\tPlayer2 goes {p2_move}',
+                  flush=True)
+        if self.move_history is not None:
+            self.move_history.append((p1_move, p2_move))
+
+        self.update_board(p1_move, p2_move)
+        if stats is not None:
+            phase_start = stats.add_time('board_update', phase_start)
+        self.handle_collision()
+        if stats is not None:
+            stats.add_time('collision', phase_start)
+        return None
+
+    def get_limited_moves(self, possible_moves):
+        # moves of both players limited to move_time_limit seconds, selected at the same time on their worker threads
+        if self.move_executors is None:
+            # a player playing against itself selects its moves one after another on a single thread
+            self.move_executors = (ThreadPoolExecutor(max_workers=1), ThreadPoolExecutor(max_workers=1)) \
+                if self.player1 is not self.player2 else (ThreadPoolExecutor(max_workers=1),) * 2
+        players = (self.player1, self.player2)
+        heads = (self.p1_head, self.p2_head)
+        # in self-play each of the two moves gets half of the limit from the moment it starts
+        self_play = self.player1 is self.player2
+        time_budget = self.move_time_limit / 2 if self_play else self.move_time_limit
+        start_time = time.perf_counter()
+        deadline = start_time + time_budget
+        # the players get copies of the arena, so a late move never sees the arena changing
+        cancel_events = (threading.Event(), threading.Event())
+        selected_moves = [self.move_executors[i].submit(select_limited_move, player, cancel_events[i],
+                                                        self.game_matrix.copy(), possible_moves[i], heads[i],
+                                                        heads[1 - i], time_budget)
+                          for i, player in enumerate(players)]
+        moves = [None, None]
+        for i, player in enumerate(players):
+            if i == 1 and self_play:
+                # player2's move starts on the same thread as soon as player1's move returns (a cancelled move of a bot
+                # which checks move_cancelled returns right away), a move which can't start before the end of the
+                # limit is late
+                player1_done, _ = wait(selected_moves[:1], timeout=max(start_time + self.move_time_limit
+                                                                  - time.perf_counter(), 0.0))
+                deadline = time.perf_counter() + (time_budget if player1_done else 0.0)
+            try:
+                moves[i] = selected_moves[i].result(timeout=max(deadline - time.perf_counter(), 0.0))
+            except TimeoutError:
+                cancel_events[i].set()
+        for i, player in enumerate(players):
+            if moves[i] is None:
+                moves[i] = player.fallback_move(possible_moves[i])
+                # the late get_move is followed by move_replaced on the player's worker thread (or right away if it
+                # has just returned), so the player's next get_move always starts from the move which was made
+                selected_moves[i].add_done_callback(partial(replace_late_move, player, moves[i]))
+                self.overruns.append((self.move_counter, i + 1))
+                if self.stats is not None:
+                    self.stats.players[i].count('overruns')
+                if self.verbose:
+                    print(f'Player{i + 1} didn`t select a move in {self.move_time_limit}s, '
+                          f'fallback move "{moves[i]}" is made instead', flush=True)
+        return moves
+
+    def check_outcome(self, p1_possible_moves, p2_possible_moves):
+        # if no possible moves: player loses; if both don't have possible moves: draw; else: continue game (None)
+        p1_lost = len(p1_possible_moves) == 0 \
+            or self.check_human_trying_impossible_move(self.player1, p1_possible_moves)
+        p2_lost = len(p2_possible_moves) == 0 \
+            or self.check_human_trying_impossible_move(self.player2, p2_possible_moves)
+        if p1_lost and p2_lost:
             if self.verbose:
                 print('Draw!')
             return 0
-        elif len(p1_possible_moves) == 0 or self.check_human_trying_impossible_move(self.player1, p1_possible_moves):
+        elif p1_lost:
             if self.verbose:
                 print('Player 2 wins!')
             return 2
-        elif len(p2_possible_moves) == 0 or self.check_human_trying_impossible_move(self.player2, p2_possible_moves):
+        elif p2_lost:
             if self.verbose:
                 print('Player 1 wins!')
             return 1
-        elif (isinstance(self.player1, HumanPlayer) and self.player1.current_direction is None) \
-                or (isinstance(self.player2, HumanPlayer) and self.player2.current_direction is None):
-            # at least one of the players is human and didn't make the first move yet
-            if self.verbose:
-                print('Waiting for human input!', flush=True)
-        else:
-            # both players have possible moves - ask the players to select their moves
-            self.move_counter += 1
-            p1_move = self.player1.get_move(self.game_matrix, p1_possible_moves, p1_head, p2_head)
-            p2_move = self.player2.get_move(self.game_matrix, p2_possible_moves, p2_head, p1_head)
-            if self.move_counter > self.max_number_of_moves:
-                raise RuntimeError(f'counted moves than should be possible: {self.move_counter} '
-                                   f'(should be less than {self.max_number_of_moves})')
-            if self.verbose:
-                print(f'Move {self.move_counter}: '.ljust(10) + f'Player1 goes {p1_move}\tPlayer2 goes {p2_move}',
-                      flush=True)
-            # update player1
-            self.game_matrix[p1_head[0], p1_head[1]] = -1
-            self.game_matrix[p1_head[0] + self.move_dict[p1_move][0], p1_head[1] + self.move_dict[p1_move][1]] = 1
-            # update player2
-            self.game_matrix[p2_head[0], p2_head[1]] = -2
-            self.game_matrix[p2_head[0] + self.move_dict[p2_move][0], p2_head[1] + self.move_dict[p2_move][1]] = 2
-            # edge case: players tried to move to the same tile (head collision)
-            if p1_head[0] + self.move_dict[p1_move][0] == p2_head[0] + self.move_dict[p2_move][0] \
-                    and p1_head[1] + self.move_dict[p1_move][1] == p2_head[1] + self.move_dict[p2_move][1]:
-                self.game_matrix[p1_head[0] + self.move_dict[p1_move][0], p1_head[1] + self.move_dict[p1_move][1]] = 999
-            return None
+        return None
+
+    def update_board(self, p1_move, p2_move):
+        # update player1
+        self.board.set(self.p1_head, P1_TAIL)
+        self.p1_head = (self.p1_head[0] + self.move_dict[p1_move][0], self.p1_head[1] + self.move_dict[p1_move][1])
+        self.board.set(self.p1_head, P1_HEAD)
+        # update player2
+        self.board.set(self.p2_head, P2_TAIL)
+        self.p2_head = (self.p2_head[0] + self.move_dict[p2_move][0], self.p2_head[1] + self.move_dict[p2_move][1])
+        self.board.set(self.p2_head, P2_HEAD)
+
+    def handle_collision(self):
+        # edge case: players tried to move to the same tile (head collision)
+        if self.p1_head == self.p2_head:
+            self.board.set(self.p1_head, COLLISION)
+            self.p1_head = None
+            self.p2_head = None
+
+    def finish_game(self, outcome):
+        # the players are closed (see BasePlayer.close) and the finished game is recorded (if there is a replay writer)
+        if self.stats is not None:
+            self.stats.games += 1
+            self.stats.moves += self.move_counter
+        if self.move_executors is not None:
+            # late moves which are still running are already cancelled, the game waits until they return, so no
+            # thread of the game keeps running after it
+            for executor in set(self.move_executors):
+                executor.shutdown(wait=True)
+            self.move_executors = None
+        for player in {self.player1, self.player2}:
+            player.close()
+        if self.replay_writer is not None:
+            self.replay_writer.append(GameRecord.from_moves(self.arena_size, *self.player_specs, self.seed,
+                                                            outcome, self.move_history))
+        return outcome
 
     def run_windowless(self):
         # mainly for fast bot testing, uses no Arcade backend
@@ -127,127 +265,47 @@ class Blockade:
         return outcome
 
 
-class BlockadeWindowed(Blockade, arcade.Window):
-    # visual mode for humans playing against bots or observing bots fighting against each other
-    def __init__(self, player1, player2, arena_size, tile_size, game_speed, mute_sound, verbose):
-        # arcade init
-        # size of the window depends on the arena and tile size but is limited by the screen resolution
-        max_width = min(arena_size * tile_size, int(arcade.window_commands.get_display_size()[0]))
-        max_height = min(arena_size * tile_size, int(arcade.window_commands.get_display_size()[1]))
-        self.actual_window_size = min(max_width, max_height)
-        self.actual_tile_size = self.actual_window_size / arena_size
-        arcade.Window.__init__(self, width=self.actual_window_size, height=self.actual_window_size, title='Blockade')
-        self.background_color = arcade.color.ARSENIC
-
-        # blockade init
-        Blockade.__init__(self, player1, player2, arena_size, verbose)
-        self.game_over = False
-        self.tile_size = tile_size
-        self.game_speed = game_speed
-        self.speed_change_step = 1.0
-        self.max_speed = 60.0
-        self.frame_mod = int(np.round(self.max_speed / self.game_speed))
-        self.frame_counter = 0
-        self.mute_sound = mute_sound
-        self.tile_colors = {1: (0, 153, 51), -1: (0, 204, 68), 2: (204, 0, 0), -2: (255, 51, 51),
-                            999: (204, 153, 51)}  # RGB colors
-        self.keys = {arcade.key.UP: 'up', arcade.key.DOWN: 'down', arcade.key.LEFT: 'left', arcade.key.RIGHT: 'right',
-                     arcade.key.W: 'up', arcade.key.S: 'down', arcade.key.A: 'left', arcade.key.D: 'right'}
-        self.sounds = {'move': arcade.load_sound(':resources:sounds/phaseJump1.wav'),
-                       'game_over': arcade.load_sound(':resources:sounds/gameover4.wav')}
-
-    def update_game_speed(self, new_speed):
-        self.game_speed = new_speed
-        self.frame_mod = int(np.round(self.max_speed / new_speed))
-
-    def on_key_press(self, symbol: int, modifiers: int):
-        # handling user input
-        # arrows
-        if symbol in [arcade.key.UP, arcade.key.DOWN, arcade.key.LEFT, arcade.key.RIGHT]:
-            if isinstance(self.player1, HumanPlayer) and self.player1.keyboard_input == 'arrows':
-                self.player1.current_direction = self.keys[symbol]
-            elif isinstance(self.player2, HumanPlayer) and self.player2.keyboard_input == 'arrows':
-                self.player2.current_direction = self.keys[symbol]
-            elif self.verbose:
-                print(f'No player uses arrows!', flush=True)
-        # WSAD
-        elif symbol in [arcade.key.W, arcade.key.S, arcade.key.A, arcade.key.D]:
-            if isinstance(self.player1, HumanPlayer) and self.player1.keyboard_input == 'wsad':
-                self.player1.current_direction = self.keys[symbol]
-            elif isinstance(self.player2, HumanPlayer) and self.player2.keyboard_input == 'wsad':
-                self.player2.current_direction = self.keys[symbol]
-            elif self.verbose:
-                print(f'No player uses WSAD!', flush=True)
-        # other keys
-        elif symbol == arcade.key.ESCAPE:
-            if self.verbose:
-                print('Premature exit on Escape.', flush=True)
-            self.exit_game()
-        elif symbol == arcade.key.EQUAL or symbol == arcade.key.NUM_ADD:
-            if self.game_speed <= self.max_speed - self.speed_change_step:
-                self.update_game_speed(self.game_speed + self.speed_change_step)
-                if self.verbose:
-                    print(f'Increased speed to {self.game_speed}.', flush=True)
-            else:
-                self.update_game_speed(self.max_speed)
-                if self.verbose:
-                    print(f'Speed too high to increase further: {self.game_speed}.', flush=True)
-        elif symbol == arcade.key.MINUS or symbol == arcade.key.NUM_SUBTRACT:
-            if self.game_speed > self.speed_change_step * 2:
-                self.update_game_speed(self.game_speed - self.speed_change_step)
-                if self.verbose:
-                    print(f'Decreased speed to {self.game_speed}.', flush=True)
-            else:
-                self.update_game_speed(self.speed_change_step)
-                if self.verbose:
-                    print(f'Speed too low to decrease further: {self.game_speed}.', flush=True)
-        elif symbol == arcade.key.M:
-            self.mute_sound = not self.mute_sound
-            if self.verbose:
-                if self.mute_sound:
-                    print(f'Sound muted.', flush=True)
-                else:
-                    print(f'Sound unmuted.', flush=True)
-        elif self.verbose:
-            print(f'Unknown keyboard input: {symbol}', flush=True)
-
-    def on_draw(self):
-        self.frame_counter += 1
-        if self.frame_counter % self.frame_mod == 0 and not self.game_over:
-            outcome = self.process_move()
-            if outcome is not None:
-                # game finished - exit
-                self.exit_game(sound=True)
-            else:
-                # play move sound
-                if not ((isinstance(self.player1, HumanPlayer) and self.player1.current_direction is None)
-                        or (isinstance(self.player2, HumanPlayer) and self.player2.current_direction is None)) \
-                        and not self.mute_sound:
-                    arcade.sound.play_sound(self.sounds['move'], volume=0.3, speed=self.game_speed ** 0.05)
-
-        # game matrix drawing
-        self.clear()
-        # y-axis is adjusted for different coordinate systems of np.array and Python Arcade (matrix vs Cartesian)
-        for y in range(self.game_matrix.shape[0]):
-            for x in range(self.game_matrix.shape[1]):
-                if self.game_matrix[y, x] != 0:
-                    arcade.draw_rectangle_filled(center_x=(x + 0.5) * self.actual_tile_size,
-                                                 center_y=(self.arena_size - y - 0.5) * self.actual_tile_size,
-                                                 width=self.actual_tile_size, height=self.actual_tile_size,
-                                                 color=self.tile_colors[self.game_matrix[y, x]])
-
-    def exit_game(self, sound=False):
-        self.game_over = True
-        if sound and not self.mute_sound:
-            arcade.sound.play_sound(self.sounds['game_over'], volume=0.2)
-        time.sleep(2.0 / self.game_speed)
-        arcade.exit()
+def select_limited_move(player, cancelled, game_matrix, possible_moves, my_coords, opponent_coords, time_budget):
+    # get_move of a game with a move time limit, called on the player's worker thread: cancelled is the event of this
+    # move (the player sees it as move_cancelled), a move which was cancelled before it started isn't selected at all
+    # the time of the call is added to the player's stats (if collected) here, so late moves count their whole time
+    if cancelled.is_set():
+        return None
+    player.move_cancelled = cancelled
+    start_time = time.perf_counter()
+    move = player.get_move(game_matrix, possible_moves, my_coords, opponent_coords, time_budget=time_budget)
+    if player.stats is not None:
+        player.stats.add_time('get_move', start_time)
+    return move
 
 
-if __name__ == '__main__':
-    player_types = {'arrows': HumanPlayer, 'wsad': HumanPlayer, 'random': RandomBot,
-                    'heuristic': HeuristicBot, 'optimized': OptimizedBot, 'rl': ReinforcementLearningBot}
+def replace_late_move(player, move, future):
+    # done callback of a late get_move (future is its finished Future), its result is discarded
+    player.move_replaced(move)
+
+
+# registry of player classes by their command line names: {player type: module in players/ with the same class name}
+# the modules are imported only when a player of that type is created, so importing this engine (e.g. in worker
+# processes) doesn't load arcade, stable-baselines3 or torch
+player_types = {'arrows': 'HumanPlayer', 'wsad': 'HumanPlayer', 'random': 'RandomBot',
+                'heuristic': 'HeuristicBot', 'optimized': 'OptimizedBot', 'rl': 'ReinforcementLearningBot',
+                'search': 'SearchBot', 'mcts': 'MCTSBot', 'frontier': 'FrontierBot'}
+
 
+def get_player_class(player_type):
+    class_name = player_types[player_type]
+    return getattr(importlib.import_module(f'players.{class_name}'), class_name)
+
+
+def create_player(player_type, verbose, **kwargs):
+    # creates a player from its command line name (extra keyword arguments are passed to the bot's constructor)
+    if get_player_class(player_type) == HumanPlayer:
+        return HumanPlayer(keyboard_input=player_type, verbose=verbose)
+    else:
+        return get_player_class(player_type)(verbose=verbose, **kwargs)
+
+
+if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('-p1', '--player1', help='type of the first player (green color)',
                         choices=player_types.keys(), default='arrows')
@@ -259,22 +317,25 @@ if __name__ == '__main__':
                         choices=range(15, 80, 5), default=50)
     parser.add_argument('-s', '--game-speed', help='game speed, number of moves per second (floats between 1.0-60.0)',
                         type=float, default=2.0)
-    parser.add_argument('-r', '--random-seed', help='RNG initialization seed, controls random behaviors of bots',
-                        type=int, default=42)
+    parser.add_argument('-r', '--random-seed', type=int, default=42,
+                        help='game seed, controls random behaviors of bots (each bot has its own RNG)')
     parser.add_argument('-m', '--mute-sound', action='store_true', help='mutes game sound effects')
     parser.add_argument('-w', '--window-hidden', action='store_true',
                         help='hides game window (sound and human players are not available in this mode)')
     parser.add_argument('-v', '--verbose', action='store_true',
                         help='verbosity switch, prints game info to the terminal')
+    parser.add_argument('-o', '--replay-file', help='appends the game to a replay file (see replay.py)', default=None)
+    parser.add_argument('-l', '--move-time-limit', help='time limit of every move of a bot (in seconds), a late bot '
+                        'makes a fallback move', type=float, default=None)
     args = parser.parse_args()
 
     # human players can't use the same input method
-    if player_types[args.player1] == HumanPlayer and player_types[args.player2] == HumanPlayer \
+    if get_player_class(args.player1) == HumanPlayer and get_player_class(args.player2) == HumanPlayer \
             and args.player1 == args.player2:
         raise ValueError(f'two human players can`t use the same input method: {args.player1}')
 
     # humans can't play when the window is not visible
-    if (player_types[args.player1] == HumanPlayer or player_types[args.player2] == HumanPlayer) \
+    if (get_player_class(args.player1) == HumanPlayer or get_player_class(args.player2) == HumanPlayer) \
             and args.window_hidden:
         raise ValueError(f'human player can`t play when the window is hidden: --window_hidden / -w')
 
@@ -282,36 +343,40 @@ if __name__ == '__main__':
     if args.game_speed < 1.0 or args.game_speed > 60.0:
         raise ValueError(f'game speed is not in interval <1.0, 60.0>: {args.game_speed}')
 
-    # create player1
-    if player_types[args.player1] == HumanPlayer:
-        init_player1 = HumanPlayer(keyboard_input=args.player1, verbose=args.verbose)
-    else:
-        init_player1 = player_types[args.player1](verbose=args.verbose)
-
-    # create player2
-    if player_types[args.player2] == HumanPlayer:
-        init_player2 = HumanPlayer(keyboard_input=args.player2, verbose=args.verbose)
-    else:
-        init_player2 = player_types[args.player2](verbose=args.verbose)
+    # create players
+    init_player1 = create_player(args.player1, verbose=args.verbose)
+    init_player2 = create_player(args.player2, verbose=args.verbose)
 
     if args.verbose:
         print(f'Starting a game of Blockade with parameters:', flush=True)
         for i, (key, value) in enumerate(vars(args).items()):
             print(f'\t{key} = {value}' + (',' if i < len(vars(args)) - 1 else ''), flush=True)
 
-    random.seed(args.random_seed)
+    replay_writer = ReplayWriter(args.replay_file) if args.replay_file is not None else None
     if args.window_hidden:
         game = Blockade(player1=init_player1,
                         player2=init_player2,
                         arena_size=args.arena_size,
-                        verbose=args.verbose)
+                        verbose=args.verbose,
+                        seed=args.random_seed,
+                        replay_writer=replay_writer,
+                        player_specs=(args.player1, args.player2),
+                        move_time_limit=args.move_time_limit)
         game.run_windowless()
     else:
+        # Arcade is loaded only for the visual mode
+        from window import BlockadeWindowed
         game = BlockadeWindowed(player1=init_player1,
                                 player2=init_player2,
                                 arena_size=args.arena_size,
                                 tile_size=args.tile_size,
                                 game_speed=args.game_speed,
                                 mute_sound=args.mute_sound,
-                                verbose=args.verbose)
+                                verbose=args.verbose,
+                                seed=args.random_seed,
+                                replay_writer=replay_writer,
+                                player_specs=(args.player1, args.player2),
+                                move_time_limit=args.move_time_limit)
         game.run()
+    if replay_writer is not None:
+        replay_writer.close()
@@ -0,0 +1,54 @@
+import numpy as np
+
+# game matrix internal encoding shared by Blockade, BlockadeEnv, BatchBlockade and the players
+EMPTY = 0
+P1_HEAD = 1
+P1_TAIL = -1
+P2_HEAD = 2
+P2_TAIL = -2
+COLLISION = 127  # player collision (the largest value which fits into int8)
+BOARD_DTYPE = np.int8  # one byte per tile
+
+
+def starting_heads(arena_size):
+    # player1 starts in the bottom-right corner, player2 starts in the upper-left corner
+    starting_position = int(arena_size / 4)
+    return (arena_size - starting_position - 1, arena_size - starting_position - 1), \
+        (starting_position, starting_position)
+
+
+def padded_cells(game_matrix):
+    # the arena as a flat bytearray padded with a blocked border (1 - blocked, 0 - empty) for fast pure Python search,
+    # tile (y, x) has index (y + 1) * (arena_size + 2) + x + 1
+    padded = np.ones((game_matrix.shape[0] + 2, game_matrix.shape[1] + 2), dtype=np.uint8)
+    padded[1:-1, 1:-1] = game_matrix != EMPTY
+    return bytearray(padded.tobytes())
+
+
+class Board:
+    # compact game arena: int8 game matrix
+    # (players and engines which only read the arena can use board.game_matrix directly)
+    def __init__(self, arena_size, game_matrix=None):
+        self.arena_size = arena_size
+        if game_matrix is None:
+            self.game_matrix = np.zeros((arena_size, arena_size), dtype=BOARD_DTYPE)
+        else:
+            self.game_matrix = np.asarray(game_matrix, dtype=BOARD_DTYPE)
+
+    @classmethod
+    def start(cls, arena_size):
+        # board with both players at their starting positions
+        board = cls(arena_size)
+        p1_head, p2_head = starting_heads(arena_size)
+        board.game_matrix[p1_head] = P1_HEAD
+        board.game_matrix[p2_head] = P2_HEAD
+        return board
+
+    def __getitem__(self, position):
+        return self.game_matrix[position]
+
+    def set(self, position, value):
+        self.game_matrix[position] = value
+
+    def copy(self):
+        return Board(self.arena_size, self.game_matrix.copy())
@@ -0,0 +1,177 @@
+import argparse
+import functools
+import multiprocessing
+import random
+import time
+from collections import Counter, OrderedDict
+import numpy as np
+
+from blockade import Blockade
+from board import EMPTY
+from replay import MOVES
+
+# position cache of the flood fill bots (HeuristicBot, OptimizedBot): every game starts from the same position,
+# so the first dozens of moves of a tournament repeat the same area and territory searches over and over
+# a position is keyed by a zobrist hash of the occupied tiles and both heads (from the bot's perspective) and maps to
+# the available areas and Voronoi territories behind its 4 moves - the searched values, not the bot's scores, so
+# the previous move and the bot's weights aren't part of the key and one cache serves all bots (the cheap scoring
+# and the random tie-breaks are still done by the bots, so games end exactly the same way with and without a cache)
+# positions are kept in an in-memory LRU and can be looked up in opening books: sorted numpy arrays of positions
+# which repeated in many games, built offline (python book.py ...) and memory-mapped when loaded
+BOOK_DTYPE = np.dtype([('key', '<u8'), ('areas', '<i2', (4,)), ('territories', '<i2', (4,))])
+NO_TERRITORY = np.iinfo(np.int16).min  # territories of a book position which weren't calculated
+
+
+class PositionCache:
+    # max_moves - only positions of the first max_moves moves of a game are cached (later positions hardly repeat)
+    # territories - calculates the territories of every new position, even for bots which don't use them
+    # (so the positions can be saved to a book for all bots)
+    def __init__(self, size=100000, book_paths=(), max_moves=40, territories=False):
+        self.size = size
+        self.max_tiles = 2 * (max_moves + 1)
+        self.territories = territories
+        self.entries = OrderedDict()  # {key: (areas, territories or None)} in the order of use
+        self.books = [np.load(path, mmap_mode='r') for path in book_paths]
+        self.book_keys = [book['key'] for book in self.books]
+        self.zobrist_keys = dict()  # {arena_size: (blocked tile keys, my head keys, opponent head keys)}
+        self.hits = 0
+        self.misses = 0
+
+    def arena_keys(self, arena_size):
+        # fixed per arena size (books are valid across processes and runs), keys of different arena sizes differ,
+        # so a book can hold positions of many arena sizes
+        if arena_size not in self.zobrist_keys:
+            zobrist_rng = random.Random(arena_size)
+            self.zobrist_keys[arena_size] = np.array([[zobrist_rng.getrandbits(64) for _ in range(arena_size ** 2)]
+                                                      for _ in range(3)], dtype=np.uint64)
+        return self.zobrist_keys[arena_size]
+
+    def position_key(self, game_matrix, my_coords, opponent_coords):
+        # None if the position is too late in the game to be cached
+        occupied = np.flatnonzero(game_matrix != EMPTY)
+        if len(occupied) > self.max_tiles:
+            return None
+        arena_size = game_matrix.shape[0]
+        blocked_keys, my_head_keys, opponent_head_keys = self.arena_keys(arena_size)
+        return int(np.bitwise_xor.reduce(blocked_keys[occupied])
+                   ^ my_head_keys[my_coords[0] * arena_size + my_coords[1]]
+                   ^ opponent_head_keys[opponent_coords[0] * arena_size + opponent_coords[1]])
+
+    def lookup(self, key):
+        # (areas, territories or None) of the 4 moves in MOVES order, None if the position is unknown
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            return entry
+        book_key = np.uint64(key)
+        for book, book_keys in zip(self.books, self.book_keys):
+            i = np.searchsorted(book_keys, book_key)
+            if i < len(book_keys) and book_keys[i] == book_key:
+                territories = book['territories'][i].tolist()
+                entry = (tuple(book['areas'][i].tolist()),
+                         tuple(territories) if territories[0] != NO_TERRITORY else None)
+                self.store(key, *entry)
+                return entry
+        return None
+
+    def store(self, key, areas, territories):
+        self.entries[key] = (areas, territories)
+        self.entries.move_to_end(key)
+        if self.size is not None and len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def move_features(self, player, game_matrix, possible_moves, my_coords, opponent_coords, territories):
+        # available areas and (if territories) Voronoi territories of the possible moves as {move: value} dicts
+        # (territories are 0 if not needed), searched by the player only if the position isn't cached
+        key = self.position_key(game_matrix, my_coords, opponent_coords)
+        entry = self.lookup(key) if key is not None else None
+        if entry is not None and (entry[1] is not None or not territories):
+            self.hits += 1
+            if player.stats is not None:
+                player.stats.count('position_cache_hits')
+            return {move: entry[0][MOVES.index(move)] for move in possible_moves}, \
+                {move: entry[1][MOVES.index(move)] if territories else 0 for move in possible_moves}
+
+        self.misses += 1
+        if player.stats is not None:
+            player.stats.count('position_cache_misses')
+        areas = player.calculate_move_areas(game_matrix, possible_moves, my_coords)
+        move_territories = player.calculate_move_territories(game_matrix, possible_moves, my_coords, opponent_coords) \
+            if territories or (self.territories and key is not None) else None
+        if key is not None:
+            # impossible moves have 0 area and territory
+            self.store(key, tuple(areas.get(move, 0) for move in MOVES),
+                       tuple(move_territories.get(move, 0) for move in MOVES) if move_territories is not None else None)
+        return areas, move_territories if territories else dict.fromkeys(possible_moves, 0)
+
+    def to_book(self, keys=None):
+        # sorted BOOK_DTYPE array of the cached positions (or only of the given keys)
+        keys = sorted(self.entries if keys is None else keys)
+        book = np.zeros(len(keys), dtype=BOOK_DTYPE)
+        for i, key in enumerate(keys):
+            areas, territories = self.entries[key]
+            book[i] = (key, areas, territories if territories is not None else (NO_TERRITORY,) * 4)
+        return book
+
+
+@functools.lru_cache(maxsize=None)
+def process_cache(book_paths=(), size=100000, max_moves=40):
+    # one cache per process shared by the games it plays (e.g. a tournament worker), books are loaded once
+    return PositionCache(size=size, book_paths=book_paths, max_moves=max_moves)
+
+
+def collect_positions(game, max_moves=40):
+    # plays a game with a fresh cache which calculates all territories, returns the cached positions as a book
+    from tournament import create_spec_player
+    player1_spec, player2_spec, arena_size, seed = game
+    cache = PositionCache(size=None, max_moves=max_moves, territories=True)
+    player1 = create_spec_player(player1_spec)
+    player2 = create_spec_player(player2_spec)
+    player1.position_cache = cache
+    player2.position_cache = cache
+    Blockade(player1=player1, player2=player2, arena_size=arena_size, verbose=False, seed=seed).run_windowless()
+    return cache.to_book()
+
+
+def build_book(player_specs, arena_sizes, seeds, max_moves=40, min_count=2, processes=None):
+    # plays all pairs of players on every seed and arena size, returns the book of the positions which were
+    # reached in at least min_count games
+    games = [(spec1, spec2, arena_size, seed) for arena_size in arena_sizes for spec1 in player_specs
+             for spec2 in player_specs for seed in seeds]
+    collect = functools.partial(collect_positions, max_moves=max_moves)
+    if processes == 1:
+        game_books = list(map(collect, games))
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            game_books = pool.map(collect, games, chunksize=16)
+    counts = Counter(key for game_book in game_books for key in game_book['key'].tolist())
+    positions = np.concatenate(game_books)
+    _, first_indices = np.unique(positions['key'], return_index=True)
+    positions = positions[first_indices]
+    return positions[np.array([counts[key] >= min_count for key in positions['key'].tolist()], dtype=bool)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('output', help='path of the book (.npy file)')
+    parser.add_argument('-p', '--players', nargs='+', help='player specs of the games (see tournament.py)',
+                        default=['heuristic', 'optimized'])
+    parser.add_argument('-a', '--arena-sizes', nargs='+', help='sizes of the square game arena (in tiles)', type=int,
+                        default=[15])
+    parser.add_argument('-n', '--num-seeds', help='number of games per pair of players', type=int, default=200)
+    parser.add_argument('-r', '--starting-seed', help='seed of the first game, games use consecutive seeds',
+                        type=int, default=0)
+    parser.add_argument('-m', '--max-moves', help='positions of the first max_moves moves are collected', type=int,
+                        default=40)
+    parser.add_argument('-c', '--min-count', help='minimal number of games in which a position was reached',
+                        type=int, default=2)
+    parser.add_argument('-j', '--processes', help='number of worker processes (default: number of CPUs)', type=int,
+                        default=None)
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    opening_book = build_book(args.players, args.arena_sizes,
+                              range(args.starting_seed, args.starting_seed + args.num_seeds), max_moves=args.max_moves,
+                              min_count=args.min_count, processes=args.processes)
+    np.save(args.output, opening_book)
+    print(f'Saved {len(opening_book)} positions to {args.output} ({time.perf_counter() - start_time:.1f}s)')
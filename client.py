@@ -0,0 +1,144 @@
+import argparse
+import multiprocessing
+import socket
+
+from board import Board, starting_heads, P1_HEAD, P2_HEAD, COLLISION
+from tournament import create_spec_player
+
+# bot client of the match server (see server.py for the protocol): wraps any player from players/ and answers
+# the move requests of all its games (every game gets a fresh player from player_factory)
+MOVE_OFFSETS = {'u': ('up', (-1, 0)), 'd': ('down', (1, 0)), 'l': ('left', (0, -1)), 'r': ('right', (0, 1))}
+OFFSET_MOVES = {offset: move for move, offset in MOVE_OFFSETS.values()}
+
+
+class ClientGame:
+    # the game as seen by one player: a local copy of the arena updated with the deltas sent by the server
+    # every request after the first one follows a single move of both players, a move of the player which differs
+    # from its reply (a late or skipped request, replaced by the server's fallback move) is passed to move_replaced
+    def __init__(self, player, arena_size, player_number):
+        self.player = player
+        self.player_number = player_number
+        self.board = Board.start(arena_size)
+        self.heads = list(starting_heads(arena_size))  # player1 head, player2 head
+        self.reply = None  # the move sent for the last request (None if it wasn't answered)
+
+    def apply_delta(self, delta):
+        if delta == '-':
+            return
+        my_head = self.heads[self.player_number - 1]
+        for tile in delta.split(';'):
+            y, x, value = (int(number) for number in tile.split(','))
+            self.board.set((y, x), value)
+            if value == P1_HEAD:
+                self.heads[0] = (y, x)
+            elif value == P2_HEAD:
+                self.heads[1] = (y, x)
+            elif value == COLLISION:
+                self.heads = [None, None]
+        new_head = self.heads[self.player_number - 1]
+        if new_head is not None:
+            move = OFFSET_MOVES[(new_head[0] - my_head[0], new_head[1] - my_head[1])]
+            if move != self.reply:
+                self.player.move_replaced(move)
+        self.reply = None
+
+    def get_move(self, possible_initials, time_budget):
+        possible_moves = dict(MOVE_OFFSETS[initial] for initial in possible_initials)
+        my_head = self.heads[self.player_number - 1]
+        opponent_head = self.heads[2 - self.player_number]
+        self.reply = self.player.get_move(self.board.game_matrix, possible_moves, my_head, opponent_head,
+                                          time_budget=time_budget)
+        return self.reply
+
+
+class BotClient:
+    # connection of a single bot to the server, requests are answered one after another
+    # (run more clients for parallel moves - the server spreads the games over all connections of the bot)
+    # all messages received at once are handled together: a request followed by a newer request of the same session
+    # is already late (the server made a fallback move), so only its delta is applied
+    def __init__(self, name, player_factory, verbose=False):
+        self.name = name
+        self.player_factory = player_factory
+        self.verbose = verbose
+        self.games = dict()  # {session: ClientGame}
+
+    def run(self, host='127.0.0.1', port=7777, path=None):
+        if path is not None:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.connect(path)
+        else:
+            connection = socket.create_connection((host, port))
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with connection:
+            connection.sendall(f'HELLO {self.name}\n'.encode())
+            buffer = b''
+            while True:
+                data = connection.recv(1 << 16)
+                if not data:
+                    break
+                *lines, buffer = (buffer + data).split(b'\n')
+                replies = self.handle_messages([line.decode().split() for line in lines])
+                if replies:
+                    try:
+                        connection.sendall(''.join(reply + '\n' for reply in replies).encode())
+                    except (BrokenPipeError, ConnectionResetError):
+                        # the server was closed
+                        break
+
+    def handle_messages(self, messages):
+        # returns the replies
+        last_requests = {message[1]: i for i, message in enumerate(messages) if message[0] in ('MOVE', 'END')}
+        replies = []
+        for i, message in enumerate(messages):
+            if message[0] == 'MOVE':
+                session, move_number, budget, possible_initials, delta = message[1:]
+                game = self.games[int(session)]
+                game.apply_delta(delta)
+                if last_requests[session] == i:
+                    move = game.get_move(possible_initials, int(budget) / 1000 if int(budget) > 0 else None)
+                    replies.append(f'{session} {move_number} {move}')
+            else:
+                self.handle_message(message)
+        return replies
+
+    def handle_message(self, message):
+        if message[0] == 'START':
+            session, arena_size, player_number, player_seed = (int(value) for value in message[1:])
+            player = self.player_factory()
+            # the same seed as the player would get in an in-process Blockade game
+            player.seed(player_seed)
+            self.games[session] = ClientGame(player, arena_size, player_number)
+        elif message[0] == 'END':
+            game = self.games.pop(int(message[1]))
+            game.player.close()
+            if self.verbose:
+                print(f'{self.name}: game {message[1]} finished with outcome {message[2]} '
+                      f'(player{game.player_number})', flush=True)
+
+
+def run_spec_client(spec, host, port, path, verbose):
+    # client of a player spec (see tournament.py), its name on the server is the spec
+    BotClient(spec, lambda: create_spec_player(spec), verbose=verbose).run(host=host, port=port, path=path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('spec', help='player spec, e.g. optimized or search:0.05 (also the name of the bot)')
+    parser.add_argument('--host', help='TCP host of the server', default='127.0.0.1')
+    parser.add_argument('--port', help='TCP port of the server', type=int, default=7777)
+    parser.add_argument('--unix-socket', help='path of the server\'s Unix socket (instead of TCP)', default=None)
+    parser.add_argument('-j', '--connections', help='number of client processes (parallel connections)', type=int,
+                        default=1)
+    parser.add_argument('-v', '--verbose', action='store_true', help='prints finished games')
+    args = parser.parse_args()
+
+    client_args = (args.spec, args.host, args.port, args.unix_socket, args.verbose)
+    if args.connections == 1:
+        run_spec_client(*client_args)
+    else:
+        processes = [multiprocessing.Process(target=run_spec_client, args=client_args)
+                     for _ in range(args.connections)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
@@ -0,0 +1,248 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+
+from encoding import ObservationEncoder
+from tournament import play_game_details, schedule_games
+
+# self-play dataset for pretraining ReinforcementLearningBot models by behaviour cloning:
+# games between existing bots are rebuilt from their GameRecords and every move of a recorded player becomes a sample
+# of the observation before the move (the same 0-3 encoding and model_size padding/cropping as the RL bot),
+# the move (action 0-3: up, down, left, right), the outcome of the game for the player (1 - win, 0 - draw, -1 - loss)
+# and the number of moves left until the end of the game (including the move, for discounted returns)
+# samples are written to fixed-size .npy shards (only the last shard of every worker is shorter) by parallel workers
+# and read back memory-mapped, so a dataset can be much larger than the RAM
+DATASET_INFO = 'dataset.json'
+# rewards of BlockadeEnv (see env.py): 1 for every move which doesn't end the game, the env ends one step after the
+# last recorded move (when the stuck player makes an invalid move) and that step is rewarded with the outcome
+OUTCOME_REWARDS = {1: 100.0, 0: -10.0, -1: -100.0}
+
+
+def sample_dtype(model_size):
+    return np.dtype([('observation', 'u1', (model_size, model_size)), ('action', 'u1'), ('outcome', 'i1'),
+                     ('moves_left', '<u2')])
+
+
+class ShardWriter:
+    # collects samples in a shard-sized buffer and saves it when it's full (every shard is written to a temporary
+    # file first, so an interrupted worker never leaves a broken shard)
+    def __init__(self, directory, prefix, model_size, shard_size=65536):
+        self.directory = directory
+        self.prefix = prefix
+        self.buffer = np.zeros(shard_size, dtype=sample_dtype(model_size))
+        self.size = 0
+        self.paths = []
+        self.samples = 0
+
+    def append(self, observations, actions, outcome, moves_left):
+        # samples of one player in one game: (N, model_size, model_size) observations, N actions, N moves left
+        start = 0
+        while start < len(actions):
+            count = min(len(actions) - start, len(self.buffer) - self.size)
+            samples = self.buffer[self.size:self.size + count]
+            samples['observation'] = observations[start:start + count]
+            samples['action'] = actions[start:start + count]
+            samples['outcome'] = outcome
+            samples['moves_left'] = moves_left[start:start + count]
+            self.size += count
+            start += count
+            if self.size == len(self.buffer):
+                self.flush()
+
+    def flush(self):
+        if self.size == 0:
+            return
+        path = os.path.join(self.directory, f'{self.prefix}-{len(self.paths):05d}.npy')
+        with open(path + '.tmp', 'wb') as file:
+            np.save(file, self.buffer[:self.size])
+        os.replace(path + '.tmp', path)
+        self.paths.append(path)
+        self.samples += self.size
+        self.size = 0
+
+    def close(self):
+        self.flush()
+
+
+def game_samples(record, encoder, record_players):
+    # (observations, actions, moves left) of the players of a GameRecord (record_players - player numbers)
+    moves = len(record.move_codes)
+    observations = {player_number: [] for player_number in record_players}
+    for move_number, game_matrix, p1_head, p2_head in record.states():
+        if move_number == moves:
+            break
+        for player_number in record_players:
+            head = p1_head if player_number == 1 else p2_head
+            observations[player_number].append(encoder.encode(game_matrix, player_number, head).astype(np.uint8))
+    moves_left = np.arange(moves, 0, -1)
+    return {player_number: (np.array(observations[player_number]).reshape(moves, encoder.model_size,
+                                                                         encoder.model_size),
+                            record.move_codes[:, player_number - 1], moves_left)
+            for player_number in record_players}
+
+
+def generate_shards(job):
+    # worker: plays its games and writes their samples to its own shards, returns (shard paths, number of samples)
+    job_index, games, directory, model_size, shard_size, record_specs = job
+    encoder = ObservationEncoder(model_size)
+    writer = ShardWriter(directory, f'shard-{job_index:04d}', model_size, shard_size)
+    for game in games:
+        outcome, record, _ = play_game_details((game, True, False))
+        record_players = [player_number for player_number, spec in ((1, game[0]), (2, game[1]))
+                          if record_specs is None or spec in record_specs]
+        if len(record.move_codes) == 0 or not record_players:
+            continue
+        for player_number, (observations, actions, moves_left) in game_samples(record, encoder,
+                                                                             record_players).items():
+            player_outcome = 0 if outcome == 0 else (1 if outcome == player_number else -1)
+            writer.append(observations, actions, player_outcome, moves_left)
+    writer.close()
+    return writer.paths, writer.samples
+
+
+def generate_dataset(directory, player_specs, arena_sizes=(15,), seeds=range(1000), model_size=15, shard_size=65536,
+                     record_specs=None, processes=None):
+    # every ordered pair of players plays every seed on every arena size (like in the tournament runner),
+    # the games are split between the workers, returns the number of samples
+    os.makedirs(directory, exist_ok=True)
+    games = [game for game, _ in schedule_games(player_specs, arena_sizes, list(seeds), swap_sides=False)]
+    num_jobs = processes if processes is not None else os.cpu_count()
+    jobs = [(job_index, games[job_index::num_jobs], directory, model_size, shard_size, record_specs)
+            for job_index in range(num_jobs)]
+    if num_jobs == 1:
+        job_results = list(map(generate_shards, jobs))
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            job_results = pool.map(generate_shards, jobs, chunksize=1)
+    samples = sum(job_samples for _, job_samples in job_results)
+    with open(os.path.join(directory, DATASET_INFO), 'w') as file:
+        json.dump({'model_size': model_size, 'player_specs': player_specs, 'record_specs': record_specs,
+                   'arena_sizes': list(arena_sizes), 'games': len(games), 'samples': samples,
+                   'shards': sorted(os.path.basename(path) for paths, _ in job_results for path in paths)}, file,
+                  indent=2)
+    return samples
+
+
+class ShardDataset:
+    # memory-mapped shards of a dataset directory, minibatches read only their own samples from the disk
+    def __init__(self, directory):
+        self.paths = sorted(glob.glob(os.path.join(directory, 'shard-*.npy')))
+        if not self.paths:
+            raise ValueError(f'no shards in {directory}')
+        self.shards = [np.load(path, mmap_mode='r') for path in self.paths]
+        self.model_size = self.shards[0].dtype['observation'].shape[0]
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards)
+
+    def minibatches(self, batch_size, rng, shards_at_once=4):
+        # one pass over all samples in random order: shards are taken in random order, shards_at_once of them at
+        # a time, and their samples are shuffled together (so only shards_at_once shards are read at the same time)
+        # yields (observations, actions, outcomes, moves left) arrays
+        order = rng.permutation(len(self.shards))
+        for start in range(0, len(order), shards_at_once):
+            group = order[start:start + shards_at_once]
+            shard_indices = np.concatenate([np.full(len(self.shards[i]), i) for i in group])
+            sample_indices = np.concatenate([np.arange(len(self.shards[i])) for i in group])
+            permutation = rng.permutation(len(sample_indices))
+            for batch_start in range(0, len(permutation), batch_size):
+                batch = permutation[batch_start:batch_start + batch_size]
+                # memory-mapped shards are read in order of the samples
+                samples = np.concatenate([self.shards[i][np.sort(sample_indices[batch][shard_indices[batch] == i])]
+                                          for i in group])
+                yield samples['observation'], samples['action'], samples['outcome'], samples['moves_left']
+
+
+def value_targets(outcomes, moves_left, gamma):
+    # discounted returns of BlockadeEnv rewards: 1 for each of the moves_left recorded moves, then the outcome reward
+    discount = gamma ** moves_left.astype(np.float64)
+    return (1.0 - discount) / (1.0 - gamma) + discount * np.vectorize(OUTCOME_REWARDS.get)(outcomes)
+
+
+def pretrain_policy(dataset, model_name, epochs=3, batch_size=256, learning_rate=1e-3, value_coef=0.5, gamma=0.99,
+                    seed=0, verbose=True):
+    # behaviour cloning of an A2C MlpPolicy (cross-entropy of the recorded moves) with its value network fitted to
+    # the discounted returns, the model is saved like the trained ones (model_name.zip), so it can be used by
+    # ReinforcementLearningBot (model_type='a2c') or trained further with online RL
+    import torch
+    from stable_baselines3 import A2C
+    from vec_env import BlockadeVecEnv
+    env = BlockadeVecEnv(num_arenas=1, arena_size=dataset.model_size)
+    model = A2C('MlpPolicy', env, gamma=gamma, seed=seed, verbose=0)
+    policy = model.policy
+    optimizer = torch.optim.Adam(policy.parameters(), lr=learning_rate)
+    rng = np.random.default_rng(seed)
+    for epoch in range(epochs):
+        start_time = time.perf_counter()
+        total_samples, correct_actions, total_policy_loss = 0, 0, 0.0
+        for observations, actions, outcomes, moves_left in dataset.minibatches(batch_size, rng):
+            observations, _ = policy.obs_to_tensor(observations.astype(np.int32))
+            actions = torch.as_tensor(actions.astype(np.int64), device=policy.device)
+            targets = torch.as_tensor(value_targets(outcomes, moves_left, gamma), dtype=torch.float32,
+                                      device=policy.device)
+            values, log_probabilities, _ = policy.evaluate_actions(observations, actions)
+            policy_loss = -log_probabilities.mean()
+            loss = policy_loss + value_coef * torch.nn.functional.mse_loss(values.flatten(), targets)
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            with torch.no_grad():
+                predicted_actions = policy.get_distribution(observations).distribution.probs.argmax(dim=1)
+            correct_actions += int((predicted_actions == actions).sum())
+            total_policy_loss += policy_loss.item() * len(actions)
+            total_samples += len(actions)
+        if verbose:
+            print(f'Epoch {epoch + 1}/{epochs}: policy loss {total_policy_loss / total_samples:.4f}, '
+                  f'accuracy {correct_actions / total_samples:.1%} ({time.perf_counter() - start_time:.1f}s)',
+                  flush=True)
+    model.save(model_name)
+    return model
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    generate_parser = subparsers.add_parser('generate', help='plays games and writes their samples to shards')
+    generate_parser.add_argument('directory', help='dataset directory')
+    generate_parser.add_argument('-p', '--players', nargs='+', help='player specs of the games (see tournament.py)',
+                                 default=['optimized', 'heuristic'])
+    generate_parser.add_argument('--record', nargs='+', help='specs of the players whose moves are recorded '
+                                 '(default: all players)', default=None)
+    generate_parser.add_argument('-a', '--arena-sizes', nargs='+', help='sizes of the square game arena (in tiles)',
+                                 type=int, default=[15])
+    generate_parser.add_argument('-n', '--num-seeds', help='number of games per pair of players', type=int,
+                                 default=1000)
+    generate_parser.add_argument('-r', '--starting-seed', help='seed of the first game, games use consecutive seeds',
+                                 type=int, default=0)
+    generate_parser.add_argument('-m', '--model-size', help='size of the observations', type=int, default=15)
+    generate_parser.add_argument('--shard-size', help='number of samples per shard', type=int, default=65536)
+    generate_parser.add_argument('-j', '--processes', help='number of worker processes (default: number of CPUs)',
+                                 type=int, default=None)
+    pretrain_parser = subparsers.add_parser('pretrain', help='behaviour cloning of an A2C policy on a dataset')
+    pretrain_parser.add_argument('directory', help='dataset directory')
+    pretrain_parser.add_argument('-o', '--model-name', help='path of the saved model (without .zip)',
+                                 default='players/BC15')
+    pretrain_parser.add_argument('-e', '--epochs', help='number of passes over the dataset', type=int, default=3)
+    pretrain_parser.add_argument('-b', '--batch-size', help='samples per minibatch', type=int, default=256)
+    pretrain_parser.add_argument('-l', '--learning-rate', help='learning rate of Adam', type=float, default=1e-3)
+    pretrain_parser.add_argument('-g', '--gamma', help='discount factor (of the returns and the saved model)',
+                                 type=float, default=0.99)
+    pretrain_parser.add_argument('-s', '--seed', help='seed of the model and of the shuffling', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        start_time = time.perf_counter()
+        num_samples = generate_dataset(args.directory, args.players, arena_sizes=args.arena_sizes,
+                                       seeds=range(args.starting_seed, args.starting_seed + args.num_seeds),
+                                       model_size=args.model_size, shard_size=args.shard_size,
+                                       record_specs=args.record, processes=args.processes)
+        print(f'{num_samples} samples written to {args.directory} ({time.perf_counter() - start_time:.1f}s)')
+    else:
+        shard_dataset = ShardDataset(args.directory)
+        print(f'{len(shard_dataset)} samples in {len(shard_dataset.shards)} shards', flush=True)
+        pretrain_policy(shard_dataset, args.model_name, epochs=args.epochs, batch_size=args.batch_size,
+                        learning_rate=args.learning_rate, gamma=args.gamma, seed=args.seed)
@@ -0,0 +1,68 @@
+import numpy as np
+
+from board import BOARD_DTYPE, EMPTY, P1_HEAD, P1_TAIL, P2_HEAD, P2_TAIL
+
+
+class ObservationEncoder:
+    # translates game matrix values to the player_number-irrelevant observations of the RL bots:
+    # 0: empty, 1: any tail (or collision), 2: player head, 3: enemy head
+    # the translation is a lookup in a precomputed table indexed by the raw bytes of the int8 game matrix,
+    # so it costs one vectorized take instead of a Python call per tile
+    def __init__(self, model_size=None):
+        # model_size - size of the observations expected by a model (None = same as the arena)
+        self.model_size = model_size
+        # row 0: observations of player1, row 1: observations of player2; unknown values are treated as tails
+        self.lookup_tables = np.ones((2, 256), dtype=np.int32)
+        for player_number in (1, 2):
+            matrix_map = {EMPTY: 0, P1_TAIL: 1, P2_TAIL: 1,
+                          P1_HEAD: 2 if player_number == 1 else 3,
+                          P2_HEAD: 2 if player_number == 2 else 3}
+            for value, observation_value in matrix_map.items():
+                self.lookup_tables[player_number - 1, np.array(value, dtype=BOARD_DTYPE).view(np.uint8)] = \
+                    observation_value
+
+    def table_indices(self, game_matrix):
+        return np.asarray(game_matrix, dtype=BOARD_DTYPE).view(np.uint8)
+
+    def encode(self, game_matrix, player_number, my_coords=None, out=None):
+        # observation of one player, fitted to model_size (my_coords are needed for cropping larger arenas)
+        # out - optional preallocated (model_size, model_size) int32 array for the result
+        translated_game_matrix = np.take(self.lookup_tables[player_number - 1], self.table_indices(game_matrix),
+                                         mode='clip')
+        return self.fit_to_model_size(translated_game_matrix, my_coords, out)
+
+    def encode_both(self, game_matrix, out=None):
+        # observations of both players (as a (2, ...) array) translated in a single pass over the game matrix
+        # works for stacks of arenas too; out - optional preallocated (2, ...) int32 array (or view) for the result
+        indices = self.table_indices(game_matrix)
+        if out is None:
+            out = np.empty((2,) + indices.shape, dtype=self.lookup_tables.dtype)
+        for i in range(2):
+            # indices are bytes, so they never have to be checked (mode='clip' also avoids an intermediate buffer)
+            np.take(self.lookup_tables[i], indices, out=out[i], mode='clip')
+        return out
+
+    def fit_to_model_size(self, observation, my_coords=None, out=None):
+        # enable game arenas different than self.model_size
+        arena_size = observation.shape[0]
+        if self.model_size is None or arena_size == self.model_size:
+            if out is None:
+                return observation
+            out[...] = observation
+            return out
+
+        if out is None:
+            out = np.empty((self.model_size, self.model_size), dtype=observation.dtype)
+        if arena_size < self.model_size:
+            # smaller arenas are padded with tails (as if they were surrounded by walls)
+            diff = self.model_size - arena_size
+            padding1 = diff // 2
+            out.fill(1)
+            out[padding1:(padding1+arena_size), padding1:(padding1+arena_size)] = observation
+        else:
+            # larger arenas are cropped around the player's head
+            upper_border = min(max(0, int(my_coords[0])-self.model_size//2), arena_size-self.model_size)
+            left_border = min(max(0, int(my_coords[1])-self.model_size//2), arena_size-self.model_size)
+            out[...] = observation[upper_border:(upper_border+self.model_size),
+                                   left_border:(left_border+self.model_size)]
+        return out
@@ -1,25 +1,34 @@
 import numpy as np
 import functools
+import time
 from gymnasium.spaces import Box, Discrete
 from pettingzoo import ParallelEnv
 
+from board import Board, starting_heads, EMPTY, P1_HEAD, P1_TAIL, P2_HEAD, P2_TAIL
+from encoding import ObservationEncoder
+from stats import GameStats
+
 
 class BlockadeEnv(ParallelEnv):
     # Blockade environment only for training RL bots
     # based on: https://pettingzoo.farama.org/content/environment_creation/#example-custom-parallel-environment
     metadata = {'render_mode': None, 'name': 'blockade'}
 
-    def __init__(self, arena_size):
+    def __init__(self, arena_size, collect_stats=False):
         self.arena_size = arena_size
-        self.game_matrix = np.zeros((self.arena_size, self.arena_size), dtype=int)
-        self.starting_position = int(self.arena_size / 4)
-        self.game_matrix[self.arena_size - self.starting_position - 1, self.arena_size - self.starting_position - 1] = 1
-        self.game_matrix[self.starting_position, self.starting_position] = 2
+        # optional instrumentation of step (see stats.py), accumulated over all episodes of the environment
+        self.stats = GameStats() if collect_stats else None
+        # compact int8 game matrix with the same encoding as in Blockade (see board.py)
+        self.board = Board.start(self.arena_size)
+        self.game_matrix = self.board.game_matrix
+        # head positions are tracked as (y, x) tuples (None after losing) instead of being searched for every step
+        self.p1_head, self.p2_head = starting_heads(self.arena_size)
         self.move_dict = {'up': (-1, 0), 'down': (1, 0), 'left': (0, -1), 'right': (0, 1)}
         self.move_counter = 0
-        self.max_number_of_moves = int(np.ceil(self.arena_size ** 2 / 2.0) - 2)
+        self.max_number_of_moves = (self.arena_size ** 2 - 2) // 2  # every move fills 2 tiles
 
         self.action_map = {0: 'up', 1: 'down', 2: 'left', 3: 'right'}
+        self.encoder = ObservationEncoder()
         self.possible_agents = ["player" + str(r) for r in [1, 2]]
         self.agent_name_mapping = dict(zip(self.possible_agents, list(range(len(self.possible_agents)))))
 
@@ -32,32 +41,33 @@ class BlockadeEnv(ParallelEnv):
         return Discrete(4)
 
     def reset(self, seed=None, return_info=False, options=None):
-        self.game_matrix = np.zeros((self.arena_size, self.arena_size), dtype=int)
-        self.game_matrix[self.arena_size - self.starting_position - 1, self.arena_size - self.starting_position - 1] = 1
-        self.game_matrix[self.starting_position, self.starting_position] = 2
+        self.board = Board.start(self.arena_size)
+        self.game_matrix = self.board.game_matrix
+        self.p1_head, self.p2_head = starting_heads(self.arena_size)
         self.move_counter = 0
 
         self.agents = self.possible_agents[:]
-        observations = {agent: self.next_observation(i+1) for i, agent in enumerate(self.agents)}
-        return observations
+        return self.next_observations()
 
     def next_observation(self, player_number):
-        matrix_map = {0: 0, -1: 1, -2: 1,
-                      1: 2 if player_number == 1 else 3,
-                      2: 2 if player_number == 2 else 3}
         # translate game_matrix values to player_number-irrelevant generalisation
         # 0: empty, 1: any tail, 2: player head, 3: enemy head
-        return np.vectorize(matrix_map.get)(self.game_matrix)
+        return self.encoder.encode(self.game_matrix, player_number)
+
+    def next_observations(self):
+        # observations of all agents translated in a single pass
+        observations = self.encoder.encode_both(self.game_matrix)
+        return {agent: observations[i] for i, agent in enumerate(self.agents)}
 
     def check_possible_move(self, head, move):
-        if len(head[0]) == 0 or len(head[1]) == 0:
-            return False
-        elif self.game_matrix.shape[0] - 1 >= head[0] + self.move_dict[move][0] >= 0 \
-                and self.game_matrix.shape[1] - 1 >= head[1] + self.move_dict[move][1] >= 0 \
-                and self.game_matrix[head[0] + self.move_dict[move][0], head[1] + self.move_dict[move][1]] == 0:
-            return True
-        else:
+        if head is None:
             return False
+        y = head[0] + self.move_dict[move][0]
+        x = head[1] + self.move_dict[move][1]
+        return self.arena_size > y >= 0 and self.arena_size > x >= 0 and self.game_matrix[y, x] == EMPTY
+
+    def move_head(self, head, move):
+        return head[0] + self.move_dict[move][0], head[1] + self.move_dict[move][1]
 
     def step(self, actions):
         # takes actions and returns observations, rewards, terminations, truncations and infos for each agent
@@ -65,26 +75,35 @@ class BlockadeEnv(ParallelEnv):
         if not actions:
             self.agents = []
             return {}, {}, {}, {}, {}
+        stats = self.stats
+        if stats is not None:
+            phase_start = time.perf_counter()
 
         # update player1
         p1_state = None
-        p1_head = np.where(self.game_matrix == 1)
-        self.game_matrix[p1_head[0], p1_head[1]] = -1
-        if self.check_possible_move(p1_head, self.action_map[actions[self.agents[0]]]):
-            self.game_matrix[p1_head[0] + self.move_dict[self.action_map[actions[self.agents[0]]]][0],
-                             p1_head[1] + self.move_dict[self.action_map[actions[self.agents[0]]]][1]] = 1
+        p1_move = self.action_map[actions[self.agents[0]]]
+        if self.p1_head is not None:
+            self.board.set(self.p1_head, P1_TAIL)
+        if self.check_possible_move(self.p1_head, p1_move):
+            self.p1_head = self.move_head(self.p1_head, p1_move)
+            self.board.set(self.p1_head, P1_HEAD)
         else:
+            self.p1_head = None
             p1_state = 'lost'
 
         # update player2
         p2_state = None
-        p2_head = np.where(self.game_matrix == 2)
-        self.game_matrix[p2_head[0], p2_head[1]] = -2
-        if self.check_possible_move(p2_head, self.action_map[actions[self.agents[1]]]):
-            self.game_matrix[p2_head[0] + self.move_dict[self.action_map[actions[self.agents[1]]]][0],
-                             p2_head[1] + self.move_dict[self.action_map[actions[self.agents[1]]]][1]] = 2
+        p2_move = self.action_map[actions[self.agents[1]]]
+        if self.p2_head is not None:
+            self.board.set(self.p2_head, P2_TAIL)
+        if self.check_possible_move(self.p2_head, p2_move):
+            self.p2_head = self.move_head(self.p2_head, p2_move)
+            self.board.set(self.p2_head, P2_HEAD)
         else:
+            self.p2_head = None
             p2_state = 'lost'
+        if stats is not None:
+            phase_start = stats.add_time('board_update', phase_start)
 
         # reward calculation
         rewards = {}
@@ -114,8 +133,16 @@ class BlockadeEnv(ParallelEnv):
         else:
             truncations = {agent: False for agent in self.agents}
 
+        if stats is not None:
+            phase_start = stats.add_time('rewards', phase_start)
+            stats.moves += 1
+            if any(terminations.values()) or any(truncations.values()):
+                stats.games += 1
+
         # observations
-        observations = {agent: self.next_observation(i+1) for i, agent in enumerate(self.agents)}
+        observations = self.next_observations()
+        if stats is not None:
+            stats.add_time('observations', phase_start)
 
         # infos
         infos = {agent: {} for agent in self.agents}
@@ -0,0 +1,297 @@
+import argparse
+import multiprocessing
+import os
+import pickle
+import numpy as np
+from itertools import combinations
+
+from sprt import score_interval
+from tournament import play_game
+
+# coevolution of OptimizedBot weights (previously in training/optimization.ipynb) as a resumable command line tool:
+# every generation's tournaments are played on a process pool, results of games which were already played are
+# memoized and the whole state is saved to a checkpoint after every generation
+
+
+def init_random_population(num_weights, pop_size, rng):
+    return [rng.random(num_weights) * 2 - 1 for _ in range(pop_size)]
+
+
+def crossover(individual1, individual2):
+    # averaging crossover
+    return np.mean([individual1, individual2], axis=0)
+
+
+def reflected_normal_distribution(loc, scale, rng, min_val=-1.0, max_val=1.0):
+    # safely get a number from normal distribution
+    # in case the value is out of the allowed scope, use the fractional part to get the closest allowed value
+    base_val = rng.normal(loc, scale)
+    if base_val < min_val:
+        fractional_part = base_val % min_val
+        return min(fractional_part, min_val - fractional_part)
+    elif base_val > max_val:
+        fractional_part = base_val % max_val
+        return max(fractional_part, max_val - fractional_part)
+    else:
+        return base_val
+
+
+def mutation(individual, prob, scale, rng):
+    # gaussian mutation with reflection
+    return np.array([(reflected_normal_distribution(weight, scale, rng) if rng.random() < prob else weight)
+                     for weight in individual])
+
+
+def weights_spec(weights):
+    # tournament player spec of an OptimizedBot (repr of floats is exact, so the same weights give the same spec)
+    return 'optimized:' + ','.join(repr(float(weight)) for weight in weights)
+
+
+class BotEvolution:
+    # custom evolutionary algorithm: children are mutated crossovers of random parents, the next generation is made
+    # of winners of football-style tournaments of random groups of parents and children
+    # the round number of a tournament game is also its seed, so the outcome of a game between two weight vectors
+    # never changes and is played only once per run
+    def __init__(self, arena_size=15, pop_size=30, mutation_prob=0.6, mutation_scale=0.15, tournament_size=4,
+                 tournament_repetitions=2, tournament_score_dict=None, num_weights=4, seed=42, recursion_depth=2,
+                 max_tournament_repetitions=None, selection_confidence=0.9):
+        self.arena_size = arena_size
+        self.pop_size = pop_size
+        self.mutation_prob = mutation_prob
+        self.mutation_scale = mutation_scale
+        self.tournament_size = tournament_size
+        self.tournament_repetitions = tournament_repetitions
+        self.tournament_score_dict = tournament_score_dict if tournament_score_dict is not None \
+            else {'won': 3, 'lost': 0, 'drew': 1}
+        self.num_weights = num_weights
+        self.seed = seed
+        self.recursion_depth = recursion_depth
+        # sequential selection (if max_tournament_repetitions is set): a group plays tournament_repetitions more
+        # rounds at a time until its leader is ahead of every other participant with selection_confidence
+        # (or until max_tournament_repetitions rounds were played), so clear groups need far fewer games
+        self.max_tournament_repetitions = max_tournament_repetitions
+        self.selection_confidence = selection_confidence
+
+        self.rng = np.random.default_rng(seed)
+        self.population = init_random_population(num_weights, pop_size, self.rng)
+        self.history = []  # population of every generation (lists of weight lists)
+        self.game_results = dict()  # {(weights1, weights2, seed): outcome}
+        self.pool = None
+
+    def save(self, path):
+        # the checkpoint is written to a temporary file first, so an interrupted save never corrupts it
+        state = {key: value for key, value in self.__dict__.items() if key not in ('rng', 'pool')}
+        state['rng_state'] = self.rng.bit_generator.state
+        with open(path + '.tmp', 'wb') as file:
+            pickle.dump(state, file)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            state = pickle.load(file)
+        evolution = cls.__new__(cls)
+        evolution.rng = np.random.default_rng()
+        evolution.rng.bit_generator.state = state.pop('rng_state')
+        # checkpoints saved before sequential selection existed
+        state.setdefault('max_tournament_repetitions', None)
+        state.setdefault('selection_confidence', 0.9)
+        evolution.__dict__.update(state)
+        evolution.pool = None
+        return evolution
+
+    def play_games(self, games):
+        # plays the games which weren't played before (on the pool if there is one), games are (weights1, weights2,
+        # seed) tuples of weight tuples
+        new_games = list(dict.fromkeys(game for game in games if game not in self.game_results))
+        jobs = [(weights_spec(weights1), weights_spec(weights2), self.arena_size, seed)
+                for weights1, weights2, seed in new_games]
+        outcomes = self.pool.map(play_game, jobs, chunksize=4) if self.pool is not None else map(play_game, jobs)
+        self.game_results.update(zip(new_games, outcomes))
+
+    def tournament_games(self, participants, rounds):
+        # every pair of participants plays one game per round (sides are switched every second round)
+        games = []
+        for game_round in rounds:
+            for p1, p2 in combinations(range(len(participants)), 2):
+                if game_round % 2:
+                    p1, p2 = p2, p1
+                games.append((p1, p2, (participants[p1], participants[p2], game_round)))
+        return games
+
+    def tournament_scores(self, participants, rounds):
+        scores = np.zeros(len(participants))
+        for p1, p2, game in self.tournament_games(participants, rounds):
+            outcome = self.game_results[game]
+            if outcome == 1:
+                scores[p1] += self.tournament_score_dict['won']
+                scores[p2] += self.tournament_score_dict['lost']
+            elif outcome == 2:
+                scores[p1] += self.tournament_score_dict['lost']
+                scores[p2] += self.tournament_score_dict['won']
+            else:
+                scores[p1] += self.tournament_score_dict['drew']
+                scores[p2] += self.tournament_score_dict['drew']
+        return scores
+
+    def is_leader_separated(self, participants, rounds):
+        # True if the participant with the best score has a higher score than every other participant in the rounds
+        # with selection_confidence (confidence interval of the mean difference of their round scores)
+        round_scores = np.array([self.tournament_scores(participants, [game_round]) for game_round in rounds])
+        leader = int(np.argmax(round_scores.sum(axis=0)))
+        for other in range(len(participants)):
+            if other != leader:
+                mean, half_width = score_interval(round_scores[:, leader] - round_scores[:, other],
+                                                  self.selection_confidence)
+                if mean - half_width <= 0:
+                    return False
+        return True
+
+    def tournament_selection(self, groups):
+        # true football-style tournaments of all groups at once (their games are played together on the pool)
+        # with sequential selection groups play more rounds until their leaders are clear (see __init__)
+        # tied best participants play an additional mini-tournament without repetitions
+        # (limited by recursion_depth, every level uses a new round of games)
+        groups = [[tuple(float(weight) for weight in individual) for individual in group] for group in groups]
+        winners = [None] * len(groups)
+        rounds = [range(self.tournament_repetitions)] * len(groups)
+        max_rounds = self.max_tournament_repetitions or self.tournament_repetitions
+        depths = [0] * len(groups)
+        while None in winners:
+            unresolved = [i for i in range(len(groups)) if winners[i] is None]
+            self.play_games([game for i in unresolved for _, _, game in self.tournament_games(groups[i], rounds[i])])
+            for i in unresolved:
+                scores = self.tournament_scores(groups[i], rounds[i])
+                best_participants = np.flatnonzero(scores == np.amax(scores))
+                if depths[i] == 0 and len(rounds[i]) < max_rounds \
+                        and not self.is_leader_separated(groups[i], rounds[i]):
+                    rounds[i] = range(min(len(rounds[i]) + self.tournament_repetitions, max_rounds))
+                elif len(best_participants) > 1 and depths[i] < self.recursion_depth:
+                    groups[i] = [groups[i][j] for j in best_participants]
+                    rounds[i] = [max_rounds + depths[i]]
+                    depths[i] += 1
+                else:
+                    winners[i] = groups[i][int(best_participants[0])]
+        return [np.array(winner) for winner in winners]
+
+    def next_generation(self):
+        # save weights
+        self.history.append([list(individual) for individual in self.population])
+
+        # crossover & mutation
+        child_population = []
+        while len(child_population) < self.pop_size:
+            parents = self.rng.choice(self.pop_size, 2, replace=False)
+            child = crossover(self.population[int(parents[0])], self.population[int(parents[1])])
+            child_population.append(mutation(child, self.mutation_prob, self.mutation_scale, self.rng))
+
+        # tournament selection out of joined parent and child population
+        joined_populations = self.population + child_population
+        groups = [[joined_populations[i] for i in self.rng.choice(self.pop_size * 2, self.tournament_size,
+                                                                  replace=False)]
+                  for _ in range(self.pop_size)]
+        self.population = self.tournament_selection(groups)
+
+    def run(self, num_generations, checkpoint_path=None, processes=None, verbose=True):
+        # continues the evolution until num_generations generations are in the history
+        # processes=1 plays the games in the current process
+        self.pool = multiprocessing.Pool(processes) if processes != 1 else None
+        try:
+            while len(self.history) < num_generations:
+                self.next_generation()
+                if checkpoint_path is not None:
+                    self.save(checkpoint_path)
+                if verbose:
+                    print(f'Generation {len(self.history) - 1} done ({len(self.game_results)} games played so far)',
+                          flush=True)
+            # select the final best solution in another tournament
+            return self.tournament_selection([self.population])[0]
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool = None
+
+    def weight_history(self):
+        # weights of every generation as a (num_weights, generations, pop_size) array
+        return np.array(self.history).transpose(2, 0, 1)
+
+
+def plot_history(weight_history, mode, filename, fontsize=12):
+    import matplotlib.pyplot as plt
+    plt.rcParams.update({'font.size': fontsize})
+    plt.figure(figsize=(20, 10))
+    generations = list(range(weight_history.shape[1]))
+    colors = ['tab:blue', 'tab:red', 'tab:green', 'tab:orange', 'tab:purple']
+    for i, weight_list in enumerate(weight_history):
+        if mode == 'avg':
+            avgs = np.mean(weight_list, axis=1)
+            stds = np.std(weight_list, axis=1)
+            plt.scatter(generations, avgs, c=colors[i], marker='X', label=f'weight[{i}]')
+            plt.plot(generations, avgs, c=colors[i], linestyle='--')
+            plt.fill_between(generations, avgs + stds, avgs - stds, color=colors[i], alpha=0.3)
+        elif mode == 'min-max':
+            maxs = np.max(weight_list, axis=1)
+            mins = np.min(weight_list, axis=1)
+            plt.scatter(generations, maxs, c=colors[i], marker='X', label=f'weight[{i}]')
+            plt.plot(generations, maxs, c=colors[i], linestyle='--')
+            plt.scatter(generations, mins, c=colors[i], marker='X')
+            plt.plot(generations, mins, c=colors[i], linestyle='--')
+            plt.fill_between(generations, maxs, mins, color=colors[i], alpha=0.3)
+        else:
+            raise ValueError(mode)
+    plt.xlabel('Generation')
+    if mode == 'avg':
+        plt.ylabel('Avg. weight value (with std. dev.) in population')
+    else:
+        plt.ylabel('Min-max intervals of weights in population')
+    plt.xticks(ticks=generations)
+    plt.yticks(ticks=list(np.round(np.arange(-1.0, 1.1, 0.1), 2)))
+    plt.legend(loc='upper right')
+    plt.grid(axis='y')
+    plt.savefig(filename, bbox_inches='tight', pad_inches=0.3)
+    plt.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c', '--checkpoint', help='checkpoint file, an existing checkpoint is resumed '
+                        '(with its own parameters)', default='evolution.pkl')
+    parser.add_argument('-g', '--generations', help='total number of generations', type=int, default=30)
+    parser.add_argument('-a', '--arena-size', help='size of the square game arena (in tiles)', type=int, default=15)
+    parser.add_argument('-p', '--pop-size', help='population size', type=int, default=30)
+    parser.add_argument('--mutation-prob', help='probability of mutating a weight', type=float, default=0.6)
+    parser.add_argument('--mutation-scale', help='standard deviation of mutations', type=float, default=0.15)
+    parser.add_argument('-t', '--tournament-size', help='participants of a selection tournament', type=int, default=4)
+    parser.add_argument('-r', '--tournament-repetitions', help='games of every pair in a tournament', type=int,
+                        default=2)
+    parser.add_argument('-m', '--max-repetitions', help='sequential selection: a tournament plays more rounds '
+                        '(up to this number) until its leader is clear', type=int, default=None)
+    parser.add_argument('--selection-confidence', help='confidence of a clear leader (sequential selection)',
+                        type=float, default=0.9)
+    parser.add_argument('-w', '--num-weights', help='number of OptimizedBot weights (4 or 5)', type=int, default=4)
+    parser.add_argument('-s', '--seed', help='seed of the evolution', type=int, default=42)
+    parser.add_argument('-j', '--processes', help='number of worker processes (default: number of CPUs)', type=int,
+                        default=None)
+    parser.add_argument('--plot', help='only plots the history of the checkpoint to PLOT-avg.png and '
+                        'PLOT-min-max.png', default=None)
+    args = parser.parse_args()
+
+    if os.path.exists(args.checkpoint):
+        evolution = BotEvolution.load(args.checkpoint)
+        print(f'Resuming {args.checkpoint} after {len(evolution.history)} generations', flush=True)
+    elif args.plot is not None:
+        raise ValueError(f'checkpoint doesn`t exist: {args.checkpoint}')
+    else:
+        evolution = BotEvolution(arena_size=args.arena_size, pop_size=args.pop_size, mutation_prob=args.mutation_prob,
+                                 mutation_scale=args.mutation_scale, tournament_size=args.tournament_size,
+                                 tournament_repetitions=args.tournament_repetitions, num_weights=args.num_weights,
+                                 seed=args.seed, max_tournament_repetitions=args.max_repetitions,
+                                 selection_confidence=args.selection_confidence)
+
+    if args.plot is None:
+        best_solution = evolution.run(args.generations, checkpoint_path=args.checkpoint, processes=args.processes)
+        print('Best solution:')
+        print(best_solution)
+    else:
+        plot_history(evolution.weight_history(), mode='avg', filename=f'{args.plot}-avg.png')
+        plot_history(evolution.weight_history(), mode='min-max', filename=f'{args.plot}-min-max.png')
@@ -1,26 +1,163 @@
 import numpy as np
+import random
+import threading
+
+from area import AreaAnalyzer
+from territory import calculate_move_territories
+
+
+def derive_player_seeds(game_seed, num_players=2):
+    # seeds of player1, player2 (and further players of arena.LargeArena) derived from a single game seed
+    seed_generator = random.Random(game_seed)
+    return tuple(seed_generator.getrandbits(64) for _ in range(num_players))
 
 
 class BasePlayer:
-    def __init__(self, verbose):
+    def __init__(self, verbose, rng=None):
         self.verbose = verbose
+        # every random decision of the player goes through its own RNG (never the module-global random),
+        # so games can run concurrently or interleaved without mixing their random streams
+        # games with a seed reseed it (see Blockade), games without a seed leave it as it is
+        self.rng = rng if rng is not None else random.Random()
+        self.area_analyzer = None
+        # counters of the player's work (stats.Stats), set by the game when instrumentation is enabled
+        self.stats = None
+        # book.PositionCache of the searched areas and territories of early positions (None - no cache)
+        self.position_cache = None
+        # event of the current move, set by the game when get_move is too late and its move won't be used
+        # (see Blockade.move_time_limit), anytime bots stop searching as soon as it's set
+        self.move_cancelled = threading.Event()
 
     def __str__(self):
         return self.__class__.__name__
 
+    def seed(self, seed):
+        self.rng.seed(seed)
+
+    def calculate_available_areas(self, game_matrix, positions):
+        # flood fill areas for many positions at once (e.g. the target tiles of all possible moves)
+        # the analyzer is created lazily and reused, so the same player can play on arenas of different sizes
+        if self.area_analyzer is None or self.area_analyzer.arena_size != game_matrix.shape[0]:
+            self.area_analyzer = AreaAnalyzer(game_matrix.shape[0])
+        if self.stats is None:
+            return self.area_analyzer.calculate_areas(game_matrix, positions)
+        visited_cells = self.area_analyzer.visited_cells
+        areas = self.area_analyzer.calculate_areas(game_matrix, positions)
+        self.stats.count('flood_fills')
+        self.stats.count('flood_fill_cells', self.area_analyzer.visited_cells - visited_cells)
+        return areas
+
     def calculate_available_area(self, game_matrix, position):
-        # recursive function
         # tile has 0 area if it is outside the game matrix or has non-zero value
-        if not (game_matrix.shape[0]-1 >= position[0] >= 0 and game_matrix.shape[1]-1 >= position[1] >= 0) \
-                or game_matrix[position[0], position[1]] != 0:
-            return 0
-        else:
-            game_matrix[position[0], position[1]] = 1234
-            return 1 + sum([self.calculate_available_area(game_matrix, (position[0] + move[0], position[1] + move[1]))
-                            for move in [(-1, 0), (1, 0), (0, -1), (0, 1)]])
+        return self.calculate_available_areas(game_matrix, [position])[0]
+
+    def calculate_move_areas(self, game_matrix, possible_moves, my_coords):
+        # available area behind every possible move, calculated in one labelling pass
+        targets = [(my_coords[0] + move[0], my_coords[1] + move[1]) for move in possible_moves.values()]
+        return dict(zip(possible_moves.keys(), self.calculate_available_areas(game_matrix, targets)))
+
+    def calculate_move_territories(self, game_matrix, possible_moves, my_coords, opponent_coords):
+        # Voronoi territory difference after every possible move, all moves in one vectorized search
+        targets = np.array([(my_coords[0] + move[0], my_coords[1] + move[1]) for move in possible_moves.values()])
+        territories = calculate_move_territories(game_matrix, targets, np.array(opponent_coords))
+        if self.stats is not None:
+            self.stats.count('territory_searches')
+        return dict(zip(possible_moves.keys(), territories.tolist()))
+
+    def calculate_move_features(self, game_matrix, possible_moves, my_coords, opponent_coords, territories):
+        # available areas and Voronoi territories (0 unless territories) of the possible moves as {move: value} dicts,
+        # looked up in the position cache first (if the player has one)
+        if self.position_cache is not None:
+            return self.position_cache.move_features(self, game_matrix, possible_moves, my_coords, opponent_coords,
+                                                     territories)
+        available_areas = self.calculate_move_areas(game_matrix, possible_moves, my_coords)
+        move_territories = self.calculate_move_territories(game_matrix, possible_moves, my_coords, opponent_coords) \
+            if territories else dict.fromkeys(possible_moves.keys(), 0)
+        return available_areas, move_territories
 
     def calculate_manhattan_distance(self, move_offset, my_coords, opponent_coords):
-        return np.sum([np.abs(my_coords[i] + move_offset[i] - opponent_coords[i]) for i in (0, 1)])
+        return abs(my_coords[0] + move_offset[0] - opponent_coords[0]) \
+            + abs(my_coords[1] + move_offset[1] - opponent_coords[1])
+
+    def calculate_batch_move_areas(self, regions, possible_moves, my_coords, move_offsets):
+        # vectorized calculate_move_areas for BatchBlockade, returns a (B, 4) array of areas (0 for impossible moves)
+        targets = my_coords[:, None, :] + move_offsets[None, :, :]
+        return regions.calculate_areas(targets, possible_moves)
+
+    def calculate_batch_move_territories(self, game_matrices, my_coords, opponent_coords, move_offsets):
+        # vectorized calculate_move_territories for all 4 moves of every game, returns a (B, 4) array
+        targets = my_coords[:, None, :] + move_offsets[None, :, :]
+        return calculate_move_territories(game_matrices, targets, opponent_coords)
+
+    def calculate_batch_manhattan_distances(self, my_coords, opponent_coords, move_offsets):
+        # vectorized calculate_manhattan_distance for all 4 moves of every game, returns a (B, 4) array
+        targets = my_coords[:, None, :] + move_offsets[None, :, :]
+        return np.abs(targets - opponent_coords[:, None, :]).sum(axis=2)
 
-    def get_move(self, game_matrix, possible_moves, my_coords, opponent_coords):
+    def select_batch_moves(self, scores, possible_moves, rngs):
+        # vectorized version of the move selection loop of the scalar bots
+        # every later possible move is compared with the score of the first possible move (exactly as in get_move)
+        # and ties are resolved with the player's RNG of the game in the same order, so batched games match scalar ones
+        move_indices = np.arange(possible_moves.shape[1])
+        first_moves = np.argmax(possible_moves, axis=1)
+        first_scores = scores[np.arange(scores.shape[0]), first_moves]
+        later_moves = possible_moves & (move_indices[None, :] > first_moves[:, None])
+        better = later_moves & (scores > first_scores[:, None])
+        tied = later_moves & (scores == first_scores[:, None])
+
+        # without ties the last move scored above the first one wins
+        last_better = move_indices[-1] - np.argmax(better[:, ::-1], axis=1)
+        moves = np.where(better.any(axis=1), last_better, first_moves)
+        for i in np.flatnonzero(tied.any(axis=1)):
+            best_move = first_moves[i]
+            for move in range(first_moves[i] + 1, len(move_indices)):
+                if better[i, move]:
+                    best_move = move
+                elif tied[i, move]:
+                    best_move = rngs[i].choice([best_move, move])
+            moves[i] = best_move
+        return moves
+
+    def get_move(self, game_matrix, possible_moves, my_coords, opponent_coords, time_budget=None):
+        # time_budget - seconds left for the move when the game limits the time of moves (None - no limit),
+        # anytime bots search for as long as it allows
+        pass
+
+    def fallback_move(self, possible_moves):
+        # move made instead of the player's own when get_move doesn't finish in time:
+        # the first possible move in 'up', 'down', 'left', 'right' order
+        return next(iter(possible_moves))
+
+    def move_replaced(self, move):
+        # called after a late get_move with the move which was made instead (its fallback_move),
+        # players which remember their own moves update their state here
         pass
+
+    def close(self):
+        # called by the game when it's finished, players which hold resources between moves (e.g. process pools)
+        # release them here
+        pass
+
+    def reset_batch(self, batch_size):
+        # called by BatchBlockade before the first move, players with per-game state allocate it here
+        pass
+
+    def get_moves(self, game_matrices, regions, possible_moves, my_coords, opponent_coords, move_offsets, rngs,
+                  game_ids):
+        # batched interface used by BatchBlockade for all unfinished games at once:
+        # game_matrices - (B, N, N) int8 arenas
+        # regions - area.BatchRegions of game_matrices (shared by both players)
+        # possible_moves - (B, 4) boolean mask of possible moves (in 'up', 'down', 'left', 'right' order)
+        # my_coords, opponent_coords - (B, 2) arrays of (y, x) head positions
+        # move_offsets - (4, 2) array of (y, x) move offsets
+        # rngs - the player's random.Random of every game (used for the same random decisions as in get_move)
+        # game_ids - indices of the games in the whole batch (for per-game state)
+        # returns a (B,) array of move indices
+        raise NotImplementedError(f'{self} does not support batched games')
+
+    def get_arena_move(self, arena, player_index, possible_moves):
+        # interface of arena.LargeArena (free-for-all games of 2-8 players on large arenas):
+        # arena - the LargeArena (row bitsets, heads of all players, bounded searches around a position)
+        # player_index - index of the player's head in arena.heads
+        # possible_moves - {move: (y, x) offset} like in get_move
+        raise NotImplementedError(f'{self} does not support large arena games')
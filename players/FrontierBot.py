@@ -0,0 +1,46 @@
+from arena import LargeArena
+from players.BasePlayer import BasePlayer
+
+
+class FrontierBot(BasePlayer):
+    # bot for large free-for-all arenas (arena.LargeArena): every possible move is scored with searches bounded around
+    # the target tile, so the cost of a move depends on the limits and not on the arena size or the number of players
+    # - moves into a region smaller than area_limit are worse than open moves (and better the larger the region is)
+    # - open moves are compared by the local Voronoi territory against the opponents within radius tiles
+    # - remaining ties prefer tiles next to walls (less fragmented space), then are resolved randomly
+    def __init__(self, verbose, area_limit=64, territory_limit=256, radius=16, rng=None):
+        super().__init__(verbose, rng)
+        self.area_limit = area_limit
+        self.territory_limit = territory_limit
+        self.radius = radius
+
+    def evaluate_move(self, arena, target, opponents):
+        area = arena.bounded_area(target, self.area_limit)
+        if area < self.area_limit:
+            return 0, area, 0
+        territory = arena.local_territory(target, opponents, self.territory_limit) if opponents else 0
+        walls = sum(not arena.is_empty((target[0] + dy, target[1] + dx))
+                    for dy, dx in ((-1, 0), (1, 0), (0, -1), (0, 1)))
+        return 1, territory, walls
+
+    def get_arena_move(self, arena, player_index, possible_moves):
+        y, x = arena.heads[player_index].tolist()
+        opponents = arena.nearby_opponents(player_index, self.radius + 1)
+        best_move = None
+        best_score = None
+        for move, (dy, dx) in possible_moves.items():
+            score = self.evaluate_move(arena, (y + dy, x + dx), opponents)
+            if best_move is None or score > best_score:
+                best_move, best_score = move, score
+            elif score == best_score:
+                best_move = self.rng.choice([best_move, move])
+
+        if self.verbose:
+            print(f'{self} (player{player_index + 1}) selects move "{best_move}" based on score: {best_score}',
+                  flush=True)
+        return best_move
+
+    def get_move(self, game_matrix, possible_moves, my_coords, opponent_coords, time_budget=None):
+        # two-player Blockade games are played on an arena view of the game matrix
+        return self.get_arena_move(LargeArena.from_game_matrix(game_matrix, [my_coords, opponent_coords]), 0,
+                                   possible_moves)
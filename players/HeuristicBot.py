@@ -1,13 +1,10 @@
-import random
-from copy import deepcopy
+import numpy as np
 
 from players.BasePlayer import BasePlayer
 
 
 class HeuristicBot(BasePlayer):
-    def evaluate_move(self, game_matrix, move_offset, my_coords, opponent_coords):
-        available_area = self.calculate_available_area(deepcopy(game_matrix),
-                                                       (my_coords[0] + move_offset[0], my_coords[1] + move_offset[1]))
+    def evaluate_move(self, available_area, move_offset, my_coords, opponent_coords):
         manhattan_distance = self.calculate_manhattan_distance(move_offset, my_coords, opponent_coords)
         if manhattan_distance == 1:
             # 'enemy too close'-case: decrease score if the enemy is 1 tile away from the target tile
@@ -15,19 +12,30 @@ class HeuristicBot(BasePlayer):
         else:
             return available_area - manhattan_distance
 
-    def get_move(self, game_matrix, possible_moves, my_coords, opponent_coords):
+    def get_move(self, game_matrix, possible_moves, my_coords, opponent_coords, time_budget=None):
         # select the move with the largest available area and the shortest distance to the opponent
         # in case of a tie: choose randomly
+        available_areas, _ = self.calculate_move_features(game_matrix, possible_moves, my_coords, opponent_coords,
+                                                          territories=False)
         best_move = list(possible_moves.keys())[0]
-        best_score = self.evaluate_move(game_matrix, possible_moves[best_move], my_coords, opponent_coords)
+        best_score = self.evaluate_move(available_areas[best_move], possible_moves[best_move], my_coords,
+                                        opponent_coords)
 
         for move in list(possible_moves.keys())[1:]:
-            score = self.evaluate_move(game_matrix, possible_moves[move], my_coords, opponent_coords)
+            score = self.evaluate_move(available_areas[move], possible_moves[move], my_coords, opponent_coords)
             if score > best_score:
                 best_move = move
             elif score == best_score:
-                best_move = random.choice([best_move, move])
+                best_move = self.rng.choice([best_move, move])
 
         if self.verbose:
             print(f'{self} selects move "{best_move}" based on score: {best_score}', flush=True)
         return best_move
+
+    def get_moves(self, game_matrices, regions, possible_moves, my_coords, opponent_coords, move_offsets, rngs,
+                  game_ids):
+        # vectorized evaluate_move for all possible moves of all games
+        available_areas = self.calculate_batch_move_areas(regions, possible_moves, my_coords, move_offsets)
+        manhattan_distances = self.calculate_batch_manhattan_distances(my_coords, opponent_coords, move_offsets)
+        scores = np.where(manhattan_distances == 1, available_areas - 5, available_areas - manhattan_distances)
+        return self.select_batch_moves(scores, possible_moves, rngs)
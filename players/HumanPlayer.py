@@ -2,15 +2,15 @@ from players.BasePlayer import BasePlayer
 
 
 class HumanPlayer(BasePlayer):
-    def __init__(self, keyboard_input, verbose):
-        super().__init__(verbose)
+    def __init__(self, keyboard_input, verbose, rng=None):
+        super().__init__(verbose, rng)
         self.keyboard_input = keyboard_input
         self.current_direction = None
 
     def __str__(self):
         return super().__str__() + f' ({self.keyboard_input})'
 
-    def get_move(self, game_matrix, possible_moves, my_coords, opponent_coords):
+    def get_move(self, game_matrix, possible_moves, my_coords, opponent_coords, time_budget=None):
         if self.current_direction in possible_moves.keys():
             return self.current_direction
         else:
@@ -0,0 +1,255 @@
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from board import padded_cells
+from players.BasePlayer import BasePlayer
+
+
+class MCTSNode:
+    # node of a decoupled UCT tree: both players keep separate statistics of their own moves and select them
+    # independently, the children are indexed by the pair of selected moves
+    # rewards are from the perspective of the bot: 1 - win, 0.5 - draw, 0 - loss (the opponent gets 1 - reward)
+    __slots__ = ('my_moves', 'opponent_moves', 'my_visits', 'my_rewards', 'opponent_visits', 'opponent_rewards',
+                 'visits', 'children', 'terminal_reward')
+
+    def __init__(self, cells, my_head, opponent_head, directions):
+        # the same rules as Blockade.find_possible_moves (moves to empty tiles only)
+        self.my_moves = [direction for direction in directions if not cells[my_head + direction]]
+        self.opponent_moves = [direction for direction in directions if not cells[opponent_head + direction]]
+        self.terminal_reward = None
+        if not self.my_moves:
+            self.terminal_reward = 0.5 if not self.opponent_moves else 0.0
+        elif not self.opponent_moves:
+            self.terminal_reward = 1.0
+        self.my_visits = [0] * len(self.my_moves)
+        self.my_rewards = [0.0] * len(self.my_moves)
+        self.opponent_visits = [0] * len(self.opponent_moves)
+        self.opponent_rewards = [0.0] * len(self.opponent_moves)
+        self.visits = 0
+        self.children = dict()  # {(my move index, opponent move index): node}
+
+
+def select_move(visits, rewards, total_visits, exploration):
+    # UCB1, moves which were never tried go first
+    log_visits = math.log(total_visits) if total_visits > 0 else 0.0
+    best_index, best_value = 0, -1.0
+    for i, move_visits in enumerate(visits):
+        if move_visits == 0:
+            return i
+        value = rewards[i] / move_visits + exploration * math.sqrt(log_visits / move_visits)
+        if value > best_value:
+            best_index, best_value = i, value
+    return best_index
+
+
+def playout(cells, my_head, opponent_head, width, rng_random):
+    # quick game on the (copied) padded arena until it's finished, both players pick random possible moves,
+    # but moves into dead ends (tiles without free neighbors) only when there is nothing else left
+    # returns the reward of the bot and the number of simulated moves
+    directions = (-width, width, -1, 1)
+    moves = 0
+    while True:
+        my_moves = [direction for direction in directions if not cells[my_head + direction]]
+        opponent_moves = [direction for direction in directions if not cells[opponent_head + direction]]
+        if not my_moves:
+            return (0.5 if not opponent_moves else 0.0), moves
+        if not opponent_moves:
+            return 1.0, moves
+        if len(my_moves) > 1:
+            my_moves = [direction for direction in my_moves if not is_dead_end(cells, my_head + direction, width)] \
+                or my_moves
+        if len(opponent_moves) > 1:
+            opponent_moves = [direction for direction in opponent_moves
+                              if not is_dead_end(cells, opponent_head + direction, width)] or opponent_moves
+        my_head += my_moves[int(rng_random() * len(my_moves))]
+        opponent_head += opponent_moves[int(rng_random() * len(opponent_moves))]
+        moves += 1
+        if my_head == opponent_head:
+            # head collision
+            return 0.5, moves
+        cells[my_head] = 1
+        cells[opponent_head] = 1
+
+
+def is_dead_end(cells, tile, width):
+    return cells[tile - width] and cells[tile + width] and cells[tile - 1] and cells[tile + 1]
+
+
+def run_search(root, cells, my_head, opponent_head, width, rng, exploration, deadline, max_iterations,
+               cancelled=None):
+    # MCTS iterations from the root state until the deadline (or max_iterations, or until the cancelled event is set),
+    # returns the number of iterations and of simulated moves (in the tree and in the playouts)
+    directions = (-width, width, -1, 1)
+    rng_random = rng.random
+    iterations = simulated_moves = 0
+    while (max_iterations is None or iterations < max_iterations) \
+            and (deadline is None or time.perf_counter() < deadline) \
+            and (cancelled is None or not cancelled.is_set()):
+        iterations += 1
+        board = bytearray(cells)
+        node = root
+        node_my_head, node_opponent_head = my_head, opponent_head
+        path = []
+        while True:
+            if node.terminal_reward is not None:
+                reward = node.terminal_reward
+                break
+            i = select_move(node.my_visits, node.my_rewards, node.visits, exploration)
+            j = select_move(node.opponent_visits, node.opponent_rewards, node.visits, exploration)
+            path.append((node, i, j))
+            node_my_head += node.my_moves[i]
+            node_opponent_head += node.opponent_moves[j]
+            simulated_moves += 1
+            if node_my_head == node_opponent_head:
+                # head collision
+                reward = 0.5
+                break
+            board[node_my_head] = 1
+            board[node_opponent_head] = 1
+            child = node.children.get((i, j))
+            if child is None:
+                # expansion and simulation
+                child = MCTSNode(board, node_my_head, node_opponent_head, directions)
+                node.children[(i, j)] = child
+                if child.terminal_reward is not None:
+                    reward = child.terminal_reward
+                else:
+                    reward, moves = playout(board, node_my_head, node_opponent_head, width, rng_random)
+                    simulated_moves += moves
+                break
+            node = child
+
+        # backpropagation
+        for node, i, j in path:
+            node.visits += 1
+            node.my_visits[i] += 1
+            node.my_rewards[i] += reward
+            node.opponent_visits[j] += 1
+            node.opponent_rewards[j] += 1.0 - reward
+    return iterations, simulated_moves
+
+
+def search_root_worker(job):
+    # root parallelization: an independent tree searched in a worker process, returns the statistics of the root moves
+    cells, my_head, opponent_head, width, seed, exploration, time_budget, max_iterations = job
+    deadline = time.perf_counter() + time_budget if time_budget is not None else None
+    root = MCTSNode(cells, my_head, opponent_head, (-width, width, -1, 1))
+    iterations, simulated_moves = run_search(root, cells, my_head, opponent_head, width, random.Random(seed),
+                                             exploration, deadline, max_iterations)
+    return root.my_moves, root.my_visits, root.my_rewards, iterations, simulated_moves
+
+
+class MCTSBot(BasePlayer):
+    # Monte Carlo Tree Search with decoupled UCT for the simultaneous moves and random playouts on a padded bytearray
+    # arena (see board.padded_cells), the subtree of the moves actually played is reused in the next turn
+    # the search runs for time_budget seconds per move or exactly `iterations` iterations (repeatable with the seed),
+    # the move time limit of a game caps both
+    # processes > 1 searches independent trees in a process pool and sums their root statistics (no tree reuse),
+    # the pool is shut down when the game is finished (close)
+    def __init__(self, verbose, time_budget=0.01, iterations=None, exploration=0.5, processes=1, rng=None):
+        super().__init__(verbose, rng)
+        self.time_budget = time_budget
+        self.iterations = iterations
+        self.exploration = exploration
+        self.processes = processes
+        self.executor = None
+        # tree of the previous turn: root node, its arena and heads, and the index of the selected move
+        self.root = None
+        self.root_state = None
+        self.root_move_index = None
+
+    def __str__(self):
+        budget = f'{self.iterations} iterations' if self.iterations is not None else f'{self.time_budget}s'
+        return super().__str__() + f' ({budget})'
+
+    def reuse_tree(self, cells, my_head, opponent_head):
+        # child of the previous root after the moves which were actually played (None if it's not the same game)
+        if self.root is None:
+            return None
+        root_cells, root_my_head, root_opponent_head = self.root_state
+        my_move = self.root.my_moves[self.root_move_index]
+        opponent_move = opponent_head - root_opponent_head
+        if root_my_head + my_move != my_head or opponent_move not in self.root.opponent_moves:
+            return None
+        child = self.root.children.get((self.root_move_index, self.root.opponent_moves.index(opponent_move)))
+        if child is None:
+            return None
+        root_cells = bytearray(root_cells)
+        root_cells[my_head] = 1
+        root_cells[opponent_head] = 1
+        return child if root_cells == cells else None
+
+    def get_move(self, game_matrix, possible_moves, my_coords, opponent_coords, time_budget=None):
+        start_time = time.perf_counter()
+        width = game_matrix.shape[0] + 2
+        cells = padded_cells(game_matrix)
+        my_head = (my_coords[0] + 1) * width + my_coords[1] + 1
+        opponent_head = (opponent_coords[0] + 1) * width + opponent_coords[1] + 1
+        # a part of the budget is left for the game itself
+        # the time budget of the game (if it limits the moves) replaces the bot's own and also limits a search of
+        # `iterations` iterations
+        if time_budget is not None:
+            deadline = start_time + 0.9 * time_budget
+        else:
+            deadline = start_time + 0.9 * self.time_budget if self.iterations is None else None
+
+        if self.processes > 1:
+            search = self.search_parallel(cells, my_head, opponent_head, width, deadline)
+            if search is None:
+                # the move was cancelled, the game discards it
+                return self.fallback_move(possible_moves)
+            my_moves, my_visits, my_rewards, iterations, simulated_moves = search
+        else:
+            root = self.reuse_tree(cells, my_head, opponent_head)
+            if root is None:
+                root = MCTSNode(cells, my_head, opponent_head, (-width, width, -1, 1))
+            iterations, simulated_moves = run_search(root, cells, my_head, opponent_head, width, self.rng,
+                                                     self.exploration, deadline, self.iterations, self.move_cancelled)
+            my_moves, my_visits, my_rewards = root.my_moves, root.my_visits, root.my_rewards
+
+        if self.stats is not None:
+            self.stats.count('mcts_iterations', iterations)
+            self.stats.count('simulated_moves', simulated_moves)
+
+        # the most visited move is selected
+        best_index = max(range(len(my_moves)), key=lambda i: my_visits[i])
+        if self.processes <= 1:
+            self.root, self.root_state, self.root_move_index = root, (cells, my_head, opponent_head), best_index
+        offset_moves = {offset[0] * width + offset[1]: move for move, offset in possible_moves.items()}
+        best_move = offset_moves[my_moves[best_index]]
+        if self.verbose:
+            elapsed_time = time.perf_counter() - start_time
+            print(f'{self} selects move "{best_move}" with win rate '
+                  f'{my_rewards[best_index] / max(my_visits[best_index], 1):.2f} ({iterations} iterations, '
+                  f'{simulated_moves / elapsed_time:.0f} simulated moves/s, {elapsed_time:.3f}s)', flush=True)
+        return best_move
+
+    def search_parallel(self, cells, my_head, opponent_head, width, deadline):
+        # root parallelization on a process pool (created on the first move and kept until the game is finished),
+        # None if the move is cancelled before the workers return (they stop at the deadline on their own)
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.processes)
+        time_budget = deadline - time.perf_counter() if deadline is not None else None
+        max_iterations = -(-self.iterations // self.processes) if self.iterations is not None else None
+        jobs = [(bytes(cells), my_head, opponent_head, width, self.rng.getrandbits(64), self.exploration, time_budget,
+                 max_iterations) for _ in range(self.processes)]
+        searches = [self.executor.submit(search_root_worker, job) for job in jobs]
+        while wait(searches, timeout=0.005).not_done:
+            if self.move_cancelled.is_set():
+                for search in searches:
+                    search.cancel()
+                return None
+        results = [search.result() for search in searches]
+        my_moves = results[0][0]
+        my_visits = [sum(result[1][i] for result in results) for i in range(len(my_moves))]
+        my_rewards = [sum(result[2][i] for result in results) for i in range(len(my_moves))]
+        return my_moves, my_visits, my_rewards, sum(result[3] for result in results), \
+            sum(result[4] for result in results)
+
+    def close(self):
+        # shuts down the process pool of the parallel search (the next game starts a new one)
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
@@ -1,58 +1,89 @@
 import numpy as np
-import random
-from copy import deepcopy
 
 from players.BasePlayer import BasePlayer
 
 
 class OptimizedBot(BasePlayer):
-    def __init__(self, verbose, weights=(0.41529055, 0.12742814, 0.38834967, 0.00099525)):
-        super().__init__(verbose)
+    def __init__(self, verbose, weights=(0.41529055, 0.12742814, 0.38834967, 0.00099525), rng=None):
+        super().__init__(verbose, rng)
 
         # weights of heuristic score components, values <-1.0, 1.0>
         # weights[0] - available area (positive = agoraphillic bot; negative = agoraphobic bot)
         # weights[1] - manhattan distance (positive = aggressive bot; negative = elusive bot)
         # weights[2] - head-on collision eagerness (positive = evasive; negative = ballsy)
         # weights[3] - preference to continue movement (positive = likes straight lines; negative = likes turns)
+        # weights[4] - optional, Voronoi territory (tiles reached before the opponent minus tiles reached after,
+        #              see territory.py; positive = territorial bot; negative = yielding bot)
         # RandomBot is equivalent to OptimizedBot(weights=[0.0, 0.0, 0.0, 0.0])
         # HeuristicBot is equivalent to OptimizedBot(weights=[1.0, 1.0, 1.0, 0.0])
         self.previous_move = None
-        expected_num_weights = 4
-        if len(weights) == expected_num_weights:
+        self.previous_moves = None  # move indices of every game in a batch (-1 = no previous move)
+        expected_num_weights = (4, 5)
+        if len(weights) in expected_num_weights:
             self.weights = weights
         else:
-            raise ValueError(f'Wrong number of weights: {len(weights)} (should be {expected_num_weights}).')
+            raise ValueError(f'Wrong number of weights: {len(weights)} (should be one of {expected_num_weights}).')
+        self.uses_territory = len(weights) == 5
 
     def __str__(self):
         return super().__str__() + f' {self.weights}'
 
-    def evaluate_move(self, game_matrix, move_offset, my_coords, opponent_coords, continued_move):
-        available_area = self.calculate_available_area(deepcopy(game_matrix),
-                                                       (my_coords[0] + move_offset[0], my_coords[1] + move_offset[1]))
+    def evaluate_move(self, available_area, move_offset, my_coords, opponent_coords, continued_move, territory=0):
         manhattan_distance = self.calculate_manhattan_distance(move_offset, my_coords, opponent_coords)
         continued_movement_factor = (1.0 + self.weights[3]) if continued_move else (1.0 - self.weights[3])
+        territory_score = territory * self.weights[4] if self.uses_territory else 0.0
         if manhattan_distance == 1:
             # 'enemy too close'-case: decrease score if the enemy is 1 tile away from the target tile
-            return (available_area * self.weights[0] - 5.0 * self.weights[2]) * continued_movement_factor
+            return (available_area * self.weights[0] - 5.0 * self.weights[2] + territory_score) \
+                * continued_movement_factor
         else:
-            return (available_area * self.weights[0] - manhattan_distance * self.weights[1]) * continued_movement_factor
+            return (available_area * self.weights[0] - manhattan_distance * self.weights[1] + territory_score) \
+                * continued_movement_factor
 
-    def get_move(self, game_matrix, possible_moves, my_coords, opponent_coords):
+    def get_move(self, game_matrix, possible_moves, my_coords, opponent_coords, time_budget=None):
         # similar to HeuristicBot but the heuristic score is weighted (and the weights can be optimized separately)
         # in case of a tie: choose randomly
+        available_areas, territories = self.calculate_move_features(game_matrix, possible_moves, my_coords,
+                                                                    opponent_coords, self.uses_territory)
         best_move = list(possible_moves.keys())[0]
-        best_score = self.evaluate_move(game_matrix, possible_moves[best_move], my_coords, opponent_coords,
-                                        continued_move=(self.previous_move == best_move))
+        best_score = self.evaluate_move(available_areas[best_move], possible_moves[best_move], my_coords,
+                                        opponent_coords, continued_move=(self.previous_move == best_move),
+                                        territory=territories[best_move])
 
         for move in list(possible_moves.keys())[1:]:
-            score = self.evaluate_move(game_matrix, possible_moves[move], my_coords, opponent_coords,
-                                       continued_move=(self.previous_move == move))
+            score = self.evaluate_move(available_areas[move], possible_moves[move], my_coords, opponent_coords,
+                                       continued_move=(self.previous_move == move), territory=territories[move])
             if score > best_score:
                 best_move = move
             elif score == best_score:
-                best_move = random.choice([best_move, move])
+                best_move = self.rng.choice([best_move, move])
 
         if self.verbose:
             print(f'{self} selects move "{best_move}" based on score: {np.round(best_score, 2)}', flush=True)
         self.previous_move = best_move
         return best_move
+
+    def move_replaced(self, move):
+        self.previous_move = move
+
+    def reset_batch(self, batch_size):
+        self.previous_moves = np.full(batch_size, -1)
+
+    def get_moves(self, game_matrices, regions, possible_moves, my_coords, opponent_coords, move_offsets, rngs,
+                  game_ids):
+        # vectorized evaluate_move for all possible moves of all games
+        available_areas = self.calculate_batch_move_areas(regions, possible_moves, my_coords, move_offsets)
+        manhattan_distances = self.calculate_batch_manhattan_distances(my_coords, opponent_coords, move_offsets)
+        continued_moves = self.previous_moves[game_ids][:, None] == np.arange(possible_moves.shape[1])[None, :]
+        continued_movement_factors = np.where(continued_moves, 1.0 + self.weights[3], 1.0 - self.weights[3])
+        territory_scores = self.calculate_batch_move_territories(game_matrices, my_coords, opponent_coords,
+                                                                 move_offsets) * self.weights[4] \
+            if self.uses_territory else 0.0
+        scores = np.where(manhattan_distances == 1,
+                          (available_areas * self.weights[0] - 5.0 * self.weights[2] + territory_scores)
+                          * continued_movement_factors,
+                          (available_areas * self.weights[0] - manhattan_distances * self.weights[1] + territory_scores)
+                          * continued_movement_factors)
+        moves = self.select_batch_moves(scores, possible_moves, rngs)
+        self.previous_moves[game_ids] = moves
+        return moves
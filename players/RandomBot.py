@@ -1,8 +1,17 @@
-import random
+import numpy as np
 
 from players.BasePlayer import BasePlayer
 
 
 class RandomBot(BasePlayer):
-    def get_move(self, game_matrix, possible_moves, my_coords, opponent_coords):
-        return random.choice(list(possible_moves.keys()))
+    def get_move(self, game_matrix, possible_moves, my_coords, opponent_coords, time_budget=None):
+        return self.rng.choice(list(possible_moves.keys()))
+
+    def get_arena_move(self, arena, player_index, possible_moves):
+        return self.rng.choice(list(possible_moves.keys()))
+
+    def get_moves(self, game_matrices, regions, possible_moves, my_coords, opponent_coords, move_offsets, rngs,
+                  game_ids):
+        # random.choice over the list of possible moves uses only its length, so indices match the scalar choices
+        return np.array([rng.choice([move for move in range(len(row)) if row[move]])
+                         for rng, row in zip(rngs, possible_moves.tolist())], dtype=int)
@@ -1,52 +1,36 @@
 import numpy as np
-import random
-from stable_baselines3 import PPO, A2C, DQN
 
+from encoding import ObservationEncoder
 from players.BasePlayer import BasePlayer
+from policy import load_policy, sample_actions
 
 
 class ReinforcementLearningBot(BasePlayer):
-    def __init__(self, verbose, model_name='players/A2C15v2', model_type='a2c', model_size=15):
-        super().__init__(verbose)
+    def __init__(self, verbose, model_name='players/A2C15v2', model_type='a2c', model_size=15, rng=None):
+        super().__init__(verbose, rng)
         self.model_name = model_name
-        if model_type == 'ppo':
-            self.model = PPO.load(model_name)
-        elif model_type == 'a2c':
-            self.model = A2C.load(model_name)
-        elif model_type == 'dqn':
-            self.model = DQN.load(model_name)
-        else:
+        if model_type not in ('ppo', 'a2c', 'dqn', 'numpy'):
             raise ValueError(f'{self}: unknown model_type: {model_type}')
+        # models are cached per process, so many bots with the same model load it only once
+        self.policy = load_policy(model_name, model_type)
         self.action_map = {0: 'up', 1: 'down', 2: 'left', 3: 'right'}
         self.model_size = model_size
-        
+        self.encoder = ObservationEncoder(model_size)
+
     def __str__(self):
         return super().__str__() + f' ({self.model_name[-7:]})'
 
-    def get_move(self, game_matrix, possible_moves, my_coords, opponent_coords):
-        player_number = int(abs(game_matrix[my_coords]))
-        matrix_map = {0: 0, -1: 1, -2: 1,
-                      1: 2 if player_number == 1 else 3,
-                      2: 2 if player_number == 2 else 3}
+    def get_move(self, game_matrix, possible_moves, my_coords, opponent_coords, time_budget=None):
         # translate game_matrix values to player_number-irrelevant generalisation
         # 0: empty, 1: any tail, 2: player head, 3: enemy head
-        translated_game_matrix = np.vectorize(matrix_map.get)(game_matrix)
-
-        # enable game arenas different than self.model_size
-        if game_matrix.shape[0] < self.model_size:
-            diff = self.model_size - game_matrix.shape[0]
-            padding1 = diff // 2
-            padding2 = (diff // 2) if (diff % 2 == 0) else (diff // 2 + 1)
-            observation = np.pad(translated_game_matrix, ((padding1, padding2), (padding1, padding2)), 
-                                 'constant', constant_values=1)
-        elif game_matrix.shape[0] > self.model_size:
-            upper_border = min(max(0, int(my_coords[0])-self.model_size//2), game_matrix.shape[0]-self.model_size)
-            left_border = min(max(0, int(my_coords[1])-self.model_size//2), game_matrix.shape[1]-self.model_size)
-            observation = translated_game_matrix[upper_border:(upper_border+self.model_size), left_border:(left_border+self.model_size)]
-        else:
-            observation = translated_game_matrix
+        # arenas different than self.model_size are padded or cropped around the player's head
+        player_number = int(abs(game_matrix[my_coords]))
+        observation = self.encoder.encode(game_matrix, player_number, my_coords)
 
-        action, _states = self.model.predict(observation)
+        # action is sampled from the model's distribution with the player's RNG (like model.predict)
+        action = sample_actions(self.policy.action_probabilities(observation[None]), [self.rng])[0]
+        if self.stats is not None:
+            self.stats.count('model_predict_calls')
         move = self.action_map[int(action)]
         if move in possible_moves.keys():
             if self.verbose:
@@ -54,7 +38,26 @@ class ReinforcementLearningBot(BasePlayer):
             return move
         else:
             # handle impossible moves by selecting random possible move
-            random_move = random.choice(list(possible_moves.keys()))
+            random_move = self.rng.choice(list(possible_moves.keys()))
             if self.verbose:
                 print(f'{self} selected impossible move "{move}", so "{random_move}" was selected randomly instead', flush=True)
             return random_move
+
+    def get_moves(self, game_matrices, regions, possible_moves, my_coords, opponent_coords, move_offsets, rngs,
+                  game_ids):
+        # observations of all games evaluated in a single forward pass of the model
+        batch_indices = np.arange(len(game_matrices))
+        player_numbers = np.abs(game_matrices[batch_indices, my_coords[:, 0], my_coords[:, 1]])
+        if game_matrices.shape[1] == self.model_size:
+            observations = self.encoder.encode_both(game_matrices)[player_numbers - 1, batch_indices]
+        else:
+            observations = np.empty((len(game_matrices), self.model_size, self.model_size),
+                                    dtype=self.encoder.lookup_tables.dtype)
+            for i in batch_indices:
+                self.encoder.encode(game_matrices[i], player_numbers[i], my_coords[i], out=observations[i])
+
+        moves = sample_actions(self.policy.action_probabilities(observations), rngs)
+        # handle impossible moves by selecting random possible move (like in get_move)
+        for i in np.flatnonzero(~possible_moves[batch_indices, moves]):
+            moves[i] = rngs[i].choice(list(np.flatnonzero(possible_moves[i])))
+        return moves
@@ -0,0 +1,16 @@
+from players.BasePlayer import BasePlayer
+
+
+class ReplayPlayer(BasePlayer):
+    # plays the moves of a recorded game (see replay.py) one after another
+    def __init__(self, verbose, moves, rng=None):
+        super().__init__(verbose, rng)
+        self.moves = list(moves)
+        self.move_index = 0
+
+    def get_move(self, game_matrix, possible_moves, my_coords, opponent_coords, time_budget=None):
+        move = self.moves[self.move_index]
+        self.move_index += 1
+        if move not in possible_moves:
+            raise ValueError(f'recorded move "{move}" is not possible, the replay doesn`t match the arena')
+        return move
@@ -0,0 +1,350 @@
+import random
+import time
+from collections import OrderedDict
+
+from board import padded_cells
+from players.BasePlayer import BasePlayer
+from players.OptimizedBot import OptimizedBot
+from territory import ChamberAnalyzer
+
+# scores of finished games (a win/loss found at a smaller depth is better/worse than a later one)
+WIN_SCORE = 100000
+DECISIVE_SCORE = WIN_SCORE - 10000
+# transposition table entry bounds
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+# seconds of the time budget left after the deadline (at most half of the budget): a leaf evaluation or a garbage
+# collection between two time checks takes a few milliseconds on large arenas, and with a move time limit the bot
+# shares the interpreter with the other player's thread
+DEADLINE_MARGIN = 0.015
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class SearchBot(BasePlayer):
+    # depth-limited search of the simultaneous moves as a paranoid alpha-beta: the bot moves first (max nodes)
+    # and the opponent answers knowing the bot's move (min nodes), then both moves are applied like in
+    # Blockade.process_move (moving to the same tile is a head collision - a draw)
+    # iterative deepening runs until time_budget (seconds per move) is used up, leaves are scored with the Voronoi
+    # territory difference (tiles which the bot reaches before the opponent minus tiles which the opponent reaches
+    # first), after the players are walled off the bot switches to filling its own region
+    def __init__(self, verbose, time_budget=0.1, max_depth=64, tt_size=200000,
+                 ordering_weights=(0.41529055, 0.12742814, 0.38834967, 0.00099525), rng=None):
+        super().__init__(verbose, rng)
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        # transposition table {zobrist key: (depth, score, bound, best move)} with least recently used eviction
+        self.tt_size = tt_size
+        self.transposition_table = OrderedDict()
+        # root moves are ordered with the OptimizedBot heuristic (the rest of the tree by the transposition table)
+        self.move_ordering = OptimizedBot(verbose=False, weights=ordering_weights)
+        self.previous_move = None
+        self.width = None
+        self.deadline = None
+        self.searched_nodes = 0
+
+    def __str__(self):
+        return super().__str__() + f' ({self.time_budget}s)'
+
+    def prepare_arena(self, arena_size):
+        # padded flat arena: index = (y + 1) * width + x + 1, the border is always blocked
+        # zobrist keys of blocked tiles and of the heads are fixed per arena size (and independent of the game seed)
+        if self.width == arena_size + 2:
+            return
+        self.width = arena_size + 2
+        self.directions = (-self.width, self.width, -1, 1)  # up, down, left, right
+        self.tile_colors = [(i // self.width + i % self.width) % 2 for i in range(self.width ** 2)]
+        zobrist_rng = random.Random(arena_size)
+        self.blocked_keys = [zobrist_rng.getrandbits(64) for _ in range(self.width ** 2)]
+        self.my_head_keys = [zobrist_rng.getrandbits(64) for _ in range(self.width ** 2)]
+        self.opponent_head_keys = [zobrist_rng.getrandbits(64) for _ in range(self.width ** 2)]
+        self.transposition_table.clear()
+
+    def get_move(self, game_matrix, possible_moves, my_coords, opponent_coords, time_budget=None):
+        start_time = time.perf_counter()
+        # the deadline covers the whole move (including the setup below), a part of the budget is left for unwinding
+        # the search after the deadline (and for the game itself)
+        # the time budget of the game (if it limits the moves) replaces the bot's own
+        if time_budget is None:
+            time_budget = self.time_budget
+        self.deadline = start_time + time_budget - min(max(0.1 * time_budget, DEADLINE_MARGIN), 0.5 * time_budget)
+        self.searched_nodes = 0
+        self.prepare_arena(game_matrix.shape[0])
+        self.cells = padded_cells(game_matrix)
+        my_head = (my_coords[0] + 1) * self.width + my_coords[1] + 1
+        opponent_head = (opponent_coords[0] + 1) * self.width + opponent_coords[1] + 1
+        self.key = self.my_head_keys[my_head] ^ self.opponent_head_keys[opponent_head]
+        for i, blocked in enumerate(self.cells):
+            if blocked:
+                self.key ^= self.blocked_keys[i]
+
+        # root moves ordered by the OptimizedBot score (the best first)
+        available_areas = self.calculate_move_areas(game_matrix, possible_moves, my_coords)
+        moves = sorted(possible_moves.keys(), reverse=True,
+                       key=lambda move: self.move_ordering.evaluate_move(available_areas[move], possible_moves[move],
+                                                                         my_coords, opponent_coords,
+                                                                         continued_move=(self.previous_move == move)))
+        offsets = {move: possible_moves[move][0] * self.width + possible_moves[move][1] for move in moves}
+
+        best_move = moves[0]
+        if len(moves) > 1 and time.perf_counter() < self.deadline:
+            if self.is_separated(my_head, opponent_head):
+                chamber_bounds = self.calculate_chamber_bounds(game_matrix, possible_moves, my_coords)
+                best_move, score, depth = self.search_filling(my_head, moves, offsets, chamber_bounds)
+                mode = 'space-filling'
+            else:
+                best_move, score, depth = self.search_paranoid(my_head, opponent_head, moves, offsets)
+                mode = 'paranoid alpha-beta'
+            if self.verbose:
+                print(f'{self} selects move "{best_move}" based on {mode} score: {score} (depth {depth}, '
+                      f'{self.searched_nodes} nodes, {time.perf_counter() - start_time:.3f}s)', flush=True)
+        elif self.verbose and len(moves) > 1:
+            print(f'{self} selects move "{best_move}" without a search (no time left)', flush=True)
+        elif self.verbose:
+            print(f'{self} selects the only possible move "{best_move}"', flush=True)
+        if self.stats is not None:
+            self.stats.count('search_nodes', self.searched_nodes)
+        self.previous_move = best_move
+        return best_move
+
+    def move_replaced(self, move):
+        self.previous_move = move
+
+    def check_time(self):
+        self.searched_nodes += 1
+        if time.perf_counter() > self.deadline or self.move_cancelled.is_set():
+            raise SearchTimeout()
+
+    def free_neighbors(self, head):
+        cells = self.cells
+        return [direction for direction in self.directions if not cells[head + direction]]
+
+    def is_separated(self, my_head, opponent_head):
+        # True if the opponent can't reach any tile of the bot's region (the players are walled off)
+        cells = self.cells
+        seen = bytearray(cells)
+        stack = [my_head]
+        while stack:
+            i = stack.pop()
+            for direction in self.directions:
+                j = i + direction
+                if j == opponent_head:
+                    return False
+                if not seen[j]:
+                    seen[j] = 1
+                    stack.append(j)
+        return True
+
+    def evaluate(self, my_head, opponent_head):
+        # Voronoi territory difference: both players expand breadth-first at the same speed,
+        # tiles reached by both at the same time belong to nobody
+        seen = bytearray(self.cells)
+        directions = self.directions
+        my_frontier = [my_head]
+        opponent_frontier = [opponent_head]
+        score = 0
+        while my_frontier or opponent_frontier:
+            my_next = {i + direction for i in my_frontier for direction in directions if not seen[i + direction]}
+            opponent_next = {i + direction for i in opponent_frontier for direction in directions
+                             if not seen[i + direction]}
+            contested = my_next & opponent_next
+            my_next -= contested
+            opponent_next -= contested
+            for i in contested:
+                seen[i] = 1
+            for i in my_next:
+                seen[i] = 1
+            for i in opponent_next:
+                seen[i] = 1
+            score += len(my_next) - len(opponent_next)
+            my_frontier = my_next
+            opponent_frontier = opponent_next
+        return score
+
+    def search_paranoid(self, my_head, opponent_head, moves, offsets):
+        # iterative deepening, every depth is one move of both players
+        root_moves = [offsets[move] for move in moves]
+        offset_moves = {offset: move for move, offset in offsets.items()}
+        best_move, best_score, completed_depth = moves[0], None, 0
+        for depth in range(1, self.max_depth + 1):
+            try:
+                score, move_offset = self.search_root(my_head, opponent_head, root_moves, depth)
+            except SearchTimeout:
+                break
+            best_move = offset_moves[move_offset]
+            best_score, completed_depth = score, depth
+            # the best move of the previous depth is searched first
+            root_moves.remove(move_offset)
+            root_moves.insert(0, move_offset)
+            if abs(score) >= DECISIVE_SCORE:
+                break
+        return best_move, best_score, completed_depth
+
+    def search_root(self, my_head, opponent_head, root_moves, depth):
+        alpha = -WIN_SCORE - 1
+        best_offset = root_moves[0]
+        for my_move in root_moves:
+            score = self.opponent_reply(my_head, opponent_head, my_move, depth, alpha, WIN_SCORE + 1, 0)
+            if score > alpha:
+                alpha, best_offset = score, my_move
+        return alpha, best_offset
+
+    def max_node(self, my_head, opponent_head, depth, alpha, beta, ply):
+        self.check_time()
+        my_moves = self.free_neighbors(my_head)
+        opponent_moves = self.free_neighbors(opponent_head)
+        if not my_moves:
+            return 0 if not opponent_moves else -WIN_SCORE + ply
+        if not opponent_moves:
+            return WIN_SCORE - ply
+        if depth == 0:
+            return self.evaluate(my_head, opponent_head)
+
+        key = self.key
+        entry = self.transposition_table.get(key)
+        tt_move = None
+        if entry is not None:
+            self.transposition_table.move_to_end(key)
+            entry_depth, entry_score, bound, tt_move = entry
+            if entry_depth >= depth:
+                # decisive scores are stored relative to the node
+                entry_score = entry_score - ply if entry_score >= DECISIVE_SCORE \
+                    else entry_score + ply if entry_score <= -DECISIVE_SCORE else entry_score
+                if bound == EXACT or (bound == LOWER_BOUND and entry_score >= beta) \
+                        or (bound == UPPER_BOUND and entry_score <= alpha):
+                    return entry_score
+            if tt_move in my_moves:
+                my_moves.remove(tt_move)
+                my_moves.insert(0, tt_move)
+
+        original_alpha = alpha
+        best_score, best_move = -WIN_SCORE - 1, my_moves[0]
+        for my_move in my_moves:
+            score = self.opponent_reply(my_head, opponent_head, my_move, depth, alpha, beta, ply)
+            if score > best_score:
+                best_score, best_move = score, my_move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+
+        bound = UPPER_BOUND if best_score <= original_alpha else LOWER_BOUND if best_score >= beta else EXACT
+        stored_score = best_score + ply if best_score >= DECISIVE_SCORE \
+            else best_score - ply if best_score <= -DECISIVE_SCORE else best_score
+        self.transposition_table[key] = (depth, stored_score, bound, best_move)
+        self.transposition_table.move_to_end(key)
+        if len(self.transposition_table) > self.tt_size:
+            self.transposition_table.popitem(last=False)
+        return best_score
+
+    def opponent_reply(self, my_head, opponent_head, my_move, depth, alpha, beta, ply):
+        # min node: the opponent's best answer to my_move
+        cells = self.cells
+        my_target = my_head + my_move
+        best_score = WIN_SCORE + 1
+        # moves towards the bot first (they are the most dangerous ones)
+        width = self.width
+        opponent_moves = sorted(self.free_neighbors(opponent_head),
+                                key=lambda move: abs((opponent_head + move) // width - my_target // width)
+                                + abs((opponent_head + move) % width - my_target % width))
+        for opponent_move in opponent_moves:
+            opponent_target = opponent_head + opponent_move
+            if opponent_target == my_target:
+                # head collision
+                score = 0
+            else:
+                # make both moves, the old heads stay blocked (as tails)
+                key = self.key
+                cells[my_target] = 1
+                cells[opponent_target] = 1
+                self.key = key ^ self.blocked_keys[my_target] ^ self.blocked_keys[opponent_target] \
+                    ^ self.my_head_keys[my_head] ^ self.my_head_keys[my_target] \
+                    ^ self.opponent_head_keys[opponent_head] ^ self.opponent_head_keys[opponent_target]
+                try:
+                    score = self.max_node(my_target, opponent_target, depth - 1, alpha, beta, ply + 1)
+                finally:
+                    cells[my_target] = 0
+                    cells[opponent_target] = 0
+                    self.key = key
+            if score < best_score:
+                best_score = score
+            if score < beta:
+                beta = score
+            if alpha >= beta:
+                break
+        return best_score
+
+    def estimate_fill(self, head):
+        # upper bound of the number of moves which can be made from head: a path alternates the colors of
+        # the checkerboard, so it can't be longer than twice the number of tiles of the less common color (+1)
+        seen = bytearray(self.cells)
+        tile_colors = self.tile_colors
+        head_color = tile_colors[head]
+        stack = [head]
+        same_color = other_color = 0
+        while stack:
+            i = stack.pop()
+            for direction in self.directions:
+                j = i + direction
+                if not seen[j]:
+                    seen[j] = 1
+                    if tile_colors[j] == head_color:
+                        same_color += 1
+                    else:
+                        other_color += 1
+                    stack.append(j)
+        # the first move goes to a tile of the other color
+        return 2 * same_color + 1 if other_color > same_color else 2 * other_color
+
+    def calculate_chamber_bounds(self, game_matrix, possible_moves, my_coords):
+        # upper bound of the number of moves which can be made with every possible move (the move itself and the tiles
+        # of the chambers along the best branch of the chamber tree behind it)
+        analyzer = ChamberAnalyzer(game_matrix)
+        bounds = dict()
+        for move, offset in possible_moves.items():
+            target = (my_coords[0] + offset[0], my_coords[1] + offset[1])
+            analyzer.free[target] = False
+            bounds[move] = analyzer.chamber_area(target) + 1
+            analyzer.free[target] = True
+        return bounds
+
+    def search_filling(self, my_head, moves, offsets, chamber_bounds):
+        # the opponent can't interfere anymore - maximize the number of moves the bot can still make
+        # (moves made in the search + the upper bound of moves at the end), iterative deepening like search_paranoid
+        # scores are capped by the chamber bounds of the moves (the checkerboard bound doesn't see articulation
+        # points), which also order the moves before the first depth is searched
+        # ties are broken by hugging walls (the move with fewer free neighbors leaves less unreachable space)
+        bound = self.estimate_fill(my_head)
+        moves = sorted(moves, key=lambda move: chamber_bounds[move], reverse=True)
+        best_move, best_score, completed_depth = moves[0], None, 0
+        for depth in range(1, self.max_depth + 1):
+            try:
+                scores = {move: min(self.fill_node(my_head + offsets[move], depth - 1) + 1, chamber_bounds[move])
+                          for move in moves}
+            except SearchTimeout:
+                break
+            best_move = max(moves, key=lambda move: (scores[move], -len(self.free_neighbors(my_head + offsets[move]))))
+            best_score, completed_depth = scores[best_move], depth
+            if depth >= bound:
+                # the search can't get any deeper
+                break
+        return best_move, best_score, completed_depth
+
+    def fill_node(self, head, depth):
+        self.check_time()
+        cells = self.cells
+        cells[head] = 1
+        try:
+            bound = self.estimate_fill(head)
+            if depth == 0 or bound == 0:
+                return bound
+            best_score = 0
+            for direction in self.free_neighbors(head):
+                best_score = max(best_score, self.fill_node(head + direction, depth - 1) + 1)
+                if best_score >= bound:
+                    # no other move can be better
+                    break
+            return best_score
+        finally:
+            cells[head] = 0
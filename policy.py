@@ -0,0 +1,129 @@
+import argparse
+import os
+import numpy as np
+
+# policies of the ReinforcementLearningBot models loaded in this process: {(model_name, model_type): policy}
+# (every model is loaded once per process, no matter how many bots use it)
+loaded_policies = dict()
+
+
+def load_policy(model_name, model_type):
+    # model_type - 'ppo', 'a2c' or 'dqn' for Stable Baselines 3 models (model_name.zip)
+    #              or 'numpy' for policies exported with export_numpy_policy (model_name.npz, no torch required)
+    key = (model_name, model_type)
+    if key not in loaded_policies:
+        if model_type == 'numpy':
+            loaded_policies[key] = NumpyPolicy.load(model_name)
+        else:
+            loaded_policies[key] = TorchPolicy(load_sb3_model(model_name, model_type), model_type)
+    return loaded_policies[key]
+
+
+def load_sb3_model(model_name, model_type):
+    # Stable Baselines 3 (and torch) are imported only when a model is actually loaded
+    if model_type == 'ppo':
+        from stable_baselines3 import PPO
+        return PPO.load(model_name)
+    elif model_type == 'a2c':
+        from stable_baselines3 import A2C
+        return A2C.load(model_name)
+    elif model_type == 'dqn':
+        from stable_baselines3 import DQN
+        return DQN.load(model_name)
+    raise ValueError(f'unknown model_type: {model_type} (should be one of: ppo, a2c, dqn, numpy)')
+
+
+def sample_actions(probabilities, rngs):
+    # one action per row of the (B, actions) probabilities drawn with the RNGs of the games (one number per game)
+    cumulative = np.cumsum(probabilities, axis=1)
+    draws = np.array([rng.random() for rng in rngs]) * cumulative[:, -1]
+    return np.minimum((cumulative <= draws[:, None]).sum(axis=1), probabilities.shape[1] - 1)
+
+
+class TorchPolicy:
+    # action probabilities of a Stable Baselines 3 model for a whole batch of observations in one forward pass
+    # (the same distribution which model.predict samples from)
+    def __init__(self, model, model_type):
+        import torch
+        self.torch = torch
+        self.model = model
+        self.model_type = model_type
+
+    def action_probabilities(self, observations):
+        # observations - (B, model_size, model_size) array, returns a (B, 4) array
+        with self.torch.inference_mode():
+            observations, _ = self.model.policy.obs_to_tensor(np.asarray(observations))
+            if self.model_type == 'dqn':
+                # epsilon-greedy like DQN.predict
+                q_values = self.model.policy.q_net(observations).cpu().numpy()
+                return epsilon_greedy(q_values, self.model.exploration_rate)
+            return self.model.policy.get_distribution(observations).distribution.probs.cpu().numpy()
+
+
+class NumpyPolicy:
+    # lightweight NumPy copy of the policy network of a Stable Baselines 3 model (MlpPolicy)
+    def __init__(self, weights, biases, activation, exploration_rate=None):
+        self.weights = weights
+        self.biases = biases
+        self.activation = {'tanh': np.tanh, 'relu': lambda x: np.maximum(x, 0)}[activation]
+        # None for actor-critic models (softmax over logits), else epsilon of an epsilon-greedy DQN
+        self.exploration_rate = exploration_rate
+
+    @classmethod
+    def load(cls, model_name):
+        with np.load(model_name + '.npz') as data:
+            num_layers = int(data['num_layers'])
+            exploration_rate = float(data['exploration_rate'])
+            return cls([data[f'weight{i}'] for i in range(num_layers)], [data[f'bias{i}'] for i in range(num_layers)],
+                       str(data['activation']), None if np.isnan(exploration_rate) else exploration_rate)
+
+    def action_probabilities(self, observations):
+        # observations - (B, model_size, model_size) array, returns a (B, 4) array
+        x = np.asarray(observations, dtype=np.float32).reshape(len(observations), -1)
+        for weight, bias in zip(self.weights[:-1], self.biases[:-1]):
+            x = self.activation(x @ weight + bias)
+        x = x @ self.weights[-1] + self.biases[-1]
+        if self.exploration_rate is not None:
+            return epsilon_greedy(x, self.exploration_rate)
+        x = np.exp(x - x.max(axis=1, keepdims=True))
+        return x / x.sum(axis=1, keepdims=True)
+
+
+def epsilon_greedy(q_values, exploration_rate):
+    probabilities = np.full(q_values.shape, exploration_rate / q_values.shape[1])
+    probabilities[np.arange(len(q_values)), np.argmax(q_values, axis=1)] += 1.0 - exploration_rate
+    return probabilities
+
+
+def export_numpy_policy(model_name, model_type, output_name=None):
+    # saves the policy network of a Stable Baselines 3 model as output_name.npz (by default next to the model),
+    # so it can be used with model_type='numpy' without torch
+    import torch
+    model = load_sb3_model(model_name, model_type)
+    if model_type == 'dqn':
+        layers = list(model.policy.q_net.q_net)
+        exploration_rate = model.exploration_rate
+    else:
+        layers = list(model.policy.mlp_extractor.policy_net) + [model.policy.action_net]
+        exploration_rate = np.nan
+    linear_layers = [layer for layer in layers if isinstance(layer, torch.nn.Linear)]
+    activations = {type(layer).__name__.lower() for layer in layers if not isinstance(layer, torch.nn.Linear)}
+    if len(activations) != 1 or not activations <= {'tanh', 'relu'}:
+        raise ValueError(f'unsupported policy network: {layers}')
+
+    arrays = dict(num_layers=len(linear_layers), activation=activations.pop(), exploration_rate=exploration_rate)
+    for i, layer in enumerate(linear_layers):
+        arrays[f'weight{i}'] = layer.weight.detach().cpu().numpy().T.astype(np.float32)
+        arrays[f'bias{i}'] = layer.bias.detach().cpu().numpy().astype(np.float32)
+    output_name = output_name if output_name is not None else os.path.splitext(model_name)[0]
+    np.savez(output_name, **arrays)
+    return output_name + '.npz'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('model_name', help='path of a Stable Baselines 3 model, e.g. players/A2C15v2')
+    parser.add_argument('model_type', help='type of the model', choices=['ppo', 'a2c', 'dqn'])
+    parser.add_argument('-o', '--output-name', help='path of the exported policy (default: model_name)', default=None)
+    args = parser.parse_args()
+    print(f'Exported to {export_numpy_policy(args.model_name, args.model_type, args.output_name)}')
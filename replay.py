@@ -0,0 +1,261 @@
+import argparse
+import bisect
+import mmap
+import numpy as np
+import os
+import struct
+import zlib
+
+from board import Board, starting_heads, P1_HEAD, P1_TAIL, P2_HEAD, P2_TAIL, COLLISION
+
+# compact binary game log: a file header followed by zlib compressed chunks of game records
+# chunk: <number of games: uint32, compressed size: uint32> + compressed records (new chunks are only appended,
+# so many games can be written without rewriting the file and an interrupted write loses only the last chunk)
+# record: <arena size: uint8, outcome: uint8, seed: uint64, number of moves: uint16, lengths of the player specs:
+# 2x uint16> + utf-8 player specs + moves of both players (2 bits per move, 4 moves per byte: p1, p2, p1, p2, ...)
+# games played without a seed (their players weren't reseeded, so the game can't be repeated) have the UNSEEDED bit
+# set in the outcome byte and seed 0, they are read back with seed None (so they differ from games of seed 0)
+MAGIC = b'BLOCKADE-REPLAY\x01'
+UNSEEDED = 0x80
+CHUNK_HEADER = struct.Struct('<II')
+RECORD_HEADER = struct.Struct('<BBQHHH')
+MOVES = ('up', 'down', 'left', 'right')  # move codes 0-3, the same order as Blockade.move_dict
+MOVE_CODES = {move: code for code, move in enumerate(MOVES)}
+MOVE_OFFSETS = ((-1, 0), (1, 0), (0, -1), (0, 1))  # (y, x) offsets of the move codes
+CODE_SHIFTS = np.array([6, 4, 2, 0], dtype=np.uint8)
+
+
+def scan_chunks(buffer, size):
+    # (offset of the compressed data, its size, number of games) of all complete chunks and the end of the last one
+    # (an incomplete chunk at the end is left by an interrupted write)
+    chunks = []
+    offset = len(MAGIC)
+    while offset + CHUNK_HEADER.size <= size:
+        number_of_games, chunk_size = CHUNK_HEADER.unpack_from(buffer, offset)
+        if offset + CHUNK_HEADER.size + chunk_size > size:
+            break
+        chunks.append((offset + CHUNK_HEADER.size, chunk_size, number_of_games))
+        offset += CHUNK_HEADER.size + chunk_size
+    return chunks, offset
+
+
+class GameRecord:
+    # a single finished game: player specs (e.g. tournament specs), game seed (None - played without a seed),
+    # outcome (0 - draw, 1 - player1 won, 2 - player2 won) and a (number of moves, 2) uint8 array of move codes of
+    # both players
+    def __init__(self, arena_size, player1_spec, player2_spec, seed, outcome, move_codes):
+        self.arena_size = arena_size
+        self.player1_spec = player1_spec
+        self.player2_spec = player2_spec
+        self.seed = seed
+        self.outcome = outcome
+        self.move_codes = np.asarray(move_codes, dtype=np.uint8).reshape(-1, 2)
+
+    def __repr__(self):
+        return f'GameRecord({self.player1_spec} vs {self.player2_spec}, arena_size={self.arena_size}, ' \
+               f'seed={self.seed}, outcome={self.outcome}, moves={len(self.move_codes)})'
+
+    @classmethod
+    def from_moves(cls, arena_size, player1_spec, player2_spec, seed, outcome, moves):
+        # moves - list of (player1 move, player2 move) names
+        return cls(arena_size, player1_spec, player2_spec, seed, outcome,
+                   [(MOVE_CODES[p1_move], MOVE_CODES[p2_move]) for p1_move, p2_move in moves])
+
+    def moves(self):
+        return [(MOVES[p1_code], MOVES[p2_code]) for p1_code, p2_code in self.move_codes.tolist()]
+
+    def encode(self):
+        player1_spec = self.player1_spec.encode()
+        player2_spec = self.player2_spec.encode()
+        codes = self.move_codes.reshape(-1)
+        codes = np.concatenate([codes, np.zeros(-len(codes) % 4, dtype=np.uint8)]).reshape(-1, 4)
+        packed = np.bitwise_or.reduce(codes << CODE_SHIFTS, axis=1).astype(np.uint8)
+        # random.Random seeds integers by their absolute value, so it's the same game
+        outcome, seed = (self.outcome, abs(self.seed)) if self.seed is not None else (self.outcome | UNSEEDED, 0)
+        return RECORD_HEADER.pack(self.arena_size, outcome, seed, len(self.move_codes),
+                                  len(player1_spec), len(player2_spec)) + player1_spec + player2_spec + packed.tobytes()
+
+    @classmethod
+    def decode(cls, buffer, offset=0):
+        # returns the record and the offset of the next one
+        arena_size, outcome, seed, number_of_moves, player1_length, player2_length = \
+            RECORD_HEADER.unpack_from(buffer, offset)
+        offset += RECORD_HEADER.size
+        player1_spec = bytes(buffer[offset:offset + player1_length]).decode()
+        offset += player1_length
+        player2_spec = bytes(buffer[offset:offset + player2_length]).decode()
+        offset += player2_length
+        packed_length = (2 * number_of_moves + 3) // 4
+        packed = np.frombuffer(buffer, dtype=np.uint8, count=packed_length, offset=offset)
+        codes = ((packed[:, None] >> CODE_SHIFTS) & 3).reshape(-1)[:2 * number_of_moves]
+        if outcome & UNSEEDED:
+            outcome, seed = outcome & ~UNSEEDED, None
+        return cls(arena_size, player1_spec, player2_spec, seed, outcome, codes), offset + packed_length
+
+    def states(self):
+        # rebuilds the game move by move with the rules of Blockade.process_move, yields (number of moves,
+        # game matrix, player1 head, player2 head) before the first move and after every move
+        # (the game matrix is updated in place - copy it to keep a state)
+        board = Board.start(self.arena_size)
+        p1_head, p2_head = starting_heads(self.arena_size)
+        yield 0, board.game_matrix, p1_head, p2_head
+        for move_number, (p1_code, p2_code) in enumerate(self.move_codes.tolist(), start=1):
+            board.set(p1_head, P1_TAIL)
+            p1_head = (p1_head[0] + MOVE_OFFSETS[p1_code][0], p1_head[1] + MOVE_OFFSETS[p1_code][1])
+            board.set(p1_head, P1_HEAD)
+            board.set(p2_head, P2_TAIL)
+            p2_head = (p2_head[0] + MOVE_OFFSETS[p2_code][0], p2_head[1] + MOVE_OFFSETS[p2_code][1])
+            board.set(p2_head, P2_HEAD)
+            if p1_head == p2_head:
+                board.set(p1_head, COLLISION)
+                p1_head = p2_head = None
+            yield move_number, board.game_matrix, p1_head, p2_head
+
+    def board(self, move_number=None):
+        # board after move_number moves (by default: the final board)
+        if move_number is None or move_number > len(self.move_codes):
+            move_number = len(self.move_codes)
+        for number, game_matrix, _, _ in self.states():
+            if number == move_number:
+                return Board(self.arena_size, game_matrix)
+
+
+class ReplayWriter:
+    # appends game records to a replay file, the records are compressed in chunks of chunk_size games
+    # works as the replay_writer of Blockade (and as a context manager, which writes the last chunk)
+    def __init__(self, path, chunk_size=4096, compression_level=6):
+        self.chunk_size = chunk_size
+        self.compression_level = compression_level
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        else:
+            with open(path, 'rb') as file:
+                if file.read(len(MAGIC)) != MAGIC:
+                    self.file.close()
+                    raise ValueError(f'not a replay file: {path}')
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    size = len(buffer)
+                    _, end = scan_chunks(buffer, size)
+            # an incomplete chunk of an interrupted write is removed, so new chunks follow the last complete one
+            if end < size:
+                self.file.truncate(end)
+                self.file.seek(end)
+        self.records = []
+
+    def append(self, record):
+        self.records.append(record.encode())
+        if len(self.records) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.records:
+            data = zlib.compress(b''.join(self.records), self.compression_level)
+            self.file.write(CHUNK_HEADER.pack(len(self.records), len(data)) + data)
+            self.records = []
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ReplayReader:
+    # lazy reader of a memory-mapped replay file: iterating decompresses one chunk at a time and indexing decompresses
+    # only the chunk of the game (the last used chunk is cached)
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.size = os.fstat(file.fileno()).st_size
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f'not a replay file: {path}')
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        # chunk index: offsets of the compressed data, their sizes and numbers of games before every chunk
+        chunks, _ = scan_chunks(self.buffer, self.size)
+        self.chunk_offsets = [offset for offset, _, _ in chunks]
+        self.chunk_sizes = [chunk_size for _, chunk_size, _ in chunks]
+        self.first_games = [0] + np.cumsum([number_of_games for _, _, number_of_games in chunks]).tolist()
+        self.cached_chunk = (None, None)
+
+    def __len__(self):
+        return self.first_games[-1]
+
+    def read_chunk(self, chunk):
+        if self.cached_chunk[0] != chunk:
+            offset = self.chunk_offsets[chunk]
+            data = zlib.decompress(self.buffer[offset:offset + self.chunk_sizes[chunk]])
+            records = []
+            offset = 0
+            for _ in range(self.first_games[chunk + 1] - self.first_games[chunk]):
+                record, offset = GameRecord.decode(data, offset)
+                records.append(record)
+            self.cached_chunk = (chunk, records)
+        return self.cached_chunk[1]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f'game index out of range: {index}')
+        chunk = bisect.bisect_right(self.first_games, index) - 1
+        return self.read_chunk(chunk)[index - self.first_games[chunk]]
+
+    def __iter__(self):
+        for chunk in range(len(self.chunk_offsets)):
+            yield from self.read_chunk(chunk)
+
+    def close(self):
+        self.cached_chunk = (None, None)
+        self.buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', help='replay file')
+    parser.add_argument('-i', '--index', help='index of the replayed game', type=int, default=0)
+    parser.add_argument('-n', '--move-number', help='number of moves skipped at the beginning of the replay',
+                        type=int, default=0)
+    parser.add_argument('-l', '--list', action='store_true', help='lists the games of the file instead of replaying')
+    parser.add_argument('-t', '--tile-size', help='size of a square game tile (in pixels)', type=int,
+                        choices=range(15, 80, 5), default=50)
+    parser.add_argument('-s', '--game-speed', help='game speed, number of moves per second (floats between 1.0-60.0)',
+                        type=float, default=2.0)
+    parser.add_argument('-m', '--mute-sound', action='store_true', help='mutes game sound effects')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='verbosity switch, prints game info to the terminal')
+    args = parser.parse_args()
+
+    with ReplayReader(args.path) as reader:
+        if args.list:
+            for i, game_record in enumerate(reader):
+                print(f'{i}: {game_record}')
+        else:
+            # the recorded moves are played again by replay players in the game window
+            from players.ReplayPlayer import ReplayPlayer
+            from window import BlockadeWindowed
+            game_record = reader[args.index]
+            recorded_moves = game_record.moves()
+            game = BlockadeWindowed(player1=ReplayPlayer(args.verbose, [p1_move for p1_move, _ in recorded_moves]),
+                                    player2=ReplayPlayer(args.verbose, [p2_move for _, p2_move in recorded_moves]),
+                                    arena_size=game_record.arena_size,
+                                    tile_size=args.tile_size,
+                                    game_speed=args.game_speed,
+                                    mute_sound=args.mute_sound,
+                                    verbose=args.verbose,
+                                    seed=game_record.seed)
+            for _ in range(min(args.move_number, len(recorded_moves))):
+                game.process_move()
+            game.update_tile_sprites()
+            game.run()
@@ -0,0 +1,288 @@
+import argparse
+import asyncio
+import os
+import sys
+import numpy as np
+
+from blockade import Blockade
+from board import Board
+from players.BasePlayer import BasePlayer
+from replay import ReplayWriter
+from tournament import aggregate_results, count_results, format_aggregated_table, format_results_table, \
+    schedule_games
+
+# headless match server: bots run in separate processes (see client.py) and connect over a TCP or Unix socket,
+# the server plays many games at once on a single asyncio event loop
+# line protocol (space separated, one message per line):
+#  client -> server: HELLO <bot name>                         - registers the connection in the pool of the bot
+#  server -> client: START <session> <arena size> <player number> <player seed>
+#                                                            - a new game, session identifies the player in the game
+#  server -> client: MOVE <session> <move number> <time budget in ms> <possible moves> <board delta>
+#                                                            - possible moves are initials of 'up', 'down', 'left',
+#                                                              'right' (e.g. 'udr'), the delta lists tiles changed
+#                                                              since the last message as y,x,value;... ('-' if none)
+#  client -> server: <session> <move number> <move>          - the selected move (e.g. '12 7 up')
+#  server -> client: END <session> <outcome>                 - the game is finished, the player can be dropped
+MOVE_INITIALS = {'up': 'u', 'down': 'd', 'left': 'l', 'right': 'r'}
+
+
+class BotConnection:
+    # a connection of a bot client, it can serve many sessions (players in games) at once
+    # replies are matched to the requests by (session, move number), late replies are ignored
+    def __init__(self, name, reader, writer):
+        self.name = name
+        self.reader = reader
+        self.writer = writer
+        self.pending_moves = dict()  # {(session, move number): future}
+        self.active_sessions = 0
+        self.closed = False
+
+    async def send(self, line):
+        if self.closed:
+            raise ConnectionError(f'bot {self.name} is disconnected')
+        self.writer.write(line.encode() + b'\n')
+        await self.writer.drain()
+
+    async def request_move(self, session, move_number, line):
+        future = asyncio.get_running_loop().create_future()
+        self.pending_moves[(session, move_number)] = future
+        try:
+            await self.send(line)
+            return await future
+        finally:
+            self.pending_moves.pop((session, move_number), None)
+
+    async def read_replies(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                session, move_number, move = line.decode().split()
+                future = self.pending_moves.get((int(session), int(move_number)))
+                if future is not None and not future.done():
+                    future.set_result(move)
+        finally:
+            self.closed = True
+            for future in self.pending_moves.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f'bot {self.name} disconnected'))
+            self.writer.close()
+
+
+class RemotePlayer(BasePlayer):
+    # player of a game on the server whose moves are selected by a bot client
+    # the server sends only the tiles which changed since the last request of this player
+    def __init__(self, connection, session, verbose=False):
+        super().__init__(verbose)
+        self.connection = connection
+        self.session = session
+        self.player_seed = None
+        self.sent_matrix = None
+
+    def __str__(self):
+        return f'RemotePlayer ({self.connection.name})'
+
+    def seed(self, seed):
+        # the seed is sent to the client, which seeds its own player
+        self.player_seed = seed
+
+    async def start(self, arena_size, player_number):
+        self.connection.active_sessions += 1
+        self.sent_matrix = Board.start(arena_size).game_matrix
+        await self.connection.send(f'START {self.session} {arena_size} {player_number} {self.player_seed}')
+
+    async def request_move(self, game_matrix, possible_moves, move_number, time_budget):
+        changed = np.argwhere(game_matrix != self.sent_matrix)
+        delta = ';'.join(f'{y},{x},{game_matrix[y, x]}' for y, x in changed.tolist()) or '-'
+        self.sent_matrix = game_matrix.copy()
+        initials = ''.join(MOVE_INITIALS[move] for move in possible_moves)
+        budget = int(time_budget * 1000) if time_budget is not None else 0
+        return await self.connection.request_move(self.session, move_number,
+                                                  f'MOVE {self.session} {move_number} {budget} {initials} {delta}')
+
+    async def end(self, outcome):
+        self.connection.active_sessions -= 1
+        if not self.connection.closed:
+            await self.connection.send(f'END {self.session} {outcome}')
+
+
+class RemoteGame(Blockade):
+    # Blockade played by remote players: the same phases as process_move, but both moves are requested at once
+    # and awaited (at most move_time_limit seconds), so many games can share the event loop
+    async def request_move(self, player_index, player, possible_moves):
+        try:
+            move = await asyncio.wait_for(player.request_move(self.game_matrix, possible_moves, self.move_counter,
+                                                              self.move_time_limit), self.move_time_limit)
+            if move in possible_moves:
+                return move
+        except (asyncio.TimeoutError, ConnectionError, ValueError):
+            pass
+        # a late, wrong or missing move is replaced by the fallback move (like in Blockade.get_limited_moves)
+        self.overruns.append((self.move_counter, player_index + 1))
+        return player.fallback_move(possible_moves)
+
+    async def play(self):
+        outcome = None
+        await self.player1.start(self.arena_size, 1)
+        await self.player2.start(self.arena_size, 2)
+        try:
+            while outcome is None:
+                p1_possible_moves = self.find_possible_moves(self.p1_head)
+                p2_possible_moves = self.find_possible_moves(self.p2_head)
+                outcome = self.check_outcome(p1_possible_moves, p2_possible_moves)
+                if outcome is not None:
+                    break
+                self.move_counter += 1
+                p1_move, p2_move = await asyncio.gather(self.request_move(0, self.player1, p1_possible_moves),
+                                                        self.request_move(1, self.player2, p2_possible_moves))
+                if self.move_history is not None:
+                    self.move_history.append((p1_move, p2_move))
+                self.update_board(p1_move, p2_move)
+                self.handle_collision()
+            return self.finish_game(outcome)
+        finally:
+            for player in (self.player1, self.player2):
+                try:
+                    await player.end(outcome)
+                except ConnectionError:
+                    pass
+
+
+class MatchServer:
+    # pools the connections of every bot (by the name sent in HELLO) and assigns every new player to the connection
+    # of the bot with the fewest active sessions
+    def __init__(self, move_time_limit=1.0, replay_writer=None, verbose=False):
+        self.move_time_limit = move_time_limit
+        self.replay_writer = replay_writer
+        self.verbose = verbose
+        self.pools = dict()  # {bot name: [BotConnection]}
+        self.pools_changed = None
+        self.server = None
+        self.session_counter = 0
+
+    async def start(self, host='127.0.0.1', port=0, path=None):
+        # listens on a Unix socket if a path is given, otherwise on TCP (port 0 - any free port)
+        # returns the port or the path
+        self.pools_changed = asyncio.Condition()
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle_client, path=path)
+            return path
+        self.server = await asyncio.start_server(self.handle_client, host=host, port=port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self.server.close()
+        for connections in self.pools.values():
+            for connection in connections:
+                connection.writer.close()
+        await self.server.wait_closed()
+
+    async def handle_client(self, reader, writer):
+        line = await reader.readline()
+        message, _, name = line.decode().strip().partition(' ')
+        if message != 'HELLO' or not name:
+            writer.close()
+            return
+        connection = BotConnection(name, reader, writer)
+        async with self.pools_changed:
+            self.pools.setdefault(name, []).append(connection)
+            self.pools_changed.notify_all()
+        if self.verbose:
+            print(f'Bot {name} connected ({len(self.pools[name])} connections)', flush=True)
+        try:
+            await connection.read_replies()
+        finally:
+            self.pools[name].remove(connection)
+            if self.verbose:
+                print(f'Bot {name} disconnected ({len(self.pools[name])} connections)', flush=True)
+
+    async def wait_for_bots(self, names, connections=1):
+        # waits until every bot has at least `connections` connections
+        async with self.pools_changed:
+            await self.pools_changed.wait_for(lambda: all(len(self.pools.get(name, [])) >= connections
+                                                          for name in names))
+
+    async def create_player(self, name):
+        await self.wait_for_bots([name])
+        connection = min(self.pools[name], key=lambda bot_connection: bot_connection.active_sessions)
+        self.session_counter += 1
+        return RemotePlayer(connection, self.session_counter)
+
+    async def play_match(self, bot1, bot2, arena_size, seed):
+        # a single game of two connected bots, returns the game (outcome, overruns, ...) after it's finished
+        game = RemoteGame(await self.create_player(bot1), await self.create_player(bot2), arena_size,
+                          verbose=False, seed=seed, replay_writer=self.replay_writer, player_specs=(bot1, bot2),
+                          move_time_limit=self.move_time_limit)
+        game.outcome = await game.play()
+        return game
+
+    async def run_matches(self, games, concurrency=256):
+        # plays (bot1, bot2, arena size, seed) games with at most `concurrency` games at a time,
+        # returns the finished games in the same order
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def play_limited(game):
+            async with semaphore:
+                return await self.play_match(*game)
+
+        return await asyncio.gather(*[play_limited(game) for game in games])
+
+
+async def run_server_tournament(args):
+    replay_writer = ReplayWriter(args.replay_file) if args.replay_file is not None else None
+    server = MatchServer(move_time_limit=args.move_time_limit, replay_writer=replay_writer, verbose=args.verbose)
+    address = await server.start(host=args.host, port=args.port, path=args.unix_socket)
+    print(f'Listening on {address}, waiting for bots: {" ".join(args.players)}', flush=True)
+    clients = []
+    if args.spawn_clients > 0:
+        # local bot clients for a loopback setup (one process per connection)
+        client_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'client.py')
+        connect_args = ['--unix-socket', address] if args.unix_socket is not None \
+            else ['--host', args.host, '--port', str(address)]
+        for spec in args.players:
+            for _ in range(args.spawn_clients):
+                clients.append(await asyncio.create_subprocess_exec(sys.executable, client_path, spec, *connect_args))
+    await server.wait_for_bots(args.players, max(args.spawn_clients, 1))
+
+    schedule = schedule_games(args.players, args.arena_sizes, list(range(args.starting_seed,
+                                                                          args.starting_seed + args.num_seeds)),
+                              args.swap_sides)
+    games = await server.run_matches([game for game, _ in schedule], concurrency=args.concurrency)
+    await server.close()
+    for client in clients:
+        await client.wait()
+    if replay_writer is not None:
+        replay_writer.close()
+
+    results = count_results(args.players, args.arena_sizes, schedule, [game.outcome for game in games])
+    names = {spec: spec for spec in args.players}
+    for size, size_results in results.items():
+        print(f'Results for arena_size={size} (wins/draws/loses from the perspective of Player 1):\n')
+        print(format_results_table(size_results, args.players, names) + '\n')
+        print(format_aggregated_table(aggregate_results(size_results), args.players, names) + '\n')
+    print(f'Moves over the time limit: {sum(len(game.overruns) for game in games)}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-p', '--players', nargs='+', help='names of the bots (player specs used by their clients)',
+                        default=['random', 'heuristic'])
+    parser.add_argument('-a', '--arena-sizes', nargs='+', help='sizes of the square game arena (in tiles)', type=int,
+                        default=[15])
+    parser.add_argument('-n', '--num-seeds', help='number of games per pair of players', type=int, default=100)
+    parser.add_argument('-r', '--starting-seed', help='seed of the first game, games use consecutive seeds',
+                        type=int, default=0)
+    parser.add_argument('-s', '--swap-sides', action='store_true',
+                        help='repeats every game with switched sides (counted for the same pair of players)')
+    parser.add_argument('-c', '--concurrency', help='number of games played at the same time', type=int, default=256)
+    parser.add_argument('-l', '--move-time-limit', help='time limit of every move (in seconds)', type=float,
+                        default=1.0)
+    parser.add_argument('--host', help='TCP host', default='127.0.0.1')
+    parser.add_argument('--port', help='TCP port (0 - any free port)', type=int, default=7777)
+    parser.add_argument('--unix-socket', help='path of a Unix socket (instead of TCP)', default=None)
+    parser.add_argument('-j', '--spawn-clients', help='starts local client processes (connections) for every bot',
+                        type=int, default=0)
+    parser.add_argument('-o', '--replay-file', help='appends all games to a replay file (see replay.py)', default=None)
+    parser.add_argument('-v', '--verbose', action='store_true', help='prints connected and disconnected bots')
+    asyncio.run(run_server_tournament(parser.parse_args()))
@@ -0,0 +1,192 @@
+import argparse
+import math
+import multiprocessing
+from contextlib import nullcontext
+from functools import partial
+from itertools import combinations
+from statistics import NormalDist
+import numpy as np
+
+from tournament import create_spec_player, format_markdown_table, play_game
+
+# sequential bot comparisons: instead of a fixed number of games, a pair of players plays side-swapped pairs of games
+# (the same seed with switched sides) in batches until a statistical test decides:
+#  'sprt' - two sequential probability ratio tests (generalized SPRT with a normal approximation of the mean score
+#           of the pairs): expected score 0.5 against 0.5 + delta and 0.5 against 0.5 - delta, with error
+#           probabilities alpha and beta
+#  'ci' - the confidence interval (1 - alpha) of the mean score excludes 0.5 or lies within 0.5 +- delta
+# scores are from the perspective of the first player: win - 1, draw - 0.5, loss - 0
+# decisions: 1 - the first player is stronger, 2 - the second player is stronger, 0 - equal (within delta),
+# None - undecided (max_pairs were played)
+MIN_VARIANCE = 1e-4  # lower bound of the variance of pair scores (e.g. when all games so far were draws)
+
+
+def game_score(outcome):
+    return {1: 1.0, 0: 0.5, 2: 0.0}[outcome]
+
+
+def score_interval(pair_scores, confidence):
+    # mean score of the pairs and the half width of its normal confidence interval
+    n = len(pair_scores)
+    variance = max(float(np.var(pair_scores, ddof=1)) if n > 1 else 0.0, MIN_VARIANCE)
+    return float(np.mean(pair_scores)), NormalDist().inv_cdf(0.5 + confidence / 2) * math.sqrt(variance / n)
+
+
+def sprt_llr(pair_scores, mu0, mu1):
+    # log-likelihood ratio of mean score mu1 against mu0 (normal approximation with the sample variance)
+    n = len(pair_scores)
+    variance = max(float(np.var(pair_scores, ddof=1)) if n > 1 else 0.0, MIN_VARIANCE)
+    return (mu1 - mu0) * (2 * float(np.sum(pair_scores)) - n * (mu0 + mu1)) / (2 * variance)
+
+
+class SequentialComparison:
+    # state of a comparison of two player specs: it yields the next games to play and takes their outcomes
+    def __init__(self, spec1, spec2, arena_size=15, method='sprt', delta=0.05, alpha=0.05, beta=0.05, min_pairs=16,
+                 max_pairs=2500, starting_seed=0):
+        if method not in ('sprt', 'ci'):
+            raise ValueError(f'unknown method: {method} (should be sprt or ci)')
+        self.spec1 = spec1
+        self.spec2 = spec2
+        self.arena_size = arena_size
+        self.method = method
+        self.delta = delta
+        self.alpha = alpha
+        self.beta = beta
+        self.min_pairs = min_pairs
+        self.max_pairs = max_pairs
+        self.starting_seed = starting_seed
+        # SPRT bounds of the log-likelihood ratio: accept H0 below the lower one, H1 above the upper one
+        self.llr_bounds = (math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha))
+        self.sprt_states = [None, None]  # accepted hypothesis (0 or 1) of the upper and the lower test
+        self.pair_scores = []
+        self.counts = [0, 0, 0]  # wins, draws, loses of spec1
+        self.decision = None
+        self.finished = False
+
+    def next_games(self, pairs):
+        # the next pairs of games (spec1 as player1, then spec2 as player1 on the same seed) in tournament format
+        first_seed = self.starting_seed + len(self.pair_scores)
+        seeds = range(first_seed, first_seed + min(pairs, self.max_pairs - len(self.pair_scores)))
+        return [game for seed in seeds for game in ((self.spec1, self.spec2, self.arena_size, seed),
+                                                    (self.spec2, self.spec1, self.arena_size, seed))]
+
+    def add_outcomes(self, outcomes):
+        # outcomes of the games from next_games (in the same order)
+        for outcome, swapped_outcome in zip(outcomes[::2], outcomes[1::2]):
+            scores = (game_score(outcome), 1.0 - game_score(swapped_outcome))
+            for score in scores:
+                self.counts[{1.0: 0, 0.5: 1, 0.0: 2}[score]] += 1
+            self.pair_scores.append(sum(scores) / 2)
+        if len(self.pair_scores) >= self.min_pairs:
+            self.decision = self.test()
+        self.finished = self.decision is not None or len(self.pair_scores) >= self.max_pairs
+
+    def test(self):
+        if self.method == 'ci':
+            mean, half_width = score_interval(self.pair_scores, 1 - self.alpha)
+            if mean - half_width > 0.5:
+                return 1
+            if mean + half_width < 0.5:
+                return 2
+            if 0.5 - self.delta < mean - half_width and mean + half_width < 0.5 + self.delta:
+                return 0
+            return None
+
+        for i, mu1 in enumerate((0.5 + self.delta, 0.5 - self.delta)):
+            if self.sprt_states[i] is None:
+                llr = sprt_llr(self.pair_scores, 0.5, mu1)
+                if llr <= self.llr_bounds[0]:
+                    self.sprt_states[i] = 0
+                elif llr >= self.llr_bounds[1]:
+                    self.sprt_states[i] = 1
+        if self.sprt_states[0] == 1:
+            return 1
+        if self.sprt_states[1] == 1:
+            return 2
+        if self.sprt_states == [0, 0]:
+            return 0
+        return None
+
+    def result(self):
+        # summary of the comparison, confidence is the confidence with which the players differ
+        # (1 - p-value of the mean score being 0.5)
+        mean, half_width = score_interval(self.pair_scores, 1 - self.alpha)
+        standard_error = half_width / NormalDist().inv_cdf(1 - self.alpha / 2)
+        confidence = 1 - 2 * (1 - NormalDist().cdf(abs(mean - 0.5) / standard_error))
+        return {'games': 2 * len(self.pair_scores), 'wins': self.counts[0], 'draws': self.counts[1],
+                'loses': self.counts[2], 'score': mean, 'interval': (mean - half_width, mean + half_width),
+                'confidence': confidence, 'decision': self.decision}
+
+
+def play_comparisons(comparisons, batch_pairs=16, pool=None, position_cache=None):
+    # plays the comparisons until all of them are finished, the next batches of all unfinished comparisons are played
+    # together (on the pool if there is one)
+    play = partial(play_game, position_cache=position_cache)
+    while True:
+        active = [comparison for comparison in comparisons if not comparison.finished]
+        if not active:
+            return comparisons
+        batches = [comparison.next_games(batch_pairs) for comparison in active]
+        games = [game for batch in batches for game in batch]
+        outcomes = pool.map(play, games, chunksize=4) if pool is not None else list(map(play, games))
+        for comparison, batch in zip(active, batches):
+            comparison.add_outcomes(outcomes[:len(batch)])
+            outcomes = outcomes[len(batch):]
+
+
+def compare_bots(spec1, spec2, arena_size=15, batch_pairs=16, processes=1, position_cache=None, **kwargs):
+    # a single sequential comparison (kwargs - parameters of SequentialComparison), returns its result
+    comparison = SequentialComparison(spec1, spec2, arena_size=arena_size, **kwargs)
+    with multiprocessing.Pool(processes) if processes != 1 else nullcontext() as pool:
+        play_comparisons([comparison], batch_pairs=batch_pairs, pool=pool, position_cache=position_cache)
+    return comparison.result()
+
+
+def sequential_round_robin(player_specs, arena_size=15, batch_pairs=16, processes=None, position_cache=None,
+                           **kwargs):
+    # every pair of different players is compared sequentially: {(spec1, spec2): result}
+    comparisons = [SequentialComparison(spec1, spec2, arena_size=arena_size, **kwargs)
+                   for spec1, spec2 in combinations(player_specs, 2)]
+    with multiprocessing.Pool(processes) if processes != 1 else nullcontext() as pool:
+        play_comparisons(comparisons, batch_pairs=batch_pairs, pool=pool, position_cache=position_cache)
+    return {(comparison.spec1, comparison.spec2): comparison.result() for comparison in comparisons}
+
+
+def format_comparison_table(results, names):
+    decisions = {1: 'Player 1 stronger', 2: 'Player 2 stronger', 0: 'equal', None: 'undecided'}
+    header = ['Player 1', 'Player 2', 'Games', 'W/D/L', 'Score', 'Score interval', 'Confidence', 'Decision']
+    rows = [[names[spec1], names[spec2], str(result['games']), f'{result["wins"]}/{result["draws"]}/{result["loses"]}',
+             f'{result["score"]:.3f}', f'{result["interval"][0]:.3f}-{result["interval"][1]:.3f}',
+             f'{result["confidence"]:.1%}', decisions[result['decision']]]
+            for (spec1, spec2), result in results.items()]
+    return format_markdown_table(header, rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-p', '--players', nargs='+', help='player specs (see tournament.py), every pair is compared',
+                        default=['random', 'heuristic', 'optimized'])
+    parser.add_argument('-a', '--arena-size', help='size of the square game arena (in tiles)', type=int, default=15)
+    parser.add_argument('-m', '--method', help='stopping rule', choices=['sprt', 'ci'], default='sprt')
+    parser.add_argument('-d', '--delta', help='score difference from 0.5 which counts as stronger', type=float,
+                        default=0.05)
+    parser.add_argument('--alpha', help='error probability (1 - confidence of the interval)', type=float,
+                        default=0.05)
+    parser.add_argument('--beta', help='error probability of accepting equal players (sprt)', type=float,
+                        default=0.05)
+    parser.add_argument('-b', '--batch-pairs', help='pairs of games played before every test', type=int, default=16)
+    parser.add_argument('--min-pairs', help='minimal number of pairs of games', type=int, default=16)
+    parser.add_argument('--max-pairs', help='maximal number of pairs of games', type=int, default=2500)
+    parser.add_argument('-r', '--starting-seed', help='seed of the first pair of games', type=int, default=0)
+    parser.add_argument('-j', '--processes', help='number of worker processes (default: number of CPUs)', type=int,
+                        default=None)
+    args = parser.parse_args()
+
+    comparison_results = sequential_round_robin(args.players, arena_size=args.arena_size, batch_pairs=args.batch_pairs,
+                                                processes=args.processes, method=args.method, delta=args.delta,
+                                                alpha=args.alpha, beta=args.beta, min_pairs=args.min_pairs,
+                                                max_pairs=args.max_pairs, starting_seed=args.starting_seed)
+    player_names = {spec: str(create_spec_player(spec)) for spec in args.players}
+    print(format_comparison_table(comparison_results, player_names))
+    total_games = sum(result['games'] for result in comparison_results.values())
+    print(f'\n{total_games} games played ({2 * args.max_pairs * len(comparison_results)} with a fixed number of games)')
@@ -0,0 +1,67 @@
+import time
+
+# optional instrumentation of games: time spent in the phases of a move and counters of the players' work
+# (e.g. flood fill cells visited or model predict calls)
+# engines keep stats = None unless instrumentation is enabled, so a disabled layer costs only `is not None` checks
+
+
+class Stats:
+    # timings {phase: [total seconds, number of calls, longest call]} and counters {name: value}
+    def __init__(self):
+        self.timings = dict()
+        self.counters = dict()
+
+    def add_time(self, phase, start_time):
+        # adds the time since start_time to the phase, returns the current time (the start of the next phase)
+        now = time.perf_counter()
+        elapsed_time = now - start_time
+        timing = self.timings.get(phase)
+        if timing is None:
+            self.timings[phase] = [elapsed_time, 1, elapsed_time]
+        else:
+            timing[0] += elapsed_time
+            timing[1] += 1
+            if elapsed_time > timing[2]:
+                timing[2] = elapsed_time
+        return now
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, other):
+        for phase, (total_time, calls, longest_time) in other.timings.items():
+            timing = self.timings.setdefault(phase, [0.0, 0, 0.0])
+            timing[0] += total_time
+            timing[1] += calls
+            timing[2] = max(timing[2], longest_time)
+        for name, value in other.counters.items():
+            self.count(name, value)
+        return self
+
+    def to_dict(self):
+        return {'timings': {phase: {'total_s': total_time, 'calls': calls, 'max_s': longest_time}
+                            for phase, (total_time, calls, longest_time) in self.timings.items()},
+                'counters': dict(self.counters)}
+
+
+class GameStats(Stats):
+    # stats of the engine phases of one or more games (see Blockade.process_move and BlockadeEnv.step) and of both
+    # players (get_move timing and the counters reported by the players themselves)
+    def __init__(self):
+        super().__init__()
+        self.players = (Stats(), Stats())
+        self.games = 0
+        self.moves = 0
+
+    def merge(self, other):
+        super().merge(other)
+        for player_stats, other_player_stats in zip(self.players, other.players):
+            player_stats.merge(other_player_stats)
+        self.games += other.games
+        self.moves += other.moves
+        return self
+
+    def to_dict(self):
+        return dict(super().to_dict(), games=self.games, moves=self.moves,
+                    players=[player_stats.to_dict() for player_stats in self.players])
+
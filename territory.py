@@ -0,0 +1,131 @@
+import numpy as np
+
+from board import EMPTY
+
+UNREACHABLE = np.iinfo(np.int16).max  # distance of tiles which can't be reached
+
+
+def expand_distances(distances, free, frontier, level):
+    # continues a breadth-first search from the frontier tiles (which have distance `level`)
+    # all arrays are (..., N, N), so the searches from many heads (and of many arenas) run in the same vectorized steps
+    # every step grows the frontier by one tile in all 4 directions
+    while frontier.any():
+        level += 1
+        grown = np.zeros_like(frontier)
+        grown[..., 1:, :] |= frontier[..., :-1, :]
+        grown[..., :-1, :] |= frontier[..., 1:, :]
+        grown[..., :, 1:] |= frontier[..., :, :-1]
+        grown[..., :, :-1] |= frontier[..., :, 1:]
+        frontier = grown & free & (distances == UNREACHABLE)
+        distances[frontier] = level
+    return distances
+
+
+def bfs_distances(free, sources):
+    # distance maps of a stack of searches: free - (..., N, N) empty tiles, sources - (..., N, N) starting tiles
+    # (sources have distance 0 and don't have to be empty, e.g. the heads), returns an int16 array
+    distances = np.full(sources.shape, UNREACHABLE, dtype=np.int16)
+    distances[sources] = 0
+    return expand_distances(distances, free, sources.copy(), 0)
+
+
+def voronoi_counts(my_distances, opponent_distances, free):
+    # number of empty tiles which the bot reaches strictly before the opponent and vice versa
+    # (tiles reached at the same time belong to nobody), works for stacks of (..., N, N) arrays
+    mine = (free & (my_distances < opponent_distances)).sum(axis=(-2, -1))
+    theirs = (free & (opponent_distances < my_distances)).sum(axis=(-2, -1))
+    return mine, theirs
+
+
+def calculate_move_territories(game_matrices, targets, opponent_heads):
+    # Voronoi territory difference (bot - opponent) after every candidate move, all moves in one vectorized search
+    # game_matrices - (..., N, N) arenas, targets - (..., M, 2) target tiles of M moves,
+    # opponent_heads - (..., 2) positions, returns a (..., M) array
+    arena_size = game_matrices.shape[-1]
+    free = np.repeat((game_matrices == EMPTY)[..., None, :, :], targets.shape[-2], axis=-3)
+    # moves outside the arena are clipped (their scores are never used)
+    targets = np.clip(targets, 0, arena_size - 1)
+    move_indices = np.indices(targets.shape[:-1])
+    free[(*move_indices, targets[..., 0], targets[..., 1])] = False
+    sources = np.zeros(free.shape[:-2] + (2,) + free.shape[-2:], dtype=bool)
+    sources[(*move_indices, 0, targets[..., 0], targets[..., 1])] = True
+    opponent_heads = np.broadcast_to(opponent_heads[..., None, :], targets.shape)
+    sources[(*move_indices, 1, opponent_heads[..., 0], opponent_heads[..., 1])] = True
+    distances = bfs_distances(free[..., None, :, :], sources)
+    mine, theirs = voronoi_counts(distances[..., 0, :, :], distances[..., 1, :, :], free)
+    return mine - theirs
+
+
+class ChamberAnalyzer:
+    # chambers of a single arena: the biconnected parts of a region, joined by articulation points (tiles which split
+    # the region) into a tree; a path can't come back through an articulation point, so the chambers bound the usable
+    # area better than the size of the region (SearchBot uses them after the players are walled off)
+    def __init__(self, game_matrix):
+        self.arena_size = game_matrix.shape[0]
+        self.free = game_matrix == EMPTY
+
+    def neighbors(self, tile):
+        y, x = tile
+        return [(y + dy, x + dx) for dy, dx in ((-1, 0), (1, 0), (0, -1), (0, 1))
+                if 0 <= y + dy < self.arena_size and 0 <= x + dx < self.arena_size and self.free[y + dy, x + dx]]
+
+    def chambers(self, position):
+        # chambers of the region reachable from position (e.g. a head) as a list of (entry, set of tiles) - the entry
+        # is position or the articulation point through which the chamber is entered from position (it isn't one of
+        # the chamber's tiles), chambers come before the chamber of their entry
+        # iterative Tarjan's algorithm, position itself is the root of the search (and can be entered from its
+        # neighbors even if it isn't empty)
+        def adjacent_tiles(tile):
+            tiles = self.neighbors(tile)
+            if abs(tile[0] - position[0]) + abs(tile[1] - position[1]) == 1:
+                tiles.append(position)
+            return tiles
+
+        discovery = {position: 0}
+        lowest = {position: 0}
+        parents = {position: None}
+        tile_stack = []
+        chambers = []
+        stack = [(position, iter(self.neighbors(position)))]
+        while stack:
+            tile, neighbors = stack[-1]
+            for neighbor in neighbors:
+                if neighbor not in discovery:
+                    discovery[neighbor] = lowest[neighbor] = len(discovery)
+                    parents[neighbor] = tile
+                    tile_stack.append(neighbor)
+                    stack.append((neighbor, iter(adjacent_tiles(neighbor))))
+                    break
+                elif neighbor != parents[tile]:
+                    lowest[tile] = min(lowest[tile], discovery[neighbor])
+            else:
+                stack.pop()
+                parent = parents[tile]
+                if parent is not None:
+                    lowest[parent] = min(lowest[parent], lowest[tile])
+                    if lowest[tile] >= discovery[parent]:
+                        # the search can't get above parent from the subtree of tile - it's a chamber entered
+                        # through parent
+                        chamber = set()
+                        while True:
+                            chamber_tile = tile_stack.pop()
+                            chamber.add(chamber_tile)
+                            if chamber_tile == tile:
+                                break
+                        chambers.append((parent, chamber))
+        return chambers
+
+    def articulation_points(self, position):
+        # empty tiles which split the region reachable from position into separate parts
+        return {entry for entry, _ in self.chambers(position)} - {position}
+
+    def chamber_area(self, position):
+        # upper bound of the number of tiles which a path from position can visit: a path can use all tiles of
+        # a chamber, but it can't come back through the articulation point to the chamber it left, so only
+        # the chambers along a single branch of the tree count (the largest branch)
+        branch_areas = dict()  # {entry: area of the largest branch entered through it}
+        for entry, chamber in self.chambers(position):
+            # the chambers entered through the tiles of this one were seen before it
+            area = len(chamber) + max([branch_areas.get(tile, 0) for tile in chamber])
+            branch_areas[entry] = max(branch_areas.get(entry, 0), area)
+        return branch_areas.get(position, 0)
@@ -0,0 +1,36 @@
+import pytest
+
+from batch import BatchBlockade
+from blockade import Blockade, create_player
+
+SEEDS = range(40)
+
+
+@pytest.mark.parametrize('arena_size', [10, 15])
+@pytest.mark.parametrize('player_types', [('random', 'random'), ('random', 'heuristic'), ('heuristic', 'optimized'),
+                                          ('optimized', 'random')])
+def test_batch_games_end_like_single_games(player_types, arena_size):
+    # a seeded batch game ends exactly like Blockade(..., seed=seed) with fresh players
+    batch = BatchBlockade(create_player(player_types[0], verbose=False), create_player(player_types[1], verbose=False),
+                          arena_size, list(SEEDS))
+    batch_outcomes = batch.run().tolist()
+    single_outcomes = []
+    single_move_counts = []
+    for seed in SEEDS:
+        game = Blockade(create_player(player_types[0], verbose=False), create_player(player_types[1], verbose=False),
+                        arena_size, verbose=False, seed=seed)
+        single_outcomes.append(game.run_windowless())
+        single_move_counts.append(game.move_counter)
+    assert batch_outcomes == single_outcomes
+    assert batch.move_counters.tolist() == single_move_counts
+
+
+def test_batch_self_play_ends_like_single_games():
+    # a player playing against itself shares one RNG in both engines
+    player = create_player('heuristic', verbose=False)
+    batch_outcomes = BatchBlockade(player, player, 15, list(SEEDS)).run().tolist()
+    single_outcomes = []
+    for seed in SEEDS:
+        player = create_player('heuristic', verbose=False)
+        single_outcomes.append(Blockade(player, player, 15, verbose=False, seed=seed).run_windowless())
+    assert batch_outcomes == single_outcomes
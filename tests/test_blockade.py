@@ -0,0 +1,34 @@
+import random
+
+from blockade import Blockade, create_player
+from players.ReplayPlayer import ReplayPlayer
+
+
+def play_moves(player1, player2, seed=None):
+    records = []
+    Blockade(player1, player2, 15, verbose=False, seed=seed, replay_writer=records).run_windowless()
+    return records[0].moves()
+
+
+def test_injected_rngs_are_kept_without_game_seed():
+    moves = play_moves(create_player('random', verbose=False, rng=random.Random(1)),
+                       create_player('random', verbose=False, rng=random.Random(2)))
+    assert play_moves(create_player('random', verbose=False, rng=random.Random(1)),
+                      create_player('random', verbose=False, rng=random.Random(2))) == moves
+    assert play_moves(create_player('random', verbose=False, rng=random.Random(3)),
+                      create_player('random', verbose=False, rng=random.Random(4))) != moves
+
+
+def test_game_seed_reseeds_players():
+    moves = play_moves(create_player('random', verbose=False), create_player('random', verbose=False), seed=5)
+    assert play_moves(create_player('random', verbose=False, rng=random.Random(1)),
+                      create_player('random', verbose=False, rng=random.Random(2)), seed=5) == moves
+
+
+def test_game_can_fill_the_whole_arena():
+    # every move fills 2 tiles, so the last move of a game can fill the last 2 empty tiles of the arena
+    player1 = ReplayPlayer(False, ['down', 'right', 'up', 'up', 'up', 'left', 'down'])
+    player2 = ReplayPlayer(False, ['up', 'left', 'down', 'down', 'down', 'right', 'up'])
+    game = Blockade(player1, player2, 4, verbose=False)
+    assert game.run_windowless() == 0
+    assert game.move_counter == game.max_number_of_moves == 7
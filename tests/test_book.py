@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from book import build_book, process_cache
+from tournament import play_game_details, run_tournament
+
+PLAYER_SPECS = ['heuristic', 'optimized', 'random']
+GAMES = [(spec1, spec2, arena_size, seed) for arena_size in [10, 15] for spec1 in PLAYER_SPECS
+         for spec2 in PLAYER_SPECS for seed in range(8)]
+
+
+def play_recorded_games(position_cache):
+    # outcomes and move codes of all GAMES
+    details = [play_game_details((game, True, False), position_cache=position_cache) for game in GAMES]
+    return [(outcome, record.move_codes.tolist()) for outcome, record, _ in details]
+
+
+@pytest.fixture(scope='module')
+def uncached_games():
+    return play_recorded_games(None)
+
+
+@pytest.mark.parametrize('cache_size', [100000, 20])
+def test_cached_games_are_played_like_uncached_games(uncached_games, cache_size):
+    # a tiny LRU evicts positions during the games, which mustn't change them either
+    position_cache = ((), cache_size)
+    assert play_recorded_games(position_cache) == uncached_games
+    assert process_cache(*position_cache).hits > 0
+
+
+def test_games_with_a_book_are_played_like_uncached_games(uncached_games, tmp_path):
+    book = build_book(['heuristic', 'optimized'], [10, 15], range(4), max_moves=20, processes=1)
+    assert len(book) > 0 and np.all(book['key'][1:] > book['key'][:-1])
+    book_path = str(tmp_path / 'book.npy')
+    np.save(book_path, book)
+    position_cache = ((book_path,), 1000)
+    assert play_recorded_games(position_cache) == uncached_games
+    assert process_cache(*position_cache).hits > 0
+
+
+def test_tournament_results_do_not_depend_on_the_cache():
+    results = run_tournament(PLAYER_SPECS, arena_sizes=(10,), seeds=range(6), swap_sides=True, processes=1)
+    assert run_tournament(PLAYER_SPECS, arena_sizes=(10,), seeds=range(6), swap_sides=True, processes=1,
+                          position_cache=((), 500)) == results
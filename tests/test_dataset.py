@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from dataset import OUTCOME_REWARDS, game_samples, value_targets
+from encoding import ObservationEncoder
+from replay import MOVES
+from tournament import play_game_details
+
+GAMMA = 0.9
+
+
+def recorded_games(arena_size, seeds):
+    games = [('heuristic', 'random', arena_size, seed) for seed in seeds]
+    return [play_game_details((game, True, False))[:2] for game in games]
+
+
+def test_samples_are_the_recorded_moves():
+    encoder = ObservationEncoder(10)
+    for outcome, record in recorded_games(10, range(10)):
+        samples = game_samples(record, encoder, [1, 2])
+        for player_number, (observations, actions, moves_left) in samples.items():
+            assert observations.shape == (len(record.move_codes), 10, 10)
+            assert actions.tolist() == record.move_codes[:, player_number - 1].tolist()
+            assert moves_left.tolist() == list(range(len(record.move_codes), 0, -1))
+
+
+def test_value_targets_of_the_last_move():
+    outcomes = np.array([1, 0, -1])
+    targets = value_targets(outcomes, np.ones(3, dtype=np.uint16), GAMMA)
+    assert np.allclose(targets, [1 + GAMMA * OUTCOME_REWARDS[outcome] for outcome in outcomes.tolist()])
+
+
+def test_value_targets_are_the_returns_of_blockade_env():
+    # the recorded moves of a decisive game are replayed in BlockadeEnv, then the stuck player makes an invalid move
+    pytest.importorskip('pettingzoo')
+    from env import BlockadeEnv
+    arena_size = 8
+    env = BlockadeEnv(arena_size)
+    decisive_games = [(outcome, record) for outcome, record in recorded_games(arena_size, range(20)) if outcome != 0]
+    assert decisive_games
+    for outcome, record in decisive_games:
+        env.reset()
+        rewards = {1: [], 2: []}
+        moves = record.moves()
+        final_moves = [MOVES[0], MOVES[0]]
+        for move_pair in moves + [None]:
+            if move_pair is None:
+                winner_head = env.p1_head if outcome == 1 else env.p2_head
+                final_moves[outcome - 1] = next(move for move in MOVES if env.check_possible_move(winner_head, move))
+                move_pair = final_moves
+            actions = {agent: MOVES.index(move) for agent, move in zip(env.agents, move_pair)}
+            _, step_rewards, terminations, truncations, _ = env.step(actions)
+            for player_number, agent in ((1, 'player1'), (2, 'player2')):
+                rewards[player_number].append(step_rewards[agent])
+            assert any(terminations.values()) == (len(rewards[1]) == len(moves) + 1)
+        for player_number in (1, 2):
+            returns = [sum(GAMMA ** i * reward for i, reward in enumerate(rewards[player_number][start:]))
+                       for start in range(len(moves))]
+            player_outcome = 1 if outcome == player_number else -1
+            targets = value_targets(np.full(len(moves), player_outcome), np.arange(len(moves), 0, -1), GAMMA)
+            assert np.allclose(targets, returns)
@@ -0,0 +1,43 @@
+import multiprocessing
+import threading
+import time
+
+from blockade import Blockade
+from board import Board, starting_heads
+from players.MCTSBot import MCTSBot
+from players.RandomBot import RandomBot
+
+POSSIBLE_MOVES = {'up': (-1, 0), 'down': (1, 0), 'left': (0, -1), 'right': (0, 1)}
+
+
+def test_parallel_search_pool_is_shut_down_after_the_game():
+    player = MCTSBot(False, iterations=200, processes=2)
+    Blockade(player, RandomBot(False), 10, verbose=False, seed=0).run_windowless()
+    assert player.executor is None
+    assert multiprocessing.active_children() == []
+
+
+def test_move_time_limit_caps_a_search_of_iterations():
+    for processes in (1, 2):
+        player = MCTSBot(False, iterations=10 ** 9, processes=processes)
+        game = Blockade(player, RandomBot(False), 10, verbose=False, seed=1, move_time_limit=0.05)
+        start_time = time.perf_counter()
+        game.run_windowless()
+        assert time.perf_counter() - start_time < 0.1 * game.move_counter + 1.0
+        assert player.executor is None
+
+
+def test_cancelled_parallel_search_returns_right_away():
+    player = MCTSBot(False, processes=2)
+    game_matrix = Board.start(10).game_matrix
+    my_coords, opponent_coords = starting_heads(10)
+    # the first move starts the process pool, it isn't timed
+    player.get_move(game_matrix, POSSIBLE_MOVES, my_coords, opponent_coords, time_budget=0.01)
+    player.move_cancelled = threading.Event()
+    threading.Timer(0.05, player.move_cancelled.set).start()
+    start_time = time.perf_counter()
+    move = player.get_move(game_matrix, POSSIBLE_MOVES, my_coords, opponent_coords, time_budget=2.0)
+    assert time.perf_counter() - start_time < 0.5
+    assert move in POSSIBLE_MOVES
+    player.close()
+    assert multiprocessing.active_children() == []
@@ -0,0 +1,124 @@
+import threading
+import time
+
+from blockade import Blockade
+from board import P1_TAIL
+from players.BasePlayer import BasePlayer
+from players.OptimizedBot import OptimizedBot
+from players.SearchBot import SearchBot
+
+MOVE_TIME_LIMIT = 0.05
+
+
+class CancellableSlowBot(BasePlayer):
+    # thinks for `delay` seconds unless its move is cancelled, then returns the last possible move
+    def __init__(self, verbose, delay):
+        super().__init__(verbose)
+        self.delay = delay
+        self.calls = 0
+        self.cancelled_calls = 0
+
+    def get_move(self, game_matrix, possible_moves, my_coords, opponent_coords, time_budget=None):
+        self.calls += 1
+        if self.move_cancelled.wait(self.delay):
+            self.cancelled_calls += 1
+        return list(possible_moves)[-1]
+
+
+class BudgetSpendingBot(BasePlayer):
+    # thinks for 90% of its time budget (like an anytime search) and logs the budgets it got
+    def __init__(self, verbose):
+        super().__init__(verbose)
+        self.time_budgets = []
+
+    def get_move(self, game_matrix, possible_moves, my_coords, opponent_coords, time_budget=None):
+        self.time_budgets.append(time_budget)
+        self.move_cancelled.wait(0.9 * time_budget)
+        return self.rng.choice(list(possible_moves))
+
+
+class SometimesSlowBot(OptimizedBot):
+    # OptimizedBot which ignores cancellation and sleeps through the limit on every slow_every-th call,
+    # it logs the number of its own moves made so far and its previous_move at the start of every call
+    def __init__(self, verbose, slow_every=5):
+        super().__init__(verbose)
+        self.slow_every = slow_every
+        self.calls = []
+
+    def get_move(self, game_matrix, possible_moves, my_coords, opponent_coords, time_budget=None):
+        self.calls.append((int((game_matrix == P1_TAIL).sum()), self.previous_move))
+        if len(self.calls) % self.slow_every == 0:
+            time.sleep(3 * MOVE_TIME_LIMIT)
+        return super().get_move(game_matrix, possible_moves, my_coords, opponent_coords, time_budget)
+
+
+def test_late_moves_are_cancelled_and_replaced():
+    threads = threading.active_count()
+    player1 = CancellableSlowBot(False, delay=10.0)
+    player2 = CancellableSlowBot(False, delay=10.0)
+    game = Blockade(player1, player2, 10, verbose=False, seed=0, move_time_limit=MOVE_TIME_LIMIT)
+    start_time = time.perf_counter()
+    game.process_move()
+    # both players think at the same time, so a move takes the limit once (not once per player)
+    assert time.perf_counter() - start_time < 1.8 * MOVE_TIME_LIMIT
+    outcome = game.run_windowless()
+    assert outcome is not None
+    # every move of both players was late and replaced with its fallback move (the first possible one)
+    assert game.overruns == [(move_number, player_number) for move_number in range(1, game.move_counter + 1)
+                             for player_number in (1, 2)]
+    # the players were asked for their moves (not skipped because of their late moves) and the cancelled moves
+    # returned right away instead of thinking for 10 seconds, no thread is left after the game
+    for player in (player1, player2):
+        assert player.calls >= game.move_counter // 2
+        assert player.cancelled_calls == player.calls
+    assert time.perf_counter() - start_time < 10.0
+    assert threading.active_count() == threads
+
+
+def test_player_state_follows_replaced_moves():
+    player1 = SometimesSlowBot(False)
+    records = []
+    game = Blockade(player1, OptimizedBot(False), 10, verbose=False, seed=1, replay_writer=records,
+                    move_time_limit=MOVE_TIME_LIMIT)
+    game.run_windowless()
+    assert any(player_number == 1 for _, player_number in game.overruns)
+    made_moves = [p1_move for p1_move, _ in records[0].moves()]
+    # every get_move starts with previous_move of the move which was actually made, not of the discarded late one
+    assert len(player1.calls) > player1.slow_every
+    for moves_made, previous_move in player1.calls:
+        assert previous_move == (made_moves[moves_made - 1] if moves_made > 0 else None)
+
+
+def test_self_play_with_move_time_limit():
+    # a player playing against itself ends its game like without the limit
+    player = OptimizedBot(False)
+    outcome = Blockade(player, player, 10, verbose=False, seed=2).run_windowless()
+    player = OptimizedBot(False)
+    assert Blockade(player, player, 10, verbose=False, seed=2, move_time_limit=10.0).run_windowless() == outcome
+
+
+def test_self_play_moves_share_the_limit():
+    # a player playing against itself selects both moves on one thread, so each of them gets half of the limit and
+    # a bot which spends its whole budget makes its moves in time (with both moves getting the whole limit player2
+    # was late in nearly every move, a rare overrun is left to the scheduling of the threads)
+    player = BudgetSpendingBot(False)
+    game = Blockade(player, player, 10, verbose=False, seed=3, move_time_limit=MOVE_TIME_LIMIT)
+    game.run_windowless()
+    assert game.move_counter > 0 and len(game.overruns) <= game.move_counter // 10
+    assert player.time_budgets == [MOVE_TIME_LIMIT / 2] * (2 * game.move_counter)
+
+
+def test_search_bot_self_play_with_move_time_limit():
+    # SearchBot searches until a few milliseconds before the end of its budget
+    player = SearchBot(False)
+    game = Blockade(player, player, 10, verbose=False, seed=4, move_time_limit=0.1)
+    game.run_windowless()
+    assert len(game.overruns) <= game.move_counter // 10
+
+
+def test_search_bot_moves_fit_the_limit_on_a_large_arena():
+    # both bots search at the same time, the deadline leaves a margin for the setup, the last node and the thread
+    # switches between them
+    game = Blockade(SearchBot(False), SearchBot(False), 20, verbose=False, seed=0, move_time_limit=MOVE_TIME_LIMIT)
+    game.run_windowless()
+    assert len(game.overruns) <= game.move_counter // 20
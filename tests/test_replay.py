@@ -0,0 +1,94 @@
+import os
+
+import numpy as np
+import pytest
+
+from blockade import Blockade, create_player
+from players.ReplayPlayer import ReplayPlayer
+from replay import GameRecord, ReplayReader, ReplayWriter
+from tournament import play_game_details
+
+GAMES = [(spec1, spec2, arena_size, seed) for spec1, spec2 in (('random', 'heuristic'), ('optimized', 'random'))
+         for arena_size in (10, 15) for seed in range(5)]
+
+
+@pytest.fixture(scope='module')
+def records():
+    return [play_game_details((game, True, False))[1] for game in GAMES]
+
+
+def assert_same_records(record1, record2):
+    assert (record1.arena_size, record1.player1_spec, record1.player2_spec, record1.seed, record1.outcome) == \
+        (record2.arena_size, record2.player1_spec, record2.player2_spec, record2.seed, record2.outcome)
+    assert np.array_equal(record1.move_codes, record2.move_codes)
+
+
+def test_encode_decode_round_trip(records):
+    # odd numbers of moves leave unused bits in the last byte, non-ASCII specs take more bytes than characters
+    rng = np.random.default_rng(0)
+    extra_records = [GameRecord(15, 'optimized:0.4,0.1', 'żółw', 2 ** 64 - 1, 0, rng.integers(0, 4, (moves, 2)))
+                     for moves in (0, 1, 2, 3, 113)]
+    buffer = b''.join(record.encode() for record in records + extra_records)
+    offset = 0
+    for record in records + extra_records:
+        decoded, offset = GameRecord.decode(buffer, offset)
+        assert_same_records(decoded, record)
+    assert offset == len(buffer)
+
+
+def test_replayed_records_end_with_their_outcomes(records):
+    for record in records:
+        moves = record.moves()
+        game = Blockade(ReplayPlayer(False, [p1_move for p1_move, _ in moves]),
+                        ReplayPlayer(False, [p2_move for _, p2_move in moves]), record.arena_size, verbose=False)
+        assert game.run_windowless() == record.outcome
+        assert game.move_counter == len(moves)
+        assert np.array_equal(record.board().game_matrix, game.game_matrix)
+
+
+def test_writer_and_reader_round_trip(records, tmp_path):
+    path = tmp_path / 'games.replay'
+    with ReplayWriter(path, chunk_size=3) as writer:
+        for record in records:
+            writer.append(record)
+    with ReplayReader(path) as reader:
+        assert len(reader) == len(records)
+        for read_record, record in zip(reader, records):
+            assert_same_records(read_record, record)
+        assert_same_records(reader[7], records[7])
+        assert_same_records(reader[-1], records[-1])
+
+
+def test_truncated_last_chunk_is_dropped(records, tmp_path):
+    # an interrupted write leaves a part of the last chunk (3 games) at the end of the file
+    path = tmp_path / 'games.replay'
+    with ReplayWriter(path, chunk_size=3) as writer:
+        for record in records[:9]:
+            writer.append(record)
+    with open(path, 'r+b') as file:
+        file.truncate(os.path.getsize(path) - 5)
+    with ReplayReader(path) as reader:
+        assert len(reader) == 6
+        for read_record, record in zip(reader, records[:6]):
+            assert_same_records(read_record, record)
+
+    # the writer removes the incomplete chunk before appending new ones
+    with ReplayWriter(path, chunk_size=3) as writer:
+        for record in records[9:]:
+            writer.append(record)
+    with ReplayReader(path) as reader:
+        assert len(reader) == 6 + len(records[9:])
+        for read_record, record in zip(reader, records[:6] + records[9:]):
+            assert_same_records(read_record, record)
+
+
+def test_unseeded_games_are_recorded_without_a_seed(tmp_path):
+    # a game without a seed can't be repeated, so its record mustn't look like a game of seed 0
+    path = tmp_path / 'games.replay'
+    with ReplayWriter(path) as writer:
+        for seed in (None, 0):
+            Blockade(create_player('random', verbose=False), create_player('random', verbose=False), 10,
+                     verbose=False, seed=seed, replay_writer=writer).run_windowless()
+    with ReplayReader(path) as reader:
+        assert [record.seed for record in reader] == [None, 0]
+        assert all(record.outcome in (0, 1, 2) for record in reader)
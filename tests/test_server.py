@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+
+from client import BotClient
+from board import P1_TAIL
+from players.BasePlayer import BasePlayer
+from server import MatchServer
+from tournament import create_spec_player, play_game_details
+
+MOVE_TIME_LIMIT = 0.05
+
+
+class SometimesLateBot(BasePlayer):
+    # player1 which selects its last possible move (the fallback move is the first one) and sleeps through the limit
+    # on every late_every-th call, it logs its replies by move number and the moves passed to move_replaced
+    def __init__(self, verbose, late_every=3):
+        super().__init__(verbose)
+        self.late_every = late_every
+        self.replies = dict()
+        self.replaced_moves = []
+
+    def get_move(self, game_matrix, possible_moves, my_coords, opponent_coords, time_budget=None):
+        move_number = int((game_matrix == P1_TAIL).sum()) + 1
+        if len(self.replies) % self.late_every == self.late_every - 1:
+            time.sleep(3 * MOVE_TIME_LIMIT)
+        self.replies[move_number] = list(possible_moves)[-1]
+        return self.replies[move_number]
+
+    def move_replaced(self, move):
+        self.replaced_moves.append(move)
+
+
+def start_client(name, player_factory, port, started_games):
+    # started_games - list of the numbers of the games started by every client, this client appends its own counter
+    client_index = len(started_games)
+    started_games.append(0)
+
+    def create_player():
+        started_games[client_index] += 1
+        return player_factory()
+
+    thread = threading.Thread(target=BotClient(name, create_player).run, kwargs={'port': port}, daemon=True)
+    thread.start()
+    return thread
+
+
+def play_server_games(bots, games, move_time_limit, connections=1):
+    # plays the games on a server with `connections` in-process clients of every bot {name: player factory},
+    # returns the finished games, their records and the number of games started by every client
+    records = []
+    started_games = []
+
+    async def run_server():
+        server = MatchServer(move_time_limit=move_time_limit, replay_writer=records)
+        port = await server.start(port=0)
+        clients = [start_client(name, player_factory, port, started_games) for name, player_factory in bots.items()
+                   for _ in range(connections)]
+        await server.wait_for_bots(list(bots), connections)
+        finished_games = await server.run_matches(games)
+        await server.close()
+        return finished_games, clients
+
+    finished_games, clients = asyncio.run(run_server())
+    # the clients finish when the server closes their connections
+    for client in clients:
+        client.join(timeout=5.0)
+        assert not client.is_alive()
+    return finished_games, records, started_games
+
+
+def test_server_games_are_played_like_in_process_games():
+    specs = ['random', 'heuristic', 'optimized']
+    games = [(spec1, spec2, arena_size, seed) for arena_size in (10, 15) for spec1 in specs for spec2 in specs
+             for seed in range(3)]
+    bots = {spec: lambda spec=spec: create_spec_player(spec) for spec in specs}
+    finished_games, records, started_games = play_server_games(bots, games, move_time_limit=10.0, connections=2)
+    # the clients rebuild the arena from the deltas, so the same moves mean that every client saw the real arena
+    # (games are recorded in the order in which they finished)
+    records = {(record.player1_spec, record.player2_spec, record.arena_size, record.seed): record for record in records}
+    assert len(records) == len(games)
+    for game, finished_game in zip(games, finished_games):
+        outcome, in_process_record, _ = play_game_details((game, True, False))
+        assert finished_game.outcome == outcome and finished_game.overruns == []
+        assert records[game].moves() == in_process_record.moves()
+    # the players of every bot were spread over both of its connections (the least busy one gets the next player)
+    bot_players = 2 * len(games) // len(specs)
+    assert sum(started_games) == 2 * len(games)
+    assert all(client_games >= bot_players // 4 for client_games in started_games)
+
+
+def test_late_client_moves_are_replaced_by_fallback_moves():
+    players = []
+
+    def create_late_player():
+        players.append(SometimesLateBot(False))
+        return players[-1]
+
+    bots = {'late': create_late_player, 'optimized': lambda: create_spec_player('optimized')}
+    (game, ), records, _ = play_server_games(bots, [('late', 'optimized', 10, 0)], move_time_limit=MOVE_TIME_LIMIT)
+    player, = players
+    assert game.overruns and all(player_number == 1 for _, player_number in game.overruns)
+    # late moves were replaced by the first possible moves, the other moves are the player's replies
+    late_moves = {move_number for move_number, _ in game.overruns}
+    recorded_moves = [p1_move for p1_move, _ in records[0].moves()]
+    blockade_moves = {'up': (-1, 0), 'down': (1, 0), 'left': (0, -1), 'right': (0, 1)}
+    for (move_number, game_matrix, p1_head, _), p1_move in zip(records[0].states(), recorded_moves):
+        possible_moves = [move for move, (dy, dx) in blockade_moves.items()
+                          if 0 <= p1_head[0] + dy < 10 and 0 <= p1_head[1] + dx < 10
+                          and game_matrix[p1_head[0] + dy, p1_head[1] + dx] == 0]
+        assert p1_move == (possible_moves[0] if move_number + 1 in late_moves else possible_moves[-1])
+    # the client told its player about every move which differs from its reply (or which it didn't reply to),
+    # the last move of the game is followed only by the end of the game
+    assert player.replaced_moves == [move for move_number, move in enumerate(recorded_moves[:-1], start=1)
+                                     if player.replies.get(move_number) != move]
+    assert player.replaced_moves
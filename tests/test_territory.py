@@ -0,0 +1,127 @@
+import numpy as np
+
+from board import EMPTY, P1_HEAD, P1_TAIL, P2_HEAD
+from players.SearchBot import SearchBot
+from territory import ChamberAnalyzer, calculate_move_territories
+
+OFFSETS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+def random_arenas(count, arena_size=5, blocked=0.35, seed=0):
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        yield np.where(rng.random((arena_size, arena_size)) < blocked, P1_TAIL, EMPTY).astype(np.int8)
+
+
+def free_neighbors(free, tile):
+    y, x = tile
+    return [(y + dy, x + dx) for dy, dx in OFFSETS
+            if 0 <= y + dy < free.shape[0] and 0 <= x + dx < free.shape[1] and free[y + dy, x + dx]]
+
+
+def longest_path(free, tile):
+    # number of tiles of the longest path from tile (tile itself isn't counted)
+    best = 0
+    for neighbor in free_neighbors(free, tile):
+        free[neighbor] = False
+        best = max(best, 1 + longest_path(free, neighbor))
+        free[neighbor] = True
+    return best
+
+
+def reachable(free, position):
+    seen = {position}
+    stack = [position]
+    while stack:
+        for neighbor in free_neighbors(free, stack.pop()):
+            if neighbor not in seen:
+                seen.add(neighbor)
+                stack.append(neighbor)
+    return seen - {position}
+
+
+def parse_arena(rows):
+    values = {'.': EMPTY, '#': P1_TAIL, 'A': P1_HEAD, 'B': P2_HEAD}
+    return np.array([[values[tile] for tile in row] for row in rows], dtype=np.int8)
+
+
+def test_articulation_points_split_the_region():
+    for game_matrix in random_arenas(100):
+        for position in zip(*np.nonzero(game_matrix == EMPTY)):
+            position = (int(position[0]), int(position[1]))
+            analyzer = ChamberAnalyzer(game_matrix)
+            analyzer.free[position] = False
+            region = reachable(analyzer.free, position)
+            expected = set()
+            for tile in region:
+                analyzer.free[tile] = False
+                if len(reachable(analyzer.free, position)) < len(region) - 1:
+                    expected.add(tile)
+                analyzer.free[tile] = True
+            assert analyzer.articulation_points(position) == expected
+
+
+def test_chamber_area_bounds_the_longest_path():
+    exact = 0
+    for game_matrix in random_arenas(100, seed=1):
+        for position in zip(*np.nonzero(game_matrix == EMPTY)):
+            position = (int(position[0]), int(position[1]))
+            analyzer = ChamberAnalyzer(game_matrix)
+            analyzer.free[position] = False
+            area = analyzer.chamber_area(position)
+            path = longest_path(analyzer.free.copy(), position)
+            assert path <= area <= len(reachable(analyzer.free, position))
+            exact += path == area
+    # the bound is exact in chains of chambers (and other simple regions)
+    assert exact > 0
+
+
+def test_move_territories_match_single_searches():
+    for game_matrix in random_arenas(50, arena_size=7, blocked=0.2, seed=2):
+        empty = list(zip(*np.nonzero(game_matrix == EMPTY)))
+        if len(empty) < 3:
+            continue
+        targets = np.array(empty[:2])
+        opponent_head = np.array(empty[-1])
+        game_matrix[tuple(opponent_head)] = P2_HEAD
+        territories = calculate_move_territories(game_matrix, targets, opponent_head)
+        for target, territory in zip(targets, territories):
+            free = game_matrix == EMPTY
+            free[tuple(target)] = False
+            my_distances = bfs(free, tuple(target))
+            opponent_distances = bfs(free, tuple(opponent_head))
+            mine = sum(1 for tile in my_distances if my_distances[tile] < opponent_distances.get(tile, np.inf))
+            theirs = sum(1 for tile in opponent_distances
+                         if opponent_distances[tile] < my_distances.get(tile, np.inf))
+            assert territory == mine - theirs
+
+
+def bfs(free, source):
+    # distances of the empty tiles reachable from source
+    distances = dict()
+    frontier = [source]
+    level = 0
+    seen = {source}
+    while frontier:
+        level += 1
+        frontier = [neighbor for tile in frontier for neighbor in free_neighbors(free, tile) if neighbor not in seen
+                    and not seen.add(neighbor)]
+        distances.update((tile, level) for tile in frontier)
+    return distances
+
+
+def test_search_bot_fills_the_chamber_with_more_moves():
+    # moving right enters more tiles, but the corridor forks into two branches and only one of them can be used
+    game_matrix = parse_arena(['...######',
+                               '...######',
+                               '...A.####',
+                               '####.####',
+                               '.........',
+                               '#########',
+                               '#########',
+                               'B########',
+                               '#########'])
+    possible_moves = {'left': (0, -1), 'right': (0, 1)}
+    for max_depth in (1, 64):
+        bot = SearchBot(verbose=False, time_budget=5.0, max_depth=max_depth)
+        assert bot.get_move(game_matrix, possible_moves, (2, 3), (7, 0)) == 'left'
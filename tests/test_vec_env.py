@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('pettingzoo')
+pytest.importorskip('stable_baselines3')
+
+from env import BlockadeEnv
+from vec_env import BlockadeVecEnv
+
+
+@pytest.mark.parametrize('arena_size', [6, 10])
+def test_vec_env_steps_like_blockade_env(arena_size):
+    # every arena of BlockadeVecEnv gets the same random actions as its own BlockadeEnv (including actions into walls
+    # and tails, so the games end in all possible ways and the arenas are reset automatically)
+    num_arenas = 8
+    rng = np.random.default_rng(0)
+    vec_env = BlockadeVecEnv(num_arenas=num_arenas, arena_size=arena_size)
+    envs = [BlockadeEnv(arena_size) for _ in range(num_arenas)]
+    vec_observations = vec_env.reset()
+    observations = [env.reset() for env in envs]
+    finished_games = 0
+    for _ in range(500):
+        for k, env in enumerate(envs):
+            assert np.array_equal(vec_observations[2 * k], observations[k]['player1'])
+            assert np.array_equal(vec_observations[2 * k + 1], observations[k]['player2'])
+        actions = rng.integers(0, 4, size=2 * num_arenas)
+        vec_observations, vec_rewards, vec_dones, vec_infos = vec_env.step(actions)
+        for k, env in enumerate(envs):
+            observations[k], rewards, terminations, truncations, _ = env.step(
+                {'player1': int(actions[2 * k]), 'player2': int(actions[2 * k + 1])})
+            assert vec_rewards[2 * k:2 * k + 2].tolist() == [rewards['player1'], rewards['player2']]
+            done = terminations['player1'] or truncations['player1']
+            assert vec_dones[2 * k:2 * k + 2].tolist() == [done, done]
+            if done:
+                finished_games += 1
+                assert np.array_equal(vec_infos[2 * k]['terminal_observation'], observations[k]['player1'])
+                assert np.array_equal(vec_infos[2 * k + 1]['terminal_observation'], observations[k]['player2'])
+                observations[k] = env.reset()
+    assert finished_games > 0
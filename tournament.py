@@ -0,0 +1,275 @@
+import argparse
+import multiprocessing
+from contextlib import nullcontext
+from functools import partial
+
+from blockade import Blockade, HumanPlayer, create_player, get_player_class, player_types
+from book import process_cache
+from replay import ReplayWriter
+from stats import GameStats, Stats
+
+
+def parse_player_spec(spec):
+    # player spec is a player type from blockade.py optionally followed by the bot's arguments after a colon:
+    #  'optimized:0.41,0.13,0.39,0.0' - OptimizedBot weights
+    #  'rl:players/A2C15v1,a2c,15' - ReinforcementLearningBot model_name, model_type and model_size
+    #  'search:0.05' - SearchBot time budget (in seconds per move)
+    #  'mcts:0.01' - MCTSBot time budget (in seconds per move)
+    #  'frontier:64,256,16' - FrontierBot area limit, territory limit and radius
+    player_type, _, arguments = spec.partition(':')
+    if player_type not in player_types:
+        raise ValueError(f'unknown player type: {player_type} (should be one of {list(player_types.keys())})')
+    if get_player_class(player_type) == HumanPlayer:
+        raise ValueError(f'human player can`t participate in a tournament: {spec}')
+
+    kwargs = dict()
+    if arguments:
+        arguments = arguments.split(',')
+        if player_type == 'optimized':
+            kwargs['weights'] = tuple(float(weight) for weight in arguments)
+        elif player_type == 'rl':
+            kwargs['model_name'] = arguments[0]
+            if len(arguments) > 1:
+                kwargs['model_type'] = arguments[1]
+            if len(arguments) > 2:
+                kwargs['model_size'] = int(arguments[2])
+        elif player_type in ('search', 'mcts'):
+            kwargs['time_budget'] = float(arguments[0])
+        elif player_type == 'frontier':
+            for name, value in zip(('area_limit', 'territory_limit', 'radius'), arguments):
+                kwargs[name] = int(value)
+        else:
+            raise ValueError(f'player type {player_type} takes no arguments: {spec}')
+    return player_type, kwargs
+
+
+def create_spec_player(spec, verbose=False):
+    player_type, kwargs = parse_player_spec(spec)
+    return create_player(player_type, verbose=verbose, **kwargs)
+
+
+def attach_position_cache(players, position_cache):
+    # position_cache - (book paths, LRU size) of the cache shared by all games of the process (see book.py),
+    # None - no cache
+    if position_cache is not None:
+        cache = process_cache(*position_cache)
+        for player in players:
+            player.position_cache = cache
+
+
+def play_game(game, move_time_limit=None, position_cache=None):
+    # plays a single windowless game: (player1 spec, player2 spec, arena size, seed) -> outcome
+    # every game gets fresh players with their own RNGs seeded from the game seed, so its outcome doesn't depend
+    # on which worker plays it and in what order
+    player1_spec, player2_spec, arena_size, seed = game
+    player1 = create_spec_player(player1_spec)
+    player2 = create_spec_player(player2_spec)
+    attach_position_cache((player1, player2), position_cache)
+    return Blockade(player1=player1, player2=player2, arena_size=arena_size, verbose=False,
+                    seed=seed, move_time_limit=move_time_limit).run_windowless()
+
+
+def play_game_details(job, move_time_limit=None, position_cache=None):
+    # play_game which also returns the GameRecord (if record) and the GameStats (if collect_stats) of the game:
+    # (game, record, collect_stats) -> (outcome, record or None, stats or None)
+    # records and stats are collected by the main process
+    (player1_spec, player2_spec, arena_size, seed), record, collect_stats = job
+    records = [] if record else None
+    player1 = create_spec_player(player1_spec)
+    player2 = create_spec_player(player2_spec)
+    attach_position_cache((player1, player2), position_cache)
+    game = Blockade(player1=player1, player2=player2, arena_size=arena_size, verbose=False, seed=seed,
+                    replay_writer=records, player_specs=(player1_spec, player2_spec), collect_stats=collect_stats,
+                    move_time_limit=move_time_limit)
+    outcome = game.run_windowless()
+    return outcome, records[0] if record else None, game.stats
+
+
+def schedule_games(player_specs, arena_sizes, seeds, swap_sides):
+    # every ordered pair of players (including self-play) plays every seed on every arena size
+    # with swap_sides every game is repeated with switched sides and counted for the same pair
+    schedule = []
+    for arena_size in arena_sizes:
+        for spec1 in player_specs:
+            for spec2 in player_specs:
+                for seed in seeds:
+                    schedule.append(((spec1, spec2, arena_size, seed), False))
+                    if swap_sides:
+                        schedule.append(((spec2, spec1, arena_size, seed), True))
+    return schedule
+
+
+def run_tournament(player_specs, arena_sizes=(15,), seeds=range(1000), swap_sides=False, processes=None,
+                   chunksize=16, replay_writer=None, collect_stats=False, move_time_limit=None, position_cache=None):
+    # round-robin tournament played on a pool of worker processes (processes=1 plays in the current process)
+    # returns {arena_size: {(spec1, spec2): (wins, draws, loses)}} from the perspective of spec1
+    # (spec1 is player1 in all games unless swap_sides is used)
+    # with a replay_writer all games are recorded in the order of the schedule, every game is appended to the writer
+    # as soon as it's finished (replay.ReplayWriter keeps up to chunk_size games in memory before writing them)
+    # with collect_stats it returns (results, stats), where stats are GameStats aggregated for every pair of players
+    # in the order in which they played: {arena_size: {(player1 spec, player2 spec): GameStats}}
+    # move_time_limit limits the time of every move (see Blockade), overruns are counted in the players' stats
+    # position_cache - (book paths, LRU size) of the position cache of every worker process (see book.py)
+    schedule = schedule_games(player_specs, arena_sizes, list(seeds), swap_sides)
+    games = [game for game, _ in schedule]
+    stats = {arena_size: dict() for arena_size in arena_sizes}
+    if replay_writer is None and not collect_stats:
+        if processes == 1:
+            outcomes = list(map(partial(play_game, move_time_limit=move_time_limit, position_cache=position_cache),
+                                games))
+        else:
+            with multiprocessing.Pool(processes) as pool:
+                outcomes = pool.map(partial(play_game, move_time_limit=move_time_limit, position_cache=position_cache),
+                                    games, chunksize=chunksize)
+    else:
+        outcomes = []
+        jobs = [(game, replay_writer is not None, collect_stats) for game in games]
+        with multiprocessing.Pool(processes) if processes != 1 else nullcontext() as pool:
+            play = partial(play_game_details, move_time_limit=move_time_limit, position_cache=position_cache)
+            details = pool.imap(play, jobs, chunksize=chunksize) if pool is not None else map(play, jobs)
+            for (player1_spec, player2_spec, arena_size, _), (outcome, record, game_stats) in zip(games, details):
+                if record is not None:
+                    replay_writer.append(record)
+                if game_stats is not None:
+                    stats[arena_size].setdefault((player1_spec, player2_spec), GameStats()).merge(game_stats)
+                outcomes.append(outcome)
+
+    results = count_results(player_specs, arena_sizes, schedule, outcomes)
+    return (results, stats) if collect_stats else results
+
+
+def count_results(player_specs, arena_sizes, schedule, outcomes):
+    # outcomes of the scheduled games -> {arena_size: {(spec1, spec2): (wins, draws, loses)}}
+    results = {arena_size: {(spec1, spec2): [0, 0, 0] for spec1 in player_specs for spec2 in player_specs}
+               for arena_size in arena_sizes}
+    for ((spec1, spec2, arena_size, _), swapped), outcome in zip(schedule, outcomes):
+        if swapped:
+            spec1, spec2 = spec2, spec1
+            outcome = {0: 0, 1: 2, 2: 1}[outcome]
+        if outcome == 1:
+            results[arena_size][(spec1, spec2)][0] += 1
+        elif outcome == 0:
+            results[arena_size][(spec1, spec2)][1] += 1
+        else:
+            results[arena_size][(spec1, spec2)][2] += 1
+    return {arena_size: {pair: tuple(counts) for pair, counts in arena_results.items()}
+            for arena_size, arena_results in results.items()}
+
+
+def aggregate_player_stats(stats):
+    # stats of every player in both roles (get_move timing and the player's counters): {spec: Stats}
+    totals = dict()
+    for (spec1, spec2), game_stats in stats.items():
+        totals.setdefault(spec1, Stats()).merge(game_stats.players[0])
+        totals.setdefault(spec2, Stats()).merge(game_stats.players[1])
+    return totals
+
+
+def aggregate_engine_stats(stats):
+    # engine phases of all games together
+    totals = GameStats()
+    for game_stats in stats.values():
+        totals.merge(game_stats)
+    return totals
+
+
+def aggregate_results(results):
+    # total wins, draws and loses of every player in both roles: {spec: (wins, draws, loses)}
+    totals = dict()
+    for (spec1, spec2), (wins, draws, loses) in results.items():
+        for spec, counts in ((spec1, (wins, draws, loses)), (spec2, (loses, draws, wins))):
+            totals[spec] = tuple(total + count for total, count in zip(totals.get(spec, (0, 0, 0)), counts))
+    return totals
+
+
+def format_results_table(results, player_specs, names):
+    # markdown table like in README.md: wins/draws/loses from the perspective of Player 1 (columns)
+    header = ['Player 2 \\ Player 1'] + [names[spec] for spec in player_specs]
+    rows = [[names[spec2]] + ['/'.join(str(count) for count in results[(spec1, spec2)]) for spec1 in player_specs]
+            for spec2 in player_specs]
+    return format_markdown_table(header, rows)
+
+
+def format_aggregated_table(totals, player_specs, names):
+    header = ['Bot type'] + [names[spec] for spec in player_specs]
+    rows = [[f'Total {label}'] + [str(totals[spec][i]) for spec in player_specs]
+            for i, label in enumerate(['wins', 'draws', 'loses'])]
+    return format_markdown_table(header, rows)
+
+
+def format_engine_stats_table(engine_stats):
+    # time of the phases of Blockade.process_move (all games)
+    header = ['Phase', 'Total time (s)', 'Calls', 'Mean (us)', 'Max (us)']
+    rows = [[phase, f'{total_time:.3f}', str(calls), f'{total_time / calls * 1e6:.1f}', f'{longest_time * 1e6:.1f}']
+            for phase, (total_time, calls, longest_time) in engine_stats.timings.items()]
+    return format_markdown_table(header, rows)
+
+
+def format_player_stats_table(player_stats, player_specs, names):
+    # get_move time and the counters of every player (per move)
+    counter_names = sorted({name for spec in player_specs for name in player_stats[spec].counters})
+    header = ['Player', 'Moves', 'Mean get_move (ms)', 'Max get_move (ms)'] + [f'{name}/move' for name in counter_names]
+    rows = []
+    for spec in player_specs:
+        total_time, calls, longest_time = player_stats[spec].timings.get('get_move', (0.0, 0, 0.0))
+        calls = max(calls, 1)
+        rows.append([names[spec], str(calls), f'{total_time / calls * 1000:.3f}', f'{longest_time * 1000:.3f}']
+                    + [f'{player_stats[spec].counters.get(name, 0) / calls:.1f}' for name in counter_names])
+    return format_markdown_table(header, rows)
+
+
+def format_markdown_table(header, rows):
+    widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+    lines = ['| ' + ' | '.join(cell.ljust(width) for cell, width in zip(row, widths)) + ' |' for row in [header] + rows]
+    lines.insert(1, '|' + '|'.join('-' * (width + 2) for width in widths) + '|')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-p', '--players', nargs='+', help='player specs, e.g. random heuristic optimized '
+                        'optimized:0.26,-0.31,-0.12,0.49 rl:players/A2C15v1,a2c', default=['random', 'heuristic'])
+    parser.add_argument('-a', '--arena-sizes', nargs='+', help='sizes of the square game arena (in tiles)', type=int,
+                        default=[15])
+    parser.add_argument('-n', '--num-seeds', help='number of games per pair of players', type=int, default=1000)
+    parser.add_argument('-r', '--starting-seed', help='seed of the first game, games use consecutive seeds',
+                        type=int, default=0)
+    parser.add_argument('-s', '--swap-sides', action='store_true',
+                        help='repeats every game with switched sides (counted for the same pair of players)')
+    parser.add_argument('-j', '--processes', help='number of worker processes (default: number of CPUs)', type=int,
+                        default=None)
+    parser.add_argument('-o', '--replay-file', help='appends all games to a replay file (see replay.py)', default=None)
+    parser.add_argument('-l', '--move-time-limit', help='time limit of every move (in seconds), a late bot makes '
+                        'a fallback move (overruns are shown with --stats)', type=float, default=None)
+    parser.add_argument('-t', '--stats', action='store_true',
+                        help='collects and prints the time of the move phases and the players\' counters')
+    parser.add_argument('-c', '--cache-size', help='size of the position cache of the flood fill bots in every worker '
+                        '(0 - no cache unless books are given)', type=int, default=0)
+    parser.add_argument('-b', '--books', nargs='+', help='opening books for the position cache (see book.py)',
+                        default=[])
+    args = parser.parse_args()
+
+    player_names = {spec: str(create_spec_player(spec)) for spec in args.players}
+    # small chunks, so an interrupted tournament loses at most its last 256 games
+    tournament_replay_writer = ReplayWriter(args.replay_file, chunk_size=256) if args.replay_file is not None else None
+    tournament_results = run_tournament(args.players, arena_sizes=args.arena_sizes,
+                                        seeds=range(args.starting_seed, args.starting_seed + args.num_seeds),
+                                        swap_sides=args.swap_sides, processes=args.processes,
+                                        replay_writer=tournament_replay_writer, collect_stats=args.stats,
+                                        move_time_limit=args.move_time_limit,
+                                        position_cache=(tuple(args.books), args.cache_size or 100000)
+                                        if args.books or args.cache_size > 0 else None)
+    if tournament_replay_writer is not None:
+        tournament_replay_writer.close()
+    if args.stats:
+        tournament_results, tournament_stats = tournament_results
+    for size, size_results in tournament_results.items():
+        print(f'Results for arena_size={size} (wins/draws/loses from the perspective of Player 1):\n')
+        print(format_results_table(size_results, args.players, player_names) + '\n')
+        print(format_aggregated_table(aggregate_results(size_results), args.players, player_names) + '\n')
+        if args.stats:
+            print(f'Move phases for arena_size={size}:\n')
+            print(format_engine_stats_table(aggregate_engine_stats(tournament_stats[size])) + '\n')
+            print(f'Players for arena_size={size}:\n')
+            print(format_player_stats_table(aggregate_player_stats(tournament_stats[size]), args.players,
+                                            player_names) + '\n')
@@ -0,0 +1,129 @@
+import numpy as np
+from gymnasium.spaces import Box, Discrete
+from stable_baselines3.common.vec_env import VecEnv
+
+from board import BOARD_DTYPE, starting_heads, EMPTY, P1_HEAD, P1_TAIL, P2_HEAD, P2_TAIL
+from encoding import ObservationEncoder
+
+
+class BlockadeVecEnv(VecEnv):
+    # many Blockade arenas stepped at once for training RL bots with Stable Baselines 3 (no SuperSuit wrappers needed)
+    # follows the rules and rewards of BlockadeEnv: both players of an arena are separate envs sharing one policy,
+    # env 2*k is player1 and env 2*k+1 is player2 of arena k (the same order as pettingzoo_env_to_vec_env_v1)
+    # finished arenas are reset automatically, their last observations are stored in infos['terminal_observation']
+    def __init__(self, num_arenas, arena_size):
+        self.num_arenas = num_arenas
+        self.arena_size = arena_size
+        super().__init__(num_envs=2 * num_arenas,
+                         observation_space=Box(low=0, high=3, shape=(arena_size, arena_size), dtype=np.int32),
+                         action_space=Discrete(4))
+
+        self.game_matrices = np.zeros((num_arenas, arena_size, arena_size), dtype=BOARD_DTYPE)
+        self.p1_heads = np.zeros((num_arenas, 2), dtype=int)
+        self.p2_heads = np.zeros((num_arenas, 2), dtype=int)
+        self.move_counters = np.zeros(num_arenas, dtype=int)
+        self.max_number_of_moves = (self.arena_size ** 2 - 2) // 2  # every move fills 2 tiles
+        # (y, x) offsets of actions 0: up, 1: down, 2: left, 3: right
+        self.action_offsets = np.array([(-1, 0), (1, 0), (0, -1), (0, 1)])
+        self.encoder = ObservationEncoder()
+        self.arena_ids = np.arange(num_arenas)
+        self.actions = None
+
+    def reset_arenas(self, arena_ids):
+        p1_head, p2_head = starting_heads(self.arena_size)
+        self.game_matrices[arena_ids] = EMPTY
+        self.game_matrices[arena_ids, p1_head[0], p1_head[1]] = P1_HEAD
+        self.game_matrices[arena_ids, p2_head[0], p2_head[1]] = P2_HEAD
+        self.p1_heads[arena_ids] = p1_head
+        self.p2_heads[arena_ids] = p2_head
+        self.move_counters[arena_ids] = 0
+
+    def next_observations(self):
+        # observations of both players of all arenas translated in a single pass: (2 * num_arenas, N, N)
+        # (a new array every step, because Stable Baselines 3 keeps references to the previous observations)
+        observations = np.empty((self.num_arenas, 2, self.arena_size, self.arena_size), dtype=np.int32)
+        self.encoder.encode_both(self.game_matrices, out=observations.transpose(1, 0, 2, 3))
+        return observations.reshape(self.num_envs, self.arena_size, self.arena_size)
+
+    def reset(self):
+        self.reset_arenas(self.arena_ids)
+        return self.next_observations()
+
+    def move_heads(self, heads, actions):
+        # moves the heads of all arenas (the old head always becomes a tail, like in BlockadeEnv.step),
+        # returns the mask of arenas in which the move was possible
+        targets = heads + self.action_offsets[actions]
+        inside = ((targets >= 0) & (targets < self.arena_size)).all(axis=1)
+        y = np.clip(targets[:, 0], 0, self.arena_size - 1)
+        x = np.clip(targets[:, 1], 0, self.arena_size - 1)
+        possible = inside & (self.game_matrices[self.arena_ids, y, x] == EMPTY)
+        heads[possible] = targets[possible]
+        return possible
+
+    def step_async(self, actions):
+        self.actions = np.asarray(actions)
+
+    def step_wait(self):
+        p1_actions = self.actions[0::2]
+        p2_actions = self.actions[1::2]
+
+        # update player1
+        self.game_matrices[self.arena_ids, self.p1_heads[:, 0], self.p1_heads[:, 1]] = P1_TAIL
+        p1_possible = self.move_heads(self.p1_heads, p1_actions)
+        self.game_matrices[p1_possible, self.p1_heads[p1_possible, 0], self.p1_heads[p1_possible, 1]] = P1_HEAD
+        # update player2 (after player1, so it can't enter the tile which player1 has just taken)
+        self.game_matrices[self.arena_ids, self.p2_heads[:, 0], self.p2_heads[:, 1]] = P2_TAIL
+        p2_possible = self.move_heads(self.p2_heads, p2_actions)
+        self.game_matrices[p2_possible, self.p2_heads[p2_possible, 0], self.p2_heads[p2_possible, 1]] = P2_HEAD
+
+        # reward calculation
+        rewards = np.ones((self.num_arenas, 2), dtype=np.float32)  # game continues
+        rewards[~p1_possible & p2_possible] = (-100, 100)  # p1 lost
+        rewards[p1_possible & ~p2_possible] = (100, -100)  # p2 lost
+        rewards[~p1_possible & ~p2_possible] = (-10, -10)  # tie
+
+        # terminations and truncations
+        terminations = ~p1_possible | ~p2_possible
+        self.move_counters += 1
+        truncations = self.move_counters > self.max_number_of_moves
+        dones = terminations | truncations
+
+        # observations and infos (with auto-reset of finished arenas)
+        observations = self.next_observations()
+        infos = [{} for _ in range(self.num_envs)]
+        finished_arenas = np.flatnonzero(dones)
+        for arena in finished_arenas:
+            for env in (2 * arena, 2 * arena + 1):
+                infos[env]['terminal_observation'] = observations[env].copy()
+                infos[env]['TimeLimit.truncated'] = bool(truncations[arena] and not terminations[arena])
+        if len(finished_arenas) > 0:
+            self.reset_arenas(finished_arenas)
+            observations = self.next_observations()
+
+        return observations, rewards.reshape(self.num_envs), np.repeat(dones, 2), infos
+
+    def close(self):
+        pass
+
+    def seed(self, seed=None):
+        # the environment is deterministic
+        return [None for _ in range(self.num_envs)]
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        return [getattr(self, method_name)(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
+
+    def _get_indices(self, indices):
+        if indices is None:
+            return range(self.num_envs)
+        elif isinstance(indices, int):
+            return [indices]
+        return indices
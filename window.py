@@ -0,0 +1,168 @@
+import arcade
+import numpy as np
+import pyglet
+from concurrent.futures import ThreadPoolExecutor
+
+from blockade import Blockade
+from board import EMPTY, P1_HEAD, P1_TAIL, P2_HEAD, P2_TAIL, COLLISION
+from players.HumanPlayer import HumanPlayer
+
+
+class BlockadeWindowed(Blockade, arcade.Window):
+    # visual mode for humans playing against bots or observing bots fighting against each other
+    def __init__(self, player1, player2, arena_size, tile_size, game_speed, mute_sound, verbose, seed=None,
+                 replay_writer=None, player_specs=None, move_time_limit=None):
+        # arcade init
+        # size of the window depends on the arena and tile size but is limited by the screen resolution
+        max_width = min(arena_size * tile_size, int(arcade.window_commands.get_display_size()[0]))
+        max_height = min(arena_size * tile_size, int(arcade.window_commands.get_display_size()[1]))
+        self.actual_window_size = min(max_width, max_height)
+        self.actual_tile_size = self.actual_window_size / arena_size
+        arcade.Window.__init__(self, width=self.actual_window_size, height=self.actual_window_size, title='Blockade')
+        self.background_color = arcade.color.ARSENIC
+
+        # blockade init
+        Blockade.__init__(self, player1, player2, arena_size, verbose, seed, replay_writer, player_specs,
+                          move_time_limit=move_time_limit)
+        self.game_over = False
+        self.tile_size = tile_size
+        self.game_speed = game_speed
+        self.speed_change_step = 1.0
+        self.max_speed = 60.0
+        # fixed timestep simulation: on_update starts a move every 1 / game_speed seconds, the players select their
+        # moves on a worker thread while frames are drawn, and the move is shown (committed) once it's finished
+        self.time_since_move = 0.0
+        self.move_executor = ThreadPoolExecutor(max_workers=1)
+        self.pending_move = None
+        self.mute_sound = mute_sound
+        self.tile_colors = {P1_HEAD: (0, 153, 51), P1_TAIL: (0, 204, 68), P2_HEAD: (204, 0, 0), P2_TAIL: (255, 51, 51),
+                            COLLISION: (204, 153, 51)}  # RGB colors
+        # occupied tiles are sprites drawn with a single batched call, they are added (or recolored) only for the
+        # tiles which changed since the last update - drawn_matrix is the game matrix as currently shown
+        self.tile_sprites = arcade.SpriteList(use_spatial_hash=False)
+        self.tile_sprite_dict = dict()  # {(y, x): sprite}
+        self.drawn_matrix = np.zeros_like(self.game_matrix)
+        self.update_tile_sprites()
+        self.keys = {arcade.key.UP: 'up', arcade.key.DOWN: 'down', arcade.key.LEFT: 'left', arcade.key.RIGHT: 'right',
+                     arcade.key.W: 'up', arcade.key.S: 'down', arcade.key.A: 'left', arcade.key.D: 'right'}
+        self.sounds = {'move': arcade.load_sound(':resources:sounds/phaseJump1.wav'),
+                       'game_over': arcade.load_sound(':resources:sounds/gameover4.wav')}
+
+    def update_game_speed(self, new_speed):
+        self.game_speed = new_speed
+
+    def on_key_press(self, symbol: int, modifiers: int):
+        # handling user input
+        # arrows
+        if symbol in [arcade.key.UP, arcade.key.DOWN, arcade.key.LEFT, arcade.key.RIGHT]:
+            if isinstance(self.player1, HumanPlayer) and self.player1.keyboard_input == 'arrows':
+                self.player1.current_direction = self.keys[symbol]
+            elif isinstance(self.player2, HumanPlayer) and self.player2.keyboard_input == 'arrows':
+                self.player2.current_direction = self.keys[symbol]
+            elif self.verbose:
+                print(f'No player uses arrows!', flush=True)
+        # WSAD
+        elif symbol in [arcade.key.W, arcade.key.S, arcade.key.A, arcade.key.D]:
+            if isinstance(self.player1, HumanPlayer) and self.player1.keyboard_input == 'wsad':
+                self.player1.current_direction = self.keys[symbol]
+            elif isinstance(self.player2, HumanPlayer) and self.player2.keyboard_input == 'wsad':
+                self.player2.current_direction = self.keys[symbol]
+            elif self.verbose:
+                print(f'No player uses WSAD!', flush=True)
+        # other keys
+        elif symbol == arcade.key.ESCAPE:
+            if self.verbose:
+                print('Premature exit on Escape.', flush=True)
+            self.exit_game()
+        elif symbol == arcade.key.EQUAL or symbol == arcade.key.NUM_ADD:
+            if self.game_speed <= self.max_speed - self.speed_change_step:
+                self.update_game_speed(self.game_speed + self.speed_change_step)
+                if self.verbose:
+                    print(f'Increased speed to {self.game_speed}.', flush=True)
+            else:
+                self.update_game_speed(self.max_speed)
+                if self.verbose:
+                    print(f'Speed too high to increase further: {self.game_speed}.', flush=True)
+        elif symbol == arcade.key.MINUS or symbol == arcade.key.NUM_SUBTRACT:
+            if self.game_speed > self.speed_change_step * 2:
+                self.update_game_speed(self.game_speed - self.speed_change_step)
+                if self.verbose:
+                    print(f'Decreased speed to {self.game_speed}.', flush=True)
+            else:
+                self.update_game_speed(self.speed_change_step)
+                if self.verbose:
+                    print(f'Speed too low to decrease further: {self.game_speed}.', flush=True)
+        elif symbol == arcade.key.M:
+            self.mute_sound = not self.mute_sound
+            if self.verbose:
+                if self.mute_sound:
+                    print(f'Sound muted.', flush=True)
+                else:
+                    print(f'Sound unmuted.', flush=True)
+        elif self.verbose:
+            print(f'Unknown keyboard input: {symbol}', flush=True)
+
+    def update_tile_sprites(self):
+        for y, x in np.argwhere(self.game_matrix != self.drawn_matrix):
+            value = self.game_matrix[y, x]
+            sprite = self.tile_sprite_dict.get((y, x))
+            if value == EMPTY:
+                if sprite is not None:
+                    sprite.remove_from_sprite_lists()
+                    del self.tile_sprite_dict[(y, x)]
+            else:
+                if sprite is None:
+                    # white tiles are tinted with the tile color, so all sprites share one texture
+                    sprite = arcade.SpriteSolidColor(int(np.ceil(self.actual_tile_size)),
+                                                     int(np.ceil(self.actual_tile_size)), arcade.color.WHITE)
+                    sprite.width = self.actual_tile_size
+                    sprite.height = self.actual_tile_size
+                    # y-axis is adjusted for different coordinate systems of np.array and Python Arcade
+                    # (matrix vs Cartesian)
+                    sprite.center_x = (x + 0.5) * self.actual_tile_size
+                    sprite.center_y = (self.arena_size - y - 0.5) * self.actual_tile_size
+                    self.tile_sprites.append(sprite)
+                    self.tile_sprite_dict[(y, x)] = sprite
+                sprite.color = self.tile_colors[value]
+            self.drawn_matrix[y, x] = value
+
+    def on_update(self, delta_time):
+        self.time_since_move += delta_time
+        if self.pending_move is not None and self.pending_move.done():
+            outcome = self.pending_move.result()
+            self.pending_move = None
+            self.commit_move(outcome)
+
+        move_interval = 1.0 / self.game_speed
+        if self.pending_move is None and not self.game_over and self.time_since_move >= move_interval:
+            # a slow move doesn't cause a burst of moves afterwards
+            self.time_since_move = min(self.time_since_move - move_interval, move_interval)
+            self.pending_move = self.move_executor.submit(self.process_move)
+
+    def commit_move(self, outcome):
+        # shows the result of a finished move (called on the main thread, when the worker is idle)
+        self.update_tile_sprites()
+        if outcome is not None:
+            # game finished - exit
+            self.exit_game(sound=True)
+        else:
+            # play move sound
+            if not ((isinstance(self.player1, HumanPlayer) and self.player1.current_direction is None)
+                    or (isinstance(self.player2, HumanPlayer) and self.player2.current_direction is None)) \
+                    and not self.mute_sound:
+                arcade.sound.play_sound(self.sounds['move'], volume=0.3, speed=self.game_speed ** 0.05)
+
+    def on_draw(self):
+        # game matrix drawing (only the committed state, the worker may be in the middle of the next move)
+        self.clear()
+        self.tile_sprites.draw()
+
+    def exit_game(self, sound=False):
+        if self.game_over:
+            return
+        self.game_over = True
+        self.move_executor.shutdown(wait=False)
+        if sound and not self.mute_sound:
+            arcade.sound.play_sound(self.sounds['game_over'], volume=0.2)
+        # the window stays open for a moment without blocking the event loop
+        pyglet.clock.schedule_once(lambda delta_time: arcade.exit(), 2.0 / self.game_speed)